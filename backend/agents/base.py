@@ -1,7 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, Callable, List, Optional
 from backend.utils.nim_client import nim_client
-from backend.services.db import db_service
+from backend.services.audit import audit_sink
+from backend.services.events import event_bus
+from backend.utils.telemetry import tracer, current_agent
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,6 +14,13 @@ class BaseAgent(ABC):
         self.job_id = job_id
         self.model = "meta/llama3-70b-instruct" # Default model
 
+    @classmethod
+    async def warm_up(cls):
+        """
+        Prepares shared resources the agent needs (indexes, worker pools) ahead of its first job.
+        """
+        pass
+
     @abstractmethod
     async def run(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -21,14 +30,41 @@ class BaseAgent(ABC):
 
     async def log_activity(self, action: str, details: Dict[str, Any]):
         """
-        Logs agent activity to the audit log.
+        Logs agent activity to the audit log and the job's live event stream.
         """
-        db_service.log_audit(self.job_id, f"{self.agent_id}:{action}", details)
+        await audit_sink.log(self.job_id, f"{self.agent_id}:{action}", details)
+        event_bus.publish(self.job_id, {"type": "log", "agent": self.agent_id, "action": action, "details": details})
         logger.info(f"[{self.job_id}] {self.agent_id}: {action}")
 
-    async def call_llm(self, messages: List[Dict[str, str]], temperature: float = 0.7) -> str:
+    async def call_llm(self, messages: List[Dict[str, str]], temperature: float = 0.7, stream: Optional[bool] = None,
+                       on_delta: Optional[Callable[[str], None]] = None, model: Optional[str] = None) -> str:
         """
         Helper to call NIM LLM.
+        When streaming (by default: whenever someone is watching the job), token deltas are
+        pushed to the job's event stream as they arrive and the full text is returned at the end.
+        `on_delta` is called with each delta (streaming is then the default), e.g. to parse output incrementally.
+        `model` overrides the agent's model for this call.
         """
-        response = await nim_client.chat_completion(self.model, messages, temperature)
-        return response["choices"][0]["message"]["content"]
+        model = model or self.model
+        if stream is None:
+            stream = on_delta is not None or event_bus.has_subscribers(self.job_id)
+
+        token = current_agent.set(self.agent_id)
+        try:
+            with tracer.span("llm.call", agent=self.agent_id, model=model, stream=stream):
+                if not stream:
+                    response = await nim_client.chat_completion(model, messages, temperature)
+                    content = response["choices"][0]["message"]["content"]
+                    if on_delta is not None:
+                        on_delta(content)
+                    return content
+
+                parts = []
+                async for delta in nim_client.chat_completion_stream(model, messages, temperature):
+                    parts.append(delta)
+                    event_bus.publish(self.job_id, {"type": "token", "agent": self.agent_id, "delta": delta})
+                    if on_delta is not None:
+                        on_delta(delta)
+                return "".join(parts)
+        finally:
+            current_agent.reset(token)
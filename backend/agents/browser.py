@@ -1,6 +1,9 @@
 from typing import Dict, Any
 from backend.agents.base import BaseAgent
-from playwright.async_api import async_playwright
+from backend.services.browser_pool import browser_pool, BROWSER_BLOCK_RESOURCES
+from backend.utils.telemetry import tracer, BROWSER_ACTION_LATENCY
+import os
+import time
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,7 +17,7 @@ class BrowserAgent(BaseAgent):
         url = input_data.get("url")
         action = input_data.get("action", "read")
         
-        self.log_activity("browser_action", {"url": url, "action": action})
+        await self.log_activity("browser_action", {"url": url, "action": action})
 
         # Safety Check
         domain = url.split("/")[2] if "//" in url else url.split("/")[0]
@@ -22,31 +25,34 @@ class BrowserAgent(BaseAgent):
         if not any(d in domain for d in self.allowed_domains):
              # In a real system, request user approval here.
              # For now, we log and potentially block or proceed with caution.
-             self.log_activity("domain_warning", {"domain": domain})
+             await self.log_activity("domain_warning", {"domain": domain})
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
-            try:
+        start = time.perf_counter()
+        try:
+            with tracer.span("browser.action", action=action, url=url):
+                return await self._perform(url, action)
+        finally:
+            BROWSER_ACTION_LATENCY.observe(time.perf_counter() - start, action)
+
+    async def _perform(self, url: str, action: str) -> Dict[str, Any]:
+        try:
+            # Images, fonts and media are irrelevant when we only read the DOM
+            async with browser_pool.page(block_resources=(action == "read" and BROWSER_BLOCK_RESOURCES)) as page:
                 await page.goto(url, timeout=30000)
-                
+
                 if action == "read":
                     content = await page.content()
                     title = await page.title()
-                    await browser.close()
                     return {"title": title, "content_length": len(content)}
-                
+
                 elif action == "screenshot":
+                    os.makedirs("artifacts", exist_ok=True)
                     path = f"artifacts/screenshot_{self.job_id}.png"
                     await page.screenshot(path=path)
-                    await browser.close()
                     return {"path": path}
-                
-                await browser.close()
+
                 return {"status": "success", "message": "Action completed"}
-                
-            except Exception as e:
-                await browser.close()
-                logger.error(f"Browser action failed: {e}")
-                return {"status": "failed", "error": str(e)}
+
+        except Exception as e:
+            logger.error(f"Browser action failed: {e}")
+            return {"status": "failed", "error": str(e)}
@@ -1,8 +1,6 @@
 from typing import Dict, Any, Tuple
 from backend.agents.base import BaseAgent
-import subprocess
-import os
-import tempfile
+from backend.services.sandbox import sandbox_pool
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,14 +9,22 @@ class CoderAgent(BaseAgent):
     def __init__(self, job_id: str):
         super().__init__("coder", job_id)
 
+    @classmethod
+    async def warm_up(cls):
+        await sandbox_pool.start()
+
     async def run(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         spec = input_data.get("instruction")
-        self.log_activity("coding_started", {"spec": spec})
+        await self.log_activity("coding_started", {"spec": spec})
+
+        # Upstream work (e.g. the tests from generate_tests) so later coder steps build on it
+        previous = f"Previous steps:\n{input_data['content']}" if input_data.get("content") else ""
 
         # 1. Generate Code & Tests
         prompt = f"""
         You are an expert Python developer.
         Task: {spec}
+        {previous}
         
         Write a complete Python script that implements the task.
         Include a main block or test function to verify correctness.
@@ -30,18 +36,28 @@ class CoderAgent(BaseAgent):
         code_response = await self.call_llm([{"role": "user", "content": prompt}], temperature=0.2)
         code = self._extract_code(code_response)
         
-        # 2. Execute Code (Sandbox - Local Subprocess)
+        # 2. Execute Code (Sandbox - warm worker pool with rlimits)
         # WARNING: In a real production system, use a secure container (Docker/Firecracker).
         # Here we run locally as per instructions "normal Python environment".
         
-        success, output = self._execute_code(code)
+        tests = await sandbox_pool.run_tests(code)
+        if tests is not None:
+            # Generated test suites run one test case per sandbox worker
+            passed = sum(1 for test in tests if test["status"] == "passed")
+            await self.log_activity("tests_completed", {"passed": passed, "total": len(tests)})
+            failures = [f"{test['test']}: {test['status']}\n{test['output']}" for test in tests if test["status"] != "passed"]
+            if failures:
+                return {"status": "failed", "code": code, "error": "\n".join(failures), "tests": tests}
+            return {"status": "success", "code": code, "output": f"{passed} tests passed", "tests": tests}
+
+        success, output = await self._execute_code(code)
         
         if not success:
-            self.log_activity("execution_failed", {"output": output})
+            await self.log_activity("execution_failed", {"output": output})
             # Retry logic could go here (feed error back to LLM)
             return {"status": "failed", "code": code, "error": output}
             
-        self.log_activity("execution_success", {"output": output})
+        await self.log_activity("execution_success", {"output": output})
         return {"status": "success", "code": code, "output": output}
 
     def _extract_code(self, text: str) -> str:
@@ -51,25 +67,10 @@ class CoderAgent(BaseAgent):
             return text.split("```")[1].split("```")[0].strip()
         return text
 
-    def _execute_code(self, code: str) -> Tuple[bool, str]:
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write(code)
-            temp_path = f.name
-            
-        try:
-            result = subprocess.run(
-                ["python", temp_path],
-                capture_output=True,
-                text=True,
-                timeout=30 # Safety timeout
-            )
-            os.unlink(temp_path)
-            
-            if result.returncode == 0:
-                return True, result.stdout
-            else:
-                return False, result.stderr
-        except Exception as e:
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-            return False, str(e)
+    async def _execute_code(self, code: str) -> Tuple[bool, str]:
+        result = await sandbox_pool.run(code, timeout=30) # Safety timeout
+        if result["timed_out"]:
+            return False, f"Execution timed out after {result['duration']:.1f}s\n{result['stderr']}"
+        if result["exit_code"] == 0:
+            return True, result["stdout"]
+        return False, result["stderr"] or result["stdout"]
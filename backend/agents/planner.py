@@ -1,16 +1,56 @@
-from typing import Dict, Any, List
 import json
+import time
+from typing import Dict, Any, Callable, List, Optional
 from backend.agents.base import BaseAgent
+from backend.services.plan_cache import plan_cache, PlanMatch, PLAN_CACHE_ADAPT_MODEL
+from backend.utils.json_stream import JSONStreamParser
+
+# Keys a plan step must carry before it is dispatched or cached
+REQUIRED_STEP_KEYS = ("step_id", "agent", "dependencies")
+
+def is_complete_step(step: Any) -> bool:
+    return (
+        isinstance(step, dict)
+        and all(key in step for key in REQUIRED_STEP_KEYS)
+        and isinstance(step["agent"], str) and bool(step["agent"])
+        and isinstance(step["dependencies"], list)
+    )
 
 class PlannerAgent(BaseAgent):
     def __init__(self, job_id: str):
         super().__init__("planner", job_id)
         self.model = "meta/llama3-70b-instruct" # Good for reasoning
 
-    async def run(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    @classmethod
+    async def warm_up(cls):
+        await plan_cache.warm_up()
+
+    async def run(self, input_data: Dict[str, Any], on_step: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        With `on_step`, the completion is streamed and each plan step is handed over as soon as its
+        JSON object closes, so execution can start while the rest of the plan is being generated.
+
+        The plan cache is consulted first: the plan of a near-identical past objective is reused without
+        an LLM call, and that of a similar one is adapted by a smaller model.
+        """
+        start = time.perf_counter()
         objective = input_data.get("objective")
-        self.log_activity("planning_started", {"objective": objective})
+        await self.log_activity("planning_started", {"objective": objective})
+
+        match = await plan_cache.lookup(self.job_id, objective)
+        if match is not None and match.mode == "reuse":
+            plan = {**match.plan, "plan": [step for step in match.plan.get("plan", []) if is_complete_step(step)]}
+            await self.log_activity("plan_reused", {"cached_objective": match.objective, "similarity": round(match.similarity, 4)})
+            if on_step is not None:
+                for step in plan.get("plan", []):
+                    on_step(step)
+        else:
+            plan = await self._generate(objective, match, on_step)
+        plan_cache.planned(self.job_id, plan, time.perf_counter() - start)
+        await self.log_activity("planning_complete", {"plan": plan})
+        return plan
 
+    async def _generate(self, objective: str, match: Optional[PlanMatch], on_step: Optional[Callable[[Dict[str, Any]], None]]) -> Dict[str, Any]:
         prompt = f"""
         You are an expert project planner for an autonomous agent system.
         Objective: {objective}
@@ -35,16 +75,47 @@ class PlannerAgent(BaseAgent):
             ]
         }}
         """
-        
-        response = await self.call_llm([{"role": "user", "content": prompt}], temperature=0.2)
-        
-        try:
-            # Basic cleanup for JSON parsing if model adds markdown blocks
-            clean_response = response.replace("```json", "").replace("```", "").strip()
-            plan = json.loads(clean_response)
-            self.log_activity("planning_complete", {"plan": plan})
-            return plan
-        except json.JSONDecodeError:
-            self.log_activity("planning_failed", {"error": "Invalid JSON response", "raw": response})
+        model = None
+        if match is not None:
+            # Adapting a known-good plan is a much smaller task than planning from scratch
+            model = PLAN_CACHE_ADAPT_MODEL
+            prompt += f"""
+        A plan that worked for the similar objective "{match.objective}" is below. Adapt it to the
+        objective above, changing only what differs, and return it in the same structure.
+        {json.dumps(match.plan)}
+        """
+            await self.log_activity("plan_adapting", {"cached_objective": match.objective, "similarity": round(match.similarity, 4)})
+
+        parser = JSONStreamParser("plan")
+
+        def on_delta(delta: str):
+            for step in parser.feed(delta):
+                if on_step is not None and is_complete_step(step):
+                    on_step(step)
+
+        response = await self.call_llm([{"role": "user", "content": prompt}], temperature=0.2,
+                                       on_delta=on_delta if on_step is not None else None, model=model)
+        if on_step is None:
+            parser.feed(response)
+
+        plan: Any = None
+        if parser.done:
+            try:
+                plan = parser.result()
+            except ValueError:
+                pass
+        # A truncated or unparseable response only yields the steps whose JSON closed completely;
+        # result() would close it off and fabricate a partial last step
+        if isinstance(plan, dict) and isinstance(plan.get("plan"), list):
+            steps = plan["plan"]
+        elif isinstance(plan, list):
+            plan, steps = {}, plan
+        else:
+            plan, steps = {}, parser.elements
+        steps = [step for step in steps if is_complete_step(step)]
+        if not steps:
+            await self.log_activity("planning_failed", {"error": "No complete plan steps in response", "raw": response})
             raise ValueError("Failed to generate a valid plan.")
+        plan = {**plan, "plan": steps}
+        return plan
 
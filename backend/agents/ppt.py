@@ -1,9 +1,9 @@
 from typing import Dict, Any, List
 from backend.agents.base import BaseAgent
+from backend.utils.json_stream import JSONStreamParser
 from pptx import Presentation
 from pptx.util import Inches
 import os
-import json
 
 class PPTAgent(BaseAgent):
     def __init__(self, job_id: str):
@@ -11,7 +11,7 @@ class PPTAgent(BaseAgent):
 
     async def run(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         topic = input_data.get("instruction")
-        self.log_activity("ppt_generation_started", {"topic": topic})
+        await self.log_activity("ppt_generation_started", {"topic": topic})
 
         # 1. Generate Outline & Content
         prompt = f"""
@@ -24,30 +24,19 @@ class PPTAgent(BaseAgent):
             ]
         }}
         """
-        response = await self.call_llm([{"role": "user", "content": prompt}], temperature=0.3)
-        
-        try:
-            clean_response = response.replace("```json", "").replace("```", "").strip()
-            data = json.loads(clean_response)
-        except:
-            return {"status": "failed", "error": "Failed to parse slide content"}
 
-        # 2. Create PPTX
+        # 2. Create PPTX, adding each slide as soon as its JSON object has streamed in
         prs = Presentation()
-        
-        for slide_data in data.get("slides", []):
-            slide_layout = prs.slide_layouts[1] # Title and Content
-            slide = prs.slides.add_slide(slide_layout)
-            
-            title = slide.shapes.title
-            content = slide.placeholders[1]
-            
-            title.text = slide_data.get("title", "Untitled")
-            tf = content.text_frame
-            
-            for point in slide_data.get("content", []):
-                p = tf.add_paragraph()
-                p.text = point
+        parser = JSONStreamParser("slides")
+
+        def on_delta(delta: str):
+            for slide_data in parser.feed(delta):
+                if isinstance(slide_data, dict):
+                    self._add_slide(prs, slide_data)
+
+        await self.call_llm([{"role": "user", "content": prompt}], temperature=0.3, on_delta=on_delta)
+        if not parser.elements:
+            return {"status": "failed", "error": "Failed to parse slide content"}
 
         # 3. Save Artifact
         filename = f"presentation_{self.job_id}.pptx"
@@ -55,5 +44,19 @@ class PPTAgent(BaseAgent):
         os.makedirs("artifacts", exist_ok=True)
         prs.save(filepath)
         
-        self.log_activity("ppt_created", {"path": filepath})
+        await self.log_activity("ppt_created", {"path": filepath, "slides": len(parser.elements)})
         return {"status": "success", "path": filepath}
+
+    def _add_slide(self, prs, slide_data: Dict[str, Any]):
+        slide_layout = prs.slide_layouts[1] # Title and Content
+        slide = prs.slides.add_slide(slide_layout)
+
+        title = slide.shapes.title
+        content = slide.placeholders[1]
+
+        title.text = slide_data.get("title", "Untitled")
+        tf = content.text_frame
+
+        for point in slide_data.get("content", []):
+            p = tf.add_paragraph()
+            p.text = point
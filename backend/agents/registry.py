@@ -0,0 +1,91 @@
+import asyncio
+import importlib
+import os
+import sys
+import time
+import logging
+from typing import Any, Dict, Iterable, Optional, Type
+
+logger = logging.getLogger(__name__)
+
+# Agents warmed up in the background once the API (or a worker) is serving
+WARMUP_AGENTS = os.getenv("WARMUP_AGENTS", "planner,researcher,coder,verifier")
+
+# Agent name (as used in selected_agents and workflow files) -> "module:Class". Modules are imported
+# on first use, so a process only pays for faiss, playwright, pptx or bs4 if it runs an agent needing them.
+AGENT_PATHS = {
+    "planner": "backend.agents.planner:PlannerAgent",
+    "researcher": "backend.agents.researcher:ResearcherAgent",
+    "coder": "backend.agents.coder:CoderAgent",
+    "ppt": "backend.agents.ppt:PPTAgent",
+    "browser": "backend.agents.browser:BrowserAgent",
+    "verifier": "backend.agents.verifier:VerifierAgent",
+}
+
+# Services only agents use: "module:singleton" by stats key. They are imported along with the agent
+# that needs them, so the API reports and shuts down only those this process actually loaded.
+AGENT_SERVICES = {
+    "browser_pool": "backend.services.browser_pool:browser_pool",
+    "crawler": "backend.services.crawler:crawler",
+    "ingest": "backend.services.ingest:ingest_pipeline",
+    "rag": "backend.services.rag:rag_service",
+    "embeddings": "backend.services.embeddings:embedding_service",
+    "sandbox": "backend.services.sandbox:sandbox_pool",
+    "plan_cache": "backend.services.plan_cache:plan_cache",
+}
+
+_classes: Dict[str, Type] = {}
+# Seconds spent importing each agent's module (and everything it pulled in)
+import_seconds: Dict[str, float] = {}
+warmed_up: Dict[str, float] = {}
+
+def get_agent_class(agent_name: str) -> Type:
+    agent_class = _classes.get(agent_name)
+    if agent_class is None:
+        path = AGENT_PATHS.get(agent_name)
+        if path is None:
+            raise ValueError(f"Unknown agent: {agent_name}")
+        module_name, class_name = path.split(":")
+        start = time.perf_counter()
+        agent_class = getattr(importlib.import_module(module_name), class_name)
+        import_seconds[agent_name] = round(time.perf_counter() - start, 4)
+        _classes[agent_name] = agent_class
+    return agent_class
+
+def create_agent(agent_name: str, job_id: str):
+    return get_agent_class(agent_name)(job_id)
+
+def loaded_services() -> Dict[str, Any]:
+    """
+    The agent services that have been imported so far, by stats key.
+    """
+    services = {}
+    for key, path in AGENT_SERVICES.items():
+        module_name, name = path.split(":")
+        module = sys.modules.get(module_name)
+        if module is not None and hasattr(module, name):
+            services[key] = getattr(module, name)
+    return services
+
+async def warm_up(agent_names: Optional[Iterable[str]] = None):
+    """
+    Imports agent modules off the event loop and runs each agent's warm-up hook (index loads, worker
+    pools), so the first job using them does not pay for it. Failures are logged; the agent will
+    simply initialise on first use instead.
+    """
+    if agent_names is None:
+        agent_names = [name.strip() for name in WARMUP_AGENTS.split(",") if name.strip()]
+    for agent_name in agent_names:
+        start = time.perf_counter()
+        try:
+            agent_class = await asyncio.to_thread(get_agent_class, agent_name)
+            await agent_class.warm_up()
+            warmed_up[agent_name] = round(time.perf_counter() - start, 4)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Warm-up of {agent_name} agent failed: {e}")
+    logger.info(f"Warmed up agents: {', '.join(warmed_up) or 'none'}")
+
+def stats() -> Dict[str, Any]:
+    return {"loaded": sorted(_classes), "import_seconds": dict(import_seconds), "warm_up_seconds": dict(warmed_up)}
@@ -1,18 +1,26 @@
 from typing import Dict, Any, List
 from backend.agents.base import BaseAgent
-import requests
-from bs4 import BeautifulSoup
+from backend.services.crawler import crawler
+from backend.services.ingest import ingest_pipeline
+from backend.services.rag import rag_service
+import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+RESEARCH_PASSAGES = int(os.getenv("RESEARCH_PASSAGES", "8"))
+
 class ResearcherAgent(BaseAgent):
     def __init__(self, job_id: str):
         super().__init__("researcher", job_id)
 
+    @classmethod
+    async def warm_up(cls):
+        await rag_service.warm_up()
+
     async def run(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         topic = input_data.get("instruction") # Planner sends instruction as topic usually
-        self.log_activity("research_started", {"topic": topic})
+        await self.log_activity("research_started", {"topic": topic})
 
         # 1. Generate search queries
         queries_prompt = f"Generate 3 distinct google search queries to research: {topic}"
@@ -33,20 +41,23 @@ class ResearcherAgent(BaseAgent):
         # BETTER: The prompt implies a "Deep-research agent" that does scraping. 
         # I will implement the scraping logic given a URL.
         
-        results = []
         # Mock URLs for demonstration if none provided
-        urls = ["https://example.com"] 
-        
-        for url in urls:
-            try:
-                self.log_activity("scraping_url", {"url": url})
-                # response = requests.get(url, timeout=10) # Commented out to avoid actual network calls in this environment if blocked
-                # soup = BeautifulSoup(response.content, 'html.parser')
-                # text = soup.get_text()
-                text = "Mock content for " + url
-                results.append({"url": url, "content": text[:500]})
-            except Exception as e:
-                logger.error(f"Failed to scrape {url}: {e}")
+        urls = input_data.get("urls") or ["https://example.com"]
+
+        await self.log_activity("scraping_urls", {"urls": urls})
+        pages = [page for page in await crawler.crawl(urls) if "error" not in page]
+
+        # Index the full text of every page, then pull back only the passages relevant to the topic
+        ingested = await ingest_pipeline.ingest(
+            (page["text"], {"job_id": self.job_id, "url": page["url"], "title": page["title"]}) for page in pages
+        )
+        await self.log_activity("sources_indexed", ingested)
+
+        passages = await rag_service.query(topic or "", k=RESEARCH_PASSAGES, filters={"job_id": self.job_id})
+        if passages:
+            results = [{"url": hit["url"], "content": hit["text"]} for hit in passages]
+        else:
+            results = [{"url": page["url"], "content": page["text"][:500]} for page in pages]
 
         # 3. Synthesize Report
         report_prompt = f"""
@@ -58,6 +69,6 @@ class ResearcherAgent(BaseAgent):
         """
         report = await self.call_llm([{"role": "user", "content": report_prompt}], temperature=0.3)
         
-        self.log_activity("research_complete", {"report_length": len(report)})
+        await self.log_activity("research_complete", {"report_length": len(report)})
         return {"report": report, "sources": results}
 
@@ -1,5 +1,6 @@
 from typing import Dict, Any
 from backend.agents.base import BaseAgent
+from backend.utils.json_stream import parse_json
 
 class VerifierAgent(BaseAgent):
     def __init__(self, job_id: str):
@@ -9,7 +10,7 @@ class VerifierAgent(BaseAgent):
         content_to_verify = input_data.get("content")
         context = input_data.get("context", "")
         
-        self.log_activity("verification_started", {"context": context})
+        await self.log_activity("verification_started", {"context": context})
 
         prompt = f"""
         Verify the following content for accuracy, logical consistency, and safety.
@@ -31,13 +32,10 @@ class VerifierAgent(BaseAgent):
         
         response = await self.call_llm([{"role": "user", "content": prompt}], temperature=0.1)
         
-        # Simple parsing (in production use a robust JSON parser)
-        import json
         try:
-            clean_response = response.replace("```json", "").replace("```", "").strip()
-            verification_result = json.loads(clean_response)
-        except:
+            verification_result = parse_json(response)
+        except ValueError:
             verification_result = {"is_valid": False, "issues": ["Failed to parse verification result"], "confidence_score": 0.0}
 
-        self.log_activity("verification_complete", verification_result)
+        await self.log_activity("verification_complete", verification_result)
         return verification_result
@@ -0,0 +1,62 @@
+"""
+Browser actions/sec with a fresh Chromium launch per action versus the shared browser pool.
+
+Usage: python -m backend.benchmarks.bench_browser [--actions 50] [--concurrency 4]
+"""
+import argparse
+import asyncio
+import time
+
+from playwright.async_api import async_playwright
+
+from backend.benchmarks.static_server import StaticServer
+from backend.services.browser_pool import BrowserPool
+
+PAGE = "<html><head><title>Fixture</title></head><body>" + "<p>Lorem ipsum dolor sit amet.</p>" * 200 + "<img src='missing.png'></body></html>"
+
+async def read_with_launch(url: str):
+    # Reproduces the original BrowserAgent behaviour
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.goto(url)
+        await page.content()
+        await browser.close()
+
+async def read_with_pool(pool: BrowserPool, url: str):
+    async with pool.page(block_resources=True) as page:
+        await page.goto(url)
+        await page.content()
+
+async def measure(label: str, actions: int, concurrency: int, action) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await action()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(actions)))
+    rate = actions / (time.perf_counter() - start)
+    print(f"{label:>10}: {rate:7.2f} actions/s")
+    return rate
+
+async def main(actions: int, concurrency: int):
+    with StaticServer({"index.html": PAGE}) as server:
+        url = f"{server.base_url}/index.html"
+        await measure("launch", actions, concurrency, lambda: read_with_launch(url))
+
+        pool = BrowserPool(size=2, max_pages=concurrency)
+        await pool.start()
+        try:
+            await measure("pooled", actions, concurrency, lambda: read_with_pool(pool, url))
+            print(pool.stats())
+        finally:
+            await pool.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--actions", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.actions, args.concurrency))
@@ -0,0 +1,115 @@
+"""
+End-to-end load test: the full API (scheduler, planner, executor, sandbox, job store) against the
+NIM stub, with POST /jobs driven at a fixed arrival rate (open loop, so a slow server builds a
+backlog instead of slowing the client down). Reports job throughput, p50/p95/p99 job and step
+latency, rejections and RSS.
+
+Usage: python -m backend.benchmarks.bench_jobs [--rate 5] [--duration 20] [--latency lognormal:20:0.5] [--output jobs.json]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+STUB_PORT = 8767
+API_PORT = 8768
+TERMINAL = ("completed", "failed", "rejected", "cancelled")
+
+def percentiles(values: List[float], prefix: str) -> Dict[str, float]:
+    values = sorted(values)
+    pct = lambda q: values[min(len(values) - 1, int(len(values) * q))] * 1000 if values else 0.0
+    return {f"{prefix}_p50_ms": round(pct(0.50), 1), f"{prefix}_p95_ms": round(pct(0.95), 1), f"{prefix}_p99_ms": round(pct(0.99), 1)}
+
+async def drive(base_url: str, rate: float, duration: float, poll: float) -> Dict[str, Any]:
+    import httpx
+
+    job_latencies: List[float] = []
+    step_latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    rejected = 0
+
+    async def one(client: httpx.AsyncClient):
+        nonlocal rejected
+        submitted = time.perf_counter()
+        response = await client.post("/jobs", json={"objective": "Count word frequencies in a text", "selected_agents": ["planner", "coder", "verifier", "ppt"]})
+        if response.status_code == 429:
+            rejected += 1
+            return
+        response.raise_for_status()
+        job_id = response.json()["job_id"]
+        while True:
+            await asyncio.sleep(poll)
+            record = (await client.get(f"/jobs/{job_id}")).json()
+            if record["status"] in TERMINAL:
+                break
+        job_latencies.append(time.perf_counter() - submitted)
+        statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+        for step in (record.get("plan") or {}).get("steps", []):
+            if step.get("timing"):
+                step_latencies.append(step["timing"]["duration"])
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        tasks = []
+        start = time.perf_counter()
+        for i in range(int(rate * duration)):
+            # Fixed schedule: arrivals do not wait for earlier jobs to finish
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(client)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+        stats = (await client.get("/stats")).json()
+
+    return {
+        "submitted": len(tasks),
+        "completed": len(job_latencies),
+        "rejected": rejected,
+        "statuses": statuses,
+        "throughput_jobs_per_s": round(len(job_latencies) / elapsed, 2),
+        **percentiles(job_latencies, "job"),
+        **percentiles(step_latencies, "step"),
+        "nim_requests": stats["nim"],
+    }
+
+def main(args: argparse.Namespace):
+    # Services read their configuration at import time: point them at the stub and at scratch
+    # storage before the app is imported
+    output = os.path.abspath(args.output) if args.output else None
+    os.chdir(tempfile.mkdtemp(prefix="bench_jobs_"))
+    os.environ.setdefault("NVIDIA_API_KEY", "stub")
+    os.environ["NIM_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+    os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+
+    import logging
+    from backend.benchmarks.nim_stub import StubConfig, StubServer, create_stub_app
+    from backend.benchmarks.results import rss_mb, write_results
+    from backend.main import app
+
+    logging.getLogger().setLevel(logging.WARNING)
+    stub_config = StubConfig(latency=args.latency, error_rate=args.error_rate, throttle_rate=args.throttle_rate)
+    with StubServer(app=create_stub_app(stub_config), port=STUB_PORT), StubServer(app=app, port=API_PORT):
+        metrics = asyncio.run(drive(f"http://127.0.0.1:{API_PORT}", args.rate, args.duration, args.poll))
+    metrics.update(rss_mb())
+
+    nim = metrics.pop("nim_requests")
+    statuses = metrics.pop("statuses")
+    print(f"Jobs: submitted={metrics['submitted']}  completed={metrics['completed']}  rejected={metrics['rejected']}  {statuses}")
+    print(f"Throughput: {metrics['throughput_jobs_per_s']} jobs/s at {args.rate} jobs/s offered")
+    print(f"Job latency:  p50={metrics['job_p50_ms']}ms  p95={metrics['job_p95_ms']}ms  p99={metrics['job_p99_ms']}ms")
+    print(f"Step latency: p50={metrics['step_p50_ms']}ms  p95={metrics['step_p95_ms']}ms  p99={metrics['step_p99_ms']}ms")
+    print(f"RSS: {metrics['rss_mb']}MB (peak {metrics['peak_rss_mb']}MB)  stub requests: {stub_config.requests}  NIM retries: {nim.get('retries')}")
+    write_results("bench_jobs", vars(args), metrics, output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=5, help="Job arrivals per second")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of arrivals")
+    parser.add_argument("--latency", default="lognormal:20:0.5", help="Stub latency distribution")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--poll", type=float, default=0.1, help="Job status poll interval")
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    main(parser.parse_args())
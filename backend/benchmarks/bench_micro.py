@@ -0,0 +1,102 @@
+"""
+Micro-benchmarks of the hot service paths, run against the NIM stub and scratch storage:
+RAGService add/query (dense, lexical, hybrid), DBService writes and CoderAgent._execute_code.
+Reports ops/s and mean/p95 latency per operation.
+
+Usage: python -m backend.benchmarks.bench_micro [--docs 2000] [--queries 200] [--db-ops 500] [--runs 50] [--output micro.json]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+STUB_PORT = 8769
+CODE = "total = sum(i * i for i in range(10000))\nprint(total)\n"
+
+async def measure(name: str, operations: int, op: Callable[[int], Awaitable[Any]]) -> Dict[str, float]:
+    latencies: List[float] = []
+    start = time.perf_counter()
+    for i in range(operations):
+        op_start = time.perf_counter()
+        await op(i)
+        latencies.append(time.perf_counter() - op_start)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    mean_ms = sum(latencies) / len(latencies) * 1000
+    p95_ms = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+    print(f"{name:>22}: {operations / elapsed:9.1f} ops/s  mean={mean_ms:8.3f}ms  p95={p95_ms:8.3f}ms")
+    return {f"{name}_ops_per_s": round(operations / elapsed, 1), f"{name}_mean_ms": round(mean_ms, 3), f"{name}_p95_ms": round(p95_ms, 3)}
+
+async def bench_rag(docs: int, queries: int, batch: int) -> Dict[str, float]:
+    from backend.services.rag import RAGService
+
+    rag = RAGService(directory="rag_bench")
+    texts = [f"document {i} about topic {i % 50} with keywords alpha{i % 7} beta{i % 11}" for i in range(docs)]
+    metrics = await measure("rag_add_batch", docs // batch, lambda i: rag.add_documents(
+        texts[i * batch:(i + 1) * batch], [{"source": "bench", "job_id": "bench"}] * batch
+    ))
+    for mode in ("dense", "lexical", "hybrid"):
+        metrics.update(await measure(f"rag_query_{mode}", queries, lambda i: rag.query(f"topic {i % 50} alpha{i % 7}", k=5, mode=mode)))
+    return metrics
+
+async def bench_db(operations: int) -> Dict[str, float]:
+    from backend.services.db import DBService
+
+    db = DBService()
+    metrics = await measure("db_create_job", operations, lambda i: asyncio.to_thread(db.create_job, f"bench_{i}", "objective"))
+    metrics.update(await measure("db_update_job_status", operations, lambda i: asyncio.to_thread(db.update_job_status, f"bench_{i}", "completed")))
+    metrics.update(await measure("db_log_audit", operations, lambda i: asyncio.to_thread(db.log_audit, f"bench_{i}", "bench", {"step": i})))
+    return metrics
+
+async def bench_coder(runs: int) -> Dict[str, float]:
+    from backend.agents.coder import CoderAgent
+    from backend.services.sandbox import sandbox_pool
+
+    agent = CoderAgent("bench")
+    await sandbox_pool.start()
+    try:
+        # Distinct source per run so the execution cache never answers
+        return await measure("coder_execute_code", runs, lambda i: agent._execute_code(f"# run {i}\n{CODE}"))
+    finally:
+        await sandbox_pool.stop()
+
+async def main(args: argparse.Namespace) -> Dict[str, float]:
+    from backend.utils.nim_client import nim_client
+
+    await nim_client.startup()
+    try:
+        metrics = await bench_rag(args.docs, args.queries, args.batch)
+        metrics.update(await bench_db(args.db_ops))
+        metrics.update(await bench_coder(args.runs))
+    finally:
+        await nim_client.aclose()
+    return metrics
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--db-ops", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    # Services read their configuration at import time: scratch storage and the stub first
+    output = os.path.abspath(args.output) if args.output else None
+    os.chdir(tempfile.mkdtemp(prefix="bench_micro_"))
+    os.environ.setdefault("NVIDIA_API_KEY", "stub")
+    os.environ["NIM_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+
+    import logging
+    from backend.benchmarks.nim_stub import StubConfig, StubServer, create_stub_app
+    from backend.benchmarks.results import rss_mb, write_results
+
+    logging.getLogger("backend").setLevel(logging.WARNING)
+    with StubServer(app=create_stub_app(StubConfig(latency="fixed:1")), port=STUB_PORT):
+        metrics = asyncio.run(main(args))
+    metrics.update(rss_mb())
+    print(f"RSS: {metrics['rss_mb']}MB (peak {metrics['peak_rss_mb']}MB)")
+    write_results("bench_micro", vars(args), metrics, output)
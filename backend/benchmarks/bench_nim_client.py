@@ -0,0 +1,74 @@
+"""
+Compares per-call client creation against the shared pooled NIMClient transport.
+
+Usage: python -m backend.benchmarks.bench_nim_client [--calls 500] [--concurrency 20]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+
+from backend.benchmarks.nim_stub import StubServer
+from backend.utils.nim_client import NIMClient
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+async def _per_call_client(client: NIMClient) -> None:
+    # Reproduces the original behaviour: a fresh AsyncClient (and TCP handshake) for every request
+    async with httpx.AsyncClient() as http:
+        response = await http.post(
+            f"{client.base_url}/chat/completions",
+            json={"model": "stub", "messages": MESSAGES, "stream": False},
+            headers=client.headers,
+        )
+        response.raise_for_status()
+
+async def _pooled_client(client: NIMClient) -> None:
+    await client.chat_completion("stub", MESSAGES)
+
+async def _run(label: str, call, client: NIMClient, calls: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call(client)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    result = {
+        "mode": label,
+        "calls": calls,
+        "throughput_rps": calls / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+    print(f"{label:>10}: {result['throughput_rps']:8.1f} req/s  p50={result['p50_ms']:.2f}ms  p95={result['p95_ms']:.2f}ms")
+    return result
+
+async def main(calls: int, concurrency: int, base_url: str) -> List[dict]:
+    client = NIMClient(api_key="stub", base_url=base_url)
+    await client.startup()
+    try:
+        before = await _run("per-call", _per_call_client, client, calls, concurrency)
+        after = await _run("pooled", _pooled_client, client, calls, concurrency)
+    finally:
+        await client.aclose()
+    return [before, after]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    with StubServer() as stub:
+        asyncio.run(main(args.calls, args.concurrency, stub.base_url))
@@ -0,0 +1,107 @@
+"""
+NIM client behaviour against a flaky upstream: a stub that enforces a request quota with 429 +
+Retry-After, fails a share of requests with 503 and has a slow tail. A burst above the quota is run
+with retries and rate limiting turned off (the original behaviour) and with the adaptive limiter and
+jittered retries; then traffic within the quota is run with and without hedged requests.
+
+Usage: python -m backend.benchmarks.bench_nim_resilience [--calls 1000] [--concurrency 50] [--tail-concurrency 2] [--quota 200]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import time
+from typing import Any, Dict, List
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from backend.benchmarks.nim_stub import StubServer
+from backend.utils.nim_client import NIMClient
+from backend.utils.rate_limiter import AdaptiveRateLimiter, TokenBucket
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+ERROR_RATE = float(os.getenv("NIM_STUB_ERROR_RATE", "0.05"))
+SLOW_RATE = float(os.getenv("NIM_STUB_SLOW_RATE", "0.03"))
+BASE_LATENCY = 0.02
+SLOW_LATENCY = 0.5
+
+def flaky_app(quota: float) -> FastAPI:
+    app = FastAPI(title="Flaky NIM Stub")
+    bucket = TokenBucket(quota, quota / 10)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(payload: Dict[str, Any]):
+        if not bucket.try_acquire():
+            return JSONResponse({"error": "rate limited"}, status_code=429, headers={"Retry-After": "0.2"})
+        roll = random.random()
+        if roll < ERROR_RATE:
+            return JSONResponse({"error": "unavailable"}, status_code=503)
+        await asyncio.sleep(SLOW_LATENCY if roll > 1 - SLOW_RATE else BASE_LATENCY * random.uniform(0.5, 1.5))
+        return {
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+
+    return app
+
+async def run(label: str, client: NIMClient, calls: int, concurrency: int, hedge: bool):
+    latencies: List[float] = []
+    failures = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await client.chat_completion("stub", MESSAGES, temperature=1.0, use_cache=False, deadline=10, hedge=hedge)
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else 0.0
+    print(
+        f"{label:>9}: ok={len(latencies):5d}  failed={failures:4d}  {len(latencies) / elapsed:7.1f} ok/s  "
+        f"p50={statistics.median(latencies) * 1000 if latencies else 0:6.1f}ms  p95={pct(0.95):6.1f}ms  p99={pct(0.99):6.1f}ms"
+    )
+    print(f"{'':>9}  {client.stats()}")
+
+async def main(calls: int, concurrency: int, tail_concurrency: int, quota: float, base_url: str):
+    for label, retries, rps, hedge, parallel in (
+        ("naive", 0, 0, False, concurrency),
+        ("adaptive", 5, quota * 2, False, concurrency),
+        ("unhedged", 5, quota * 2, False, tail_concurrency),
+        ("hedged", 5, quota * 2, True, tail_concurrency),
+    ):
+        client = NIMClient(api_key="stub", base_url=base_url)
+        client.max_retries = retries
+        # Deliberately start above the stub's quota so the limiter has to find it
+        client.limiter = AdaptiveRateLimiter(rps=rps)
+        client.hedge_delay = 0.05
+        await client.startup()
+        try:
+            await run(label, client, calls, parallel, hedge)
+        finally:
+            await client.aclose()
+        await asyncio.sleep(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--tail-concurrency", type=int, default=2)
+    parser.add_argument("--quota", type=float, default=200)
+    args = parser.parse_args()
+
+    # Every retried or failed call logs a warning; keep the report readable
+    logging.getLogger("backend").setLevel(logging.CRITICAL)
+    with StubServer(app=flaky_app(args.quota), port=8766) as stub:
+        asyncio.run(main(args.calls, args.concurrency, args.tail_concurrency, args.quota, stub.base_url))
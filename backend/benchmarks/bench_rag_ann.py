@@ -0,0 +1,71 @@
+"""
+Recall@k and QPS of the approximate RAG index engines against the exact flat baseline.
+
+Usage: python -m backend.benchmarks.bench_rag_ann [--sizes 100000 1000000] [--dim 128] [--queries 1000] [--k 10]
+"""
+import argparse
+import time
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+from backend.services.ann import build_index, sample_rows, search_params, RAG_TRAIN_SAMPLE
+
+def clustered_vectors(n: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    # Embeddings are clustered by topic; uniform random data would understate ANN recall
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32) * 4
+    labels = rng.integers(0, clusters, size=n)
+    return centers[labels] + rng.standard_normal((n, dim), dtype=np.float32)
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+def timed_search(index: faiss.Index, queries: np.ndarray, k: int, params=None):
+    start = time.perf_counter()
+    if params is None:
+        _, found = index.search(queries, k)
+    else:
+        _, found = index.search(queries, k, params=params)
+    return found, len(queries) / (time.perf_counter() - start)
+
+def run(size: int, dim: int, n_queries: int, k: int) -> List[Dict]:
+    data = clustered_vectors(size, dim)
+    queries = clustered_vectors(n_queries, dim, seed=1)
+    results = []
+
+    flat = build_index("flat", dim)
+    flat.add(data)
+    truth, qps = timed_search(flat, queries, k)
+    results.append({"size": size, "engine": "flat", "param": None, "recall": 1.0, "qps": qps})
+
+    sample = data[sample_rows(size, RAG_TRAIN_SAMPLE)]
+    sweeps = {"ivfpq": ("nprobe", [1, 8, 32, 64]), "hnsw": ("ef_search", [16, 64, 128, 256])}
+    for engine, (knob, values) in sweeps.items():
+        start = time.perf_counter()
+        index = build_index(engine, dim, sample if engine == "ivfpq" else None, size)
+        index.add(data)
+        build_seconds = time.perf_counter() - start
+        for value in values:
+            params = search_params(index, **{knob: value})
+            found, qps = timed_search(index, queries, k, params)
+            results.append({
+                "size": size, "engine": engine, "param": f"{knob}={value}",
+                "recall": recall_at_k(found, truth), "qps": qps, "build_seconds": build_seconds,
+            })
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'size':>9} {'engine':>6} {'param':>14} {'recall@' + str(args.k):>10} {'qps':>10}")
+    for size in args.sizes:
+        for row in run(size, args.dim, args.queries, args.k):
+            print(f"{row['size']:>9} {row['engine']:>6} {str(row['param'] or '-'):>14} {row['recall']:>10.3f} {row['qps']:>10.0f}")
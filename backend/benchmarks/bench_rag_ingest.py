@@ -0,0 +1,47 @@
+"""
+Measures RAGService add latency as the corpus grows. Vectors are random, so no embedding calls are made.
+
+Usage: python -m backend.benchmarks.bench_rag_ingest [--total 1000000] [--batch 256] [--dim 128]
+"""
+import argparse
+import asyncio
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from backend.services.rag import RAGService
+
+async def main(total: int, batch: int, dim: int, report_every: int):
+    directory = tempfile.mkdtemp(prefix="rag_bench_")
+    service = RAGService(directory=directory)
+    rng = np.random.default_rng(0)
+    latencies = []
+    added = 0
+    try:
+        while added < total:
+            vectors = rng.standard_normal((batch, dim), dtype=np.float32)
+            texts = [f"chunk {added + i}" for i in range(batch)]
+            metadatas = [{"text": text} for text in texts]
+            start = time.perf_counter()
+            await service.add_vectors(vectors, texts, metadatas)
+            latencies.append(time.perf_counter() - start)
+            added += batch
+            if added % report_every < batch:
+                window = latencies[-50:]
+                print(f"corpus={added:>9}  add p50={statistics.median(window) * 1000:7.2f}ms  max={max(window) * 1000:7.2f}ms  segments={len(service.store.segments())}")
+        if service._merge_task is not None:
+            await service._merge_task
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--total", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=256)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--report-every", type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.total, args.batch, args.dim, args.report_every))
@@ -0,0 +1,85 @@
+"""
+Small-script execution latency and throughput: a fresh `python` subprocess per run (the original
+CoderAgent behaviour) versus the warm sandbox pool. Then a generated test suite run as one script
+versus sharded per test case, and re-run against the execution cache.
+
+Usage: python -m backend.benchmarks.bench_sandbox [--runs 100] [--concurrency 8] [--tests 32]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+from backend.services.sandbox import ExecutionCache, SandboxPool
+
+SCRIPT = """
+import json, collections
+counts = collections.Counter("the quick brown fox jumps over the lazy dog".split())
+print(json.dumps(counts.most_common(2)))
+"""
+
+def test_suite(tests: int) -> str:
+    cases = "".join(f"def test_case_{i}():\n    time.sleep(0.05)\n    assert sum(range({i})) == {i * (i - 1) // 2}\n\n" for i in range(tests))
+    runner = "if __name__ == '__main__':\n" + "".join(f"    test_case_{i}()\n" for i in range(tests))
+    return "import time\n\n" + cases + runner
+
+def run_subprocess(code: str):
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
+        f.write(code)
+    try:
+        subprocess.run([sys.executable, f.name], capture_output=True, text=True, timeout=30)
+    finally:
+        os.unlink(f.name)
+
+async def measure(label: str, runs: int, concurrency: int, action) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await action()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(runs)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:>10}: p50={statistics.median(latencies) * 1000:7.1f}ms  {runs / elapsed:7.1f} runs/s")
+
+async def main(runs: int, concurrency: int, tests: int):
+    await measure("subprocess", runs, concurrency, lambda: asyncio.to_thread(run_subprocess, SCRIPT))
+
+    directory = tempfile.mkdtemp(prefix="sandbox_bench_")
+    pool = SandboxPool(workers=concurrency, cache=ExecutionCache(path=os.path.join(directory, "exec_cache.db")))
+    await pool.start()
+    try:
+        await measure("pooled", runs, 1, lambda: pool.run(SCRIPT, use_cache=False))
+        await measure("pooled", runs, concurrency, lambda: pool.run(SCRIPT, use_cache=False))
+
+        suite = test_suite(tests)
+        for label, action in (
+            ("whole", lambda: pool.run(suite, use_cache=False)),
+            ("sharded", lambda: pool.run_tests(suite)),
+            ("cached", lambda: pool.run_tests(suite)),
+        ):
+            start = time.perf_counter()
+            await action()
+            print(f"{label:>10}: {tests} tests in {(time.perf_counter() - start) * 1000:7.1f}ms")
+        print(pool.stats())
+    finally:
+        await pool.stop()
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tests", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.concurrency, args.tests))
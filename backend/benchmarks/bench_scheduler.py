@@ -0,0 +1,83 @@
+"""
+Overload behaviour: a burst of jobs larger than the NIM quota can serve within the job deadline, run
+once with every job started immediately (the original POST /jobs behaviour) and once through the
+job scheduler with admission control. Reports goodput (jobs finished within their deadline),
+rejections with their Retry-After, and latency of the jobs that did complete.
+
+Usage: python -m backend.benchmarks.bench_scheduler [--jobs 200] [--quota 8] [--deadline 3]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from backend.services.scheduler import JobScheduler, QueueFullError
+
+CALLS_PER_JOB = 3
+CALL_SECONDS = 0.05
+
+class QuotaStub:
+    """
+    Upstream that serves at most `quota` calls at a time, like a rate-limited NIM endpoint.
+    """
+    def __init__(self, quota: int):
+        self.semaphore = asyncio.Semaphore(quota)
+
+    async def call(self):
+        async with self.semaphore:
+            await asyncio.sleep(CALL_SECONDS)
+
+async def job(stub: QuotaStub, submitted: float, deadline: float, latencies: List[float]):
+    async def calls():
+        for _ in range(CALLS_PER_JOB):
+            await stub.call()
+    remaining = deadline - (time.perf_counter() - submitted)
+    try:
+        await asyncio.wait_for(calls(), max(remaining, 0.001))
+        latencies.append(time.perf_counter() - submitted)
+    except asyncio.TimeoutError:
+        pass
+
+def report(label: str, jobs: int, latencies: List[float], rejected: int, elapsed: float, retry_after: List[float]):
+    p95 = sorted(latencies)[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+    timed_out = jobs - len(latencies) - rejected
+    print(
+        f"{label:>10}: completed={len(latencies):4d}  timed_out={timed_out:4d}  rejected={rejected:4d}  "
+        f"p50={statistics.median(latencies) if latencies else 0:.2f}s  p95={p95:.2f}s  "
+        f"goodput={len(latencies) / elapsed:6.1f} jobs/s"
+        + (f"  retry_after={min(retry_after):.0f}-{max(retry_after):.0f}s" if retry_after else "")
+    )
+
+async def main(jobs: int, quota: int, deadline: float):
+    stub = QuotaStub(quota)
+    latencies: List[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(job(stub, time.perf_counter(), deadline, latencies) for _ in range(jobs)))
+    report("unbounded", jobs, latencies, 0, time.perf_counter() - start, [])
+
+    stub = QuotaStub(quota)
+    # Enough queue for the jobs that can be served within the deadline at this concurrency
+    capacity = int(deadline / (CALLS_PER_JOB * CALL_SECONDS)) * quota
+    scheduler = JobScheduler(concurrency=quota, max_queue=capacity - quota, max_queue_per_tenant=jobs)
+    latencies, rejected, retry_after = [], 0, []
+    start = time.perf_counter()
+    for i in range(jobs):
+        submitted = time.perf_counter()
+        try:
+            scheduler.submit(f"job_{i}", lambda submitted=submitted: job(stub, submitted, deadline, latencies))
+        except QueueFullError as e:
+            rejected += 1
+            retry_after.append(e.retry_after)
+    while scheduler.stats()["running"] or scheduler.stats()["queued"]:
+        await asyncio.sleep(0.01)
+    report("scheduled", jobs, latencies, rejected, time.perf_counter() - start, retry_after)
+    print(scheduler.stats())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--quota", type=int, default=8)
+    parser.add_argument("--deadline", type=float, default=3.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.jobs, args.quota, args.deadline))
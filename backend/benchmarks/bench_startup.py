@@ -0,0 +1,97 @@
+"""
+Cold start cost: import time of the API, the worker and each agent module, each measured in a fresh
+interpreter with `python -X importtime`, the slowest modules behind them, and the time from
+launching the API server until /health answers.
+
+Usage: python -m backend.benchmarks.bench_startup [--repeat 3] [--top 15] [--output startup.json]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+from backend.agents.registry import AGENT_PATHS
+from backend.benchmarks.results import write_results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SERVER_PORT = 8770
+
+def import_times(module: str, workdir: str) -> Tuple[float, Dict[str, int]]:
+    """
+    Total wall time of importing `module` in a new interpreter, and cumulative microseconds per imported module.
+    """
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True,
+    )
+    elapsed = time.perf_counter() - start
+    cumulative: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        # Nesting is shown by indentation; the first (outermost) entry for a name is the one that counts
+        cumulative.setdefault(name.strip(), int(cumulative_us))
+    return elapsed, cumulative
+
+def time_to_health(workdir: str) -> float:
+    env = {**os.environ, "PYTHONPATH": ROOT, "NVIDIA_API_KEY": "stub"}
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(SERVER_PORT), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{SERVER_PORT}/health", timeout=1).read()
+                return time.perf_counter() - start
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError("API server exited during startup")
+                time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+
+def main(repeat: int, top: int, output: Optional[str]):
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    modules = ["backend.main", "backend.worker"] + [path.split(":")[0] for path in AGENT_PATHS.values()]
+    metrics: Dict[str, float] = {}
+    slowest: Dict[str, int] = {}
+    for module in modules:
+        imports: List[float] = []
+        processes: List[float] = []
+        for _ in range(repeat):
+            elapsed, cumulative = import_times(module, workdir)
+            imports.append(cumulative.get(module, 0) / 1000)
+            processes.append(elapsed * 1000)
+        metrics[f"import_{module}_ms"] = round(statistics.median(imports), 1)
+        print(f"{module:<28} import={statistics.median(imports):7.1f}ms  process={statistics.median(processes):7.1f}ms")
+        if module == "backend.main":
+            slowest = cumulative
+
+    print("\nSlowest imports under backend.main (cumulative):")
+    ranked = sorted(((us, name) for name, us in slowest.items() if name != "backend.main"), reverse=True)
+    for us, name in ranked[:top]:
+        print(f"  {name:<40} {us / 1000:7.1f}ms")
+
+    health = [time_to_health(workdir) for _ in range(repeat)]
+    metrics["time_to_health_ms"] = round(statistics.median(health) * 1000, 1)
+    print(f"\nLaunch to first /health response: {metrics['time_to_health_ms']}ms (median of {repeat})")
+    write_results("bench_startup", {"repeat": repeat}, metrics, output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    args = parser.parse_args()
+    main(args.repeat, args.top, os.path.abspath(args.output) if args.output else None)
@@ -0,0 +1,232 @@
+"""
+NIM-compatible stub server for local benchmarks and load tests.
+
+Serves /v1/chat/completions (streaming and not), /v1/embeddings and /v1/images/generations with a
+configurable latency distribution and error rates. Chat prompts are recognised by agent (planner,
+PPT, verifier, coder, safety) and answered with canned content in the shape each agent parses, so
+whole jobs run end to end without the live endpoint.
+
+Run standalone with `python -m backend.benchmarks.nim_stub` and point NIM_BASE_URL at it.
+
+Configuration (environment):
+  NIM_STUB_LATENCY        fixed:5 | uniform:5:20 | lognormal:<median ms>:<sigma> | exponential:<mean ms>
+  NIM_STUB_TOKEN_DELAY_MS generation time per word (between streamed chunks, or in total before a non-streamed reply)
+  NIM_STUB_ERROR_RATE     share of requests answered with 503
+  NIM_STUB_THROTTLE_RATE  share of requests answered with 429 + Retry-After
+  NIM_STUB_CANNED         JSON file overriding canned responses, e.g. {"planner": {...}}
+"""
+import asyncio
+import base64
+import json
+import math
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+
+STUB_LATENCY_MS = float(os.getenv("NIM_STUB_LATENCY_MS", "5"))
+EMBED_DIM = int(os.getenv("NIM_STUB_EMBED_DIM", "1024"))
+
+CANNED: Dict[str, Any] = {
+    "planner": {
+        "plan": [
+            {"step_id": 1, "agent": "coder", "instruction": "Implement and test a word frequency counter", "dependencies": []},
+            {"step_id": 2, "agent": "verifier", "instruction": "Review the implementation", "dependencies": [1]},
+            {"step_id": 3, "agent": "ppt", "instruction": "Summarise the result in slides", "dependencies": [1]},
+        ]
+    },
+    "ppt": {
+        "slides": [
+            {"title": f"Slide {i}", "content": [f"Point {i}.1", f"Point {i}.2", f"Point {i}.3"]}
+            for i in range(1, 6)
+        ]
+    },
+    "verifier": {"is_valid": True, "issues": [], "confidence_score": 0.92},
+    "coder": (
+        "```python\n"
+        "from collections import Counter\n\n"
+        "def count_words(text):\n"
+        "    return Counter(text.lower().split())\n\n"
+        "def test_count_words():\n"
+        "    assert count_words('a b a')['a'] == 2\n\n"
+        "def test_empty():\n"
+        "    assert count_words('') == Counter()\n\n"
+        "if __name__ == '__main__':\n"
+        "    test_count_words()\n"
+        "    test_empty()\n"
+        "    print('ok')\n"
+        "```"
+    ),
+    "safety": "YES: The objective is safe.",
+    "default": "YES: stub response",
+}
+
+# Checked in order against the prompt; the first marker found selects the canned response
+PROMPT_MARKERS = (
+    ("safety", "safe to proceed"),
+    ("planner", "project planner"),
+    ("ppt", "presentation outline"),
+    ("verifier", "Verify the following content"),
+    ("coder", "expert Python developer"),
+)
+
+# 1x1 transparent PNG
+STUB_IMAGE = base64.b64encode(bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c63000100000500010d0a2db40000000049454e44ae426082"
+)).decode()
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Returns a sampler (in seconds) for a latency spec such as "lognormal:20:0.5".
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(":") if v]
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal":
+        mu, sigma = math.log(values[0]), values[1]
+        return lambda: random.lognormvariate(mu, sigma) / 1000
+    if kind == "exponential":
+        return lambda: random.expovariate(1 / values[0]) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+def classify_prompt(payload: Dict[str, Any]) -> str:
+    text = " ".join(m.get("content") or "" for m in payload.get("messages", []))
+    for kind, marker in PROMPT_MARKERS:
+        if marker in text:
+            return kind
+    return "default"
+
+class StubConfig:
+    def __init__(
+        self,
+        latency: Optional[str] = None,
+        token_delay_ms: float = float(os.getenv("NIM_STUB_TOKEN_DELAY_MS", "0")),
+        error_rate: float = float(os.getenv("NIM_STUB_ERROR_RATE", "0")),
+        throttle_rate: float = float(os.getenv("NIM_STUB_THROTTLE_RATE", "0")),
+        canned_path: Optional[str] = os.getenv("NIM_STUB_CANNED"),
+    ):
+        self.latency = parse_latency(latency or os.getenv("NIM_STUB_LATENCY", f"fixed:{STUB_LATENCY_MS}"))
+        self.token_delay = token_delay_ms / 1000
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.canned = dict(CANNED)
+        if canned_path:
+            with open(canned_path) as f:
+                self.canned.update(json.load(f))
+        self.requests: Dict[str, int] = {}
+
+    def content_for(self, payload: Dict[str, Any]) -> str:
+        canned = self.canned[classify_prompt(payload)]
+        return canned if isinstance(canned, str) else json.dumps(canned)
+
+    def failure(self) -> Optional[JSONResponse]:
+        roll = random.random()
+        if roll < self.throttle_rate:
+            return JSONResponse({"error": "rate limited"}, status_code=429, headers={"Retry-After": "1"})
+        if roll < self.throttle_rate + self.error_rate:
+            return JSONResponse({"error": "service unavailable"}, status_code=503)
+        return None
+
+def create_stub_app(config: Optional[StubConfig] = None) -> FastAPI:
+    config = config or StubConfig()
+    app = FastAPI(title="NIM Stub")
+    app.state.config = config
+
+    async def admit(endpoint: str) -> Optional[JSONResponse]:
+        config.requests[endpoint] = config.requests.get(endpoint, 0) + 1
+        await asyncio.sleep(config.latency())
+        return config.failure()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(payload: Dict[str, Any]):
+        failure = await admit("chat")
+        if failure is not None:
+            return failure
+        content = config.content_for(payload)
+        if payload.get("stream"):
+            async def chunks():
+                # Roughly one chunk per word, like token deltas
+                for token in content.split(" "):
+                    chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": token + " "}}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    if config.token_delay:
+                        await asyncio.sleep(config.token_delay)
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(chunks(), media_type="text/event-stream")
+        prompt_tokens = sum(len((m.get("content") or "").split()) for m in payload.get("messages", []))
+        completion_tokens = len(content.split())
+        if config.token_delay:
+            # Generation takes as long whether or not it is streamed
+            await asyncio.sleep(config.token_delay * len(content.split(" ")))
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    @app.post("/v1/embeddings")
+    async def embeddings(payload: Dict[str, Any]):
+        failure = await admit("embeddings")
+        if failure is not None:
+            return failure
+        inputs = payload.get("input")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        data = []
+        for i, text in enumerate(inputs):
+            seed = sum(map(ord, text)) or 1
+            data.append({"index": i, "object": "embedding", "embedding": [((seed * (j + 1)) % 997) / 997.0 for j in range(EMBED_DIM)]})
+        return {"object": "list", "data": data, "model": payload.get("model")}
+
+    @app.post("/v1/images/generations")
+    async def images(payload: Dict[str, Any]):
+        failure = await admit("images")
+        if failure is not None:
+            return failure
+        return {"created": int(time.time()), "data": [{"b64_json": STUB_IMAGE} for _ in range(payload.get("n", 1))]}
+
+    @app.get("/v1/stub/stats")
+    async def stats():
+        return {"requests": config.requests}
+
+    return app
+
+stub_app = create_stub_app()
+
+class StubServer:
+    """
+    Runs the stub app on a background thread so benchmarks can drive it from their own event loop.
+    """
+    def __init__(self, app: FastAPI = stub_app, host: str = "127.0.0.1", port: int = 8765):
+        self.host = host
+        self.port = port
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+if __name__ == "__main__":
+    uvicorn.run(stub_app, host="127.0.0.1", port=int(os.getenv("NIM_STUB_PORT", "8765")))
@@ -0,0 +1,97 @@
+"""
+Machine-readable benchmark results, so runs can be compared across versions.
+
+Benchmarks that accept `--output` write a JSON document with the git revision, host and Python
+version next to their metrics. Compare two runs with:
+
+    python -m backend.benchmarks.results before.json after.json [--threshold 10]
+
+Metrics are flat name -> number maps; names ending in `_ms`, `_seconds`, `_mb` or `_bytes` are
+lower-is-better, everything else (throughput, rates) is higher-is-better.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Optional
+
+LOWER_IS_BETTER = ("_ms", "_seconds", "_mb", "_bytes")
+
+def _git_revision() -> Optional[str]:
+    try:
+        # Benchmarks chdir into scratch directories; ask the checkout this module lives in
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def rss_mb() -> Dict[str, float]:
+    """
+    Current and peak resident set size of this process.
+    """
+    current = 0.0
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    current = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    return {"rss_mb": round(current, 1), "peak_rss_mb": round(peak_mb, 1)}
+
+def write_results(benchmark: str, params: Dict[str, Any], metrics: Dict[str, float], path: Optional[str]):
+    """
+    Writes one benchmark run to `path` (no-op without a path).
+    """
+    if not path:
+        return
+    document = {
+        "benchmark": benchmark,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": params,
+        "metrics": metrics,
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    print(f"Results written to {path}")
+
+def compare(before: Dict[str, Any], after: Dict[str, Any], threshold: float) -> int:
+    """
+    Prints per-metric changes and returns the number of regressions beyond `threshold` percent.
+    """
+    print(f"{before['benchmark']}: {before.get('revision')} -> {after.get('revision')}")
+    regressions = 0
+    for name in sorted(set(before["metrics"]) & set(after["metrics"])):
+        old, new = before["metrics"][name], after["metrics"][name]
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)):
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        worse = change > threshold if name.endswith(LOWER_IS_BETTER) else change < -threshold
+        regressions += worse
+        print(f"  {name:<32} {old:>12.3f} -> {new:>12.3f}  {change:+7.1f}%{'  REGRESSION' if worse else ''}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change counted as a regression")
+    args = parser.parse_args()
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    sys.exit(1 if compare(before, after, args.threshold) else 0)
@@ -0,0 +1,42 @@
+"""
+Threaded static HTTP server for benchmarks that need real pages (browser, crawler).
+"""
+import functools
+import os
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class StaticServer:
+    """
+    Serves `pages` (relative path -> content) from a temporary directory on a background thread.
+    SimpleHTTPRequestHandler sends Last-Modified and honours If-Modified-Since, which the crawler cache uses.
+    """
+    def __init__(self, pages: Dict[str, str], host: str = "127.0.0.1", port: int = 0, directory: Optional[str] = None):
+        self.directory = directory or tempfile.mkdtemp(prefix="static_")
+        for path, content in pages.items():
+            full_path = os.path.join(self.directory, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, "w") as f:
+                f.write(content)
+        handler = functools.partial(_QuietHandler, directory=self.directory)
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
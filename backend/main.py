@@ -1,9 +1,14 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+from contextlib import asynccontextmanager
 import uvicorn
+import asyncio
 import os
+import time
+import json
 import logging
 from dotenv import load_dotenv
 
@@ -14,7 +19,55 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Manus Agent Platform", version="1.0.0")
+from backend.utils.nim_client import nim_client
+from backend.services.events import event_bus
+from backend.services.audit import audit_sink
+from backend.services.job_store import job_store
+from backend.services.scheduler import job_scheduler, QueueFullError, PRIORITIES
+from backend.utils.llm_cache import llm_cache
+from backend.utils.telemetry import tracer, render_metrics
+from backend.services.executor import DAGExecutor, StepStream, load_workflow, normalize_plan
+from backend.services.safety import safety_service
+from backend.services.task_queue import task_queue, RemoteAgent, is_remote
+from backend.agents.registry import AGENT_SERVICES, create_agent as create_local_agent, loaded_services, warm_up as warm_up_agents, stats as agent_stats
+
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+SPECULATIVE_PLANNING = os.getenv("SPECULATIVE_PLANNING", "true").lower() in ("1", "true", "yes")
+STREAMED_PLANNING = os.getenv("STREAMED_PLANNING", "true").lower() in ("1", "true", "yes")
+
+# Planning started alongside the safety check: how often it was used or thrown away, and what it cost/saved
+speculation_stats = {"started": 0, "used": 0, "cancelled": 0, "wasted_seconds": 0.0, "saved_seconds": 0.0}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared resources live for the whole process and are torn down cleanly on shutdown
+    await nim_client.startup()
+    await audit_sink.start()
+    job_store.start_archiver()
+    # Agent modules and their services load in the background while requests are already served
+    warm_up = asyncio.create_task(warm_up_agents())
+    try:
+        yield
+    finally:
+        warm_up.cancel()
+        await asyncio.gather(warm_up, return_exceptions=True)
+        await job_scheduler.stop()
+        await job_store.close()
+        await task_queue.close()
+        services = loaded_services()
+        if "browser_pool" in services:
+            await services["browser_pool"].stop()
+        if "crawler" in services:
+            await services["crawler"].aclose()
+        if "sandbox" in services:
+            await services["sandbox"].stop()
+        if "plan_cache" in services:
+            services["plan_cache"].close()
+        await audit_sink.stop()
+        await nim_client.aclose()
+        llm_cache.close()
+
+app = FastAPI(title="Manus Agent Platform", version="1.0.0", lifespan=lifespan)
 
 # CORS Configuration
 app.add_middleware(
@@ -30,6 +83,8 @@ class JobRequest(BaseModel):
     objective: str
     selected_agents: List[str] = ["planner", "researcher", "coder", "verifier"]
     constraints: Optional[Dict[str, Any]] = {}
+    priority: str = "normal"
+    tenant: str = "default"
 
 class JobResponse(BaseModel):
     job_id: str
@@ -41,58 +96,274 @@ class JobResponse(BaseModel):
 async def health_check():
     return {"status": "healthy", "service": "manus-backend"}
 
-# In-memory job storage (for demo purposes)
-jobs_db = {}
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats")
+async def get_stats():
+    # Agent services not loaded in this process are reported as such rather than imported for the occasion
+    services = loaded_services()
+    agent_services = {key: services[key].stats() if key in services else {"loaded": False} for key in AGENT_SERVICES}
+    return {"nim": nim_client.stats(), "llm_cache": llm_cache.stats(), "audit": audit_sink.stats(), "jobs": job_store.stats(), "agents": agent_stats(), **agent_services, "safety": safety_service.stats(), "speculation": speculation_stats, "tracing": tracer.stats(), "scheduler": job_scheduler.stats(), "task_queue": {**task_queue.stats(), "workers": await task_queue.workers()}}
+
+def create_agent(agent_name: str, job_id: str):
+    # Agent types listed in REMOTE_AGENTS run in `python -m backend.worker` processes
+    if is_remote(agent_name):
+        return RemoteAgent(agent_name, job_id)
+    return create_local_agent(agent_name, job_id)
+
+executor = DAGExecutor(create_agent)
+
+async def append_job_log(job_id: str, agent: str, message: str):
+    await audit_sink.log(job_id, f"{agent}:log", {"message": message})
+
+def start_planning(job_id: str, job: JobRequest) -> StepStream | asyncio.Task:
+    """
+    Starts the planner. With streamed planning the result is a StepStream the executor consumes while
+    the plan is still being generated; otherwise a task resolving to the whole plan.
+    """
+    planner = create_local_agent("planner", job_id)
+    if STREAMED_PLANNING and (job.constraints or {}).get("streamed_planning", True):
+        return StepStream(lambda on_step: planner.run({"objective": job.objective}, on_step=on_step))
+    return asyncio.create_task(planner.run({"objective": job.objective}))
+
+async def gate_and_plan(job_id: str, job: JobRequest) -> Tuple[bool, str, Any, Dict[str, Any]]:
+    """
+    Runs the safety check and produces the plan (or a StepStream of it). With speculative planning the
+    planner starts at the same time as the safety check; its plan is only returned once the objective
+    is judged safe, and it is cancelled as soon as the objective is rejected. Returns (is_safe, reason,
+    plan, preflight timing).
+    """
+    constraints = job.constraints or {}
+    workflow_name = constraints.get("workflow")
+    speculative = constraints.get("speculative_planning", SPECULATIVE_PLANNING) and not workflow_name
+    if speculative and job_scheduler.overloaded:
+        # Under backlog, spend the NIM quota only on plans that are certain to be used
+        speculative = False
+    timing: Dict[str, Any] = {"speculative": bool(speculative)}
+    start = time.perf_counter()
+    planner_task = None
+    used = False
+    if speculative:
+        speculation_stats["started"] += 1
+        planner_task = start_planning(job_id, job)
+
+    try:
+        with tracer.span("safety"):
+            is_safe, reason = await safety_service.validate_intent(job.objective)
+        timing["safety_seconds"] = round(time.perf_counter() - start, 4)
+        if not is_safe:
+            return False, reason, None, timing
+
+        if workflow_name:
+            plan = load_workflow(workflow_name)
+        elif planner_task is not None:
+            used = True
+            plan = planner_task if isinstance(planner_task, StepStream) else await planner_task
+            speculation_stats["used"] += 1
+            # The safety check ran entirely in the planner's shadow (or vice versa)
+            saved = min(timing["safety_seconds"], time.perf_counter() - start)
+            speculation_stats["saved_seconds"] += saved
+            timing["saved_seconds"] = round(saved, 4)
+        else:
+            plan = start_planning(job_id, job)
+            if not isinstance(plan, StepStream):
+                plan = await plan
+        timing["plan_ready_seconds"] = round(time.perf_counter() - start, 4)
+        return True, reason, plan, timing
+    finally:
+        if planner_task is not None and not used:
+            # Rejected (or the safety check failed): throw the speculative plan away
+            planner_task.cancel()
+            wasted = time.perf_counter() - start
+            speculation_stats["cancelled"] += 1
+            speculation_stats["wasted_seconds"] += wasted
+            timing["cancelled_planning_seconds"] = round(wasted, 4)
+            await asyncio.gather(planner_task.task if isinstance(planner_task, StepStream) else planner_task, return_exceptions=True)
+
+async def run_job(job_id: str, job: JobRequest):
+    """
+    Safety gate (with speculative planning), then concurrent execution of the plan's DAG.
+    """
+    record = job_store.get_active(job_id)
+    record["status"] = "processing"
+    record["timing"] = job_scheduler.timing(job_id)
+    with tracer.trace(job_id, "job", **record["timing"]) as span:
+        await _run_traced_job(job_id, job, record)
+        span.set(status=record["status"])
+
+async def _run_traced_job(job_id: str, job: JobRequest, record: Dict[str, Any]):
+    plan = None
+    try:
+        # Inside the try: a job cancelled while this write is pending still reaches a terminal status
+        await job_store.save(record)
+        is_safe, reason, plan, preflight = await gate_and_plan(job_id, job)
+        record["timing"] = {**record["timing"], "preflight": preflight}
+        if not is_safe:
+            record["status"] = "rejected"
+            await append_job_log(job_id, "system", f"Objective rejected by safety check: {reason}")
+            return
+
+        async def on_update(step: Dict[str, Any]):
+            await job_store.save_steps(job_id, [step])
+            await append_job_log(job_id, step["agent"], f"Step {step['id']} {step['status']}")
+
+        if isinstance(plan, StepStream):
+            # Steps are added (and started) as the planner streams them
+            steps: List[Dict[str, Any]] = []
+            record["plan"] = {"steps": steps}
+            await job_store.save(record)
+            await append_job_log(job_id, "planner", "Planning streamed; steps start as they arrive")
+            report = await executor.execute(job_id, steps, {"objective": job.objective}, on_update, incoming=plan)
+            preflight["first_step_seconds"] = plan.first_step_seconds
+            preflight["plan_complete_seconds"] = plan.complete_seconds
+        else:
+            steps = normalize_plan(plan)
+            record["plan"] = {"steps": steps}
+            await job_store.save_steps(job_id, steps)
+            await job_store.save(record)
+            await append_job_log(job_id, "planner", f"Plan ready with {len(steps)} steps")
+            report = await executor.execute(job_id, steps, {"objective": job.objective}, on_update)
+        record["status"] = report["status"]
+        record["timing"] = {**record["timing"], **report["timing"]}
+        await append_job_log(
+            job_id, "system",
+            f"Job {report['status']} in {report['timing']['wall_seconds']}s "
+            f"(critical path: {' -> '.join(report['timing']['critical_path'])})"
+        )
+    except asyncio.CancelledError:
+        record["status"] = "cancelled"
+        await append_job_log(job_id, "system", "Job cancelled while running")
+        raise
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {e}")
+        record["status"] = "failed"
+        await append_job_log(job_id, "error", str(e))
+    finally:
+        if isinstance(plan, StepStream):
+            plan.cancel()
+        record["timing"] = {**record.get("timing", {}), **job_scheduler.timing(job_id)}
+        services = loaded_services()
+        if "plan_cache" in services:
+            # Successful fresh plans are cached; a reused plan's success rate is updated
+            cache_report = await services["plan_cache"].record_outcome(job_id, record["status"])
+            if cache_report is not None:
+                record["timing"]["plan_cache"] = cache_report
+        await job_store.save(record)
+        event_bus.close(job_id)
 
 @app.post("/jobs", response_model=JobResponse)
-async def submit_job(job: JobRequest, background_tasks: BackgroundTasks):
+async def submit_job(job: JobRequest):
+    if job.priority not in PRIORITIES:
+        raise HTTPException(status_code=422, detail=f"Unknown priority: {job.priority}")
     job_id = f"job_{os.urandom(4).hex()}"
     logger.info(f"Job submitted: {job_id} - {job.objective}")
-    
-    # Store job with initial data
-    jobs_db[job_id] = {
-        "job_id": job_id,
-        "objective": job.objective,
-        "status": "processing",
-        "plan": {
-            "steps": [
-                {
-                    "id": "research_phase",
-                    "agent": "researcher",
-                    "instruction": "Conduct deep research on the given topic",
-                    "status": "in_progress",
-                    "result": None
-                },
-                {
-                    "id": "analysis_phase",
-                    "agent": "planner",
-                    "instruction": "Analyze research findings and create execution plan",
-                    "status": "pending",
-                    "result": None
-                },
-                {
-                    "id": "verification_phase",
-                    "agent": "verifier",
-                    "instruction": "Verify accuracy and completeness of results",
-                    "status": "pending",
-                    "result": None
-                }
-            ]
-        },
-        "logs": [
-            {"timestamp": "2024-01-01T00:00:00", "agent": "system", "message": f"Job {job_id} created successfully"},
-            {"timestamp": "2024-01-01T00:00:01", "agent": "planner", "message": "Initializing execution plan..."}
-        ],
-        "artifacts": []
-    }
-    
+
+    try:
+        # Turn the request away before anything is persisted when the queue is already full
+        job_scheduler.check_admission(job.tenant)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
+
+    record = await job_store.create(job_id, job.objective)
+    await append_job_log(job_id, "system", f"Job {job_id} created successfully")
+    try:
+        job_scheduler.submit(job_id, lambda: run_job(job_id, job), job.priority, job.tenant)
+    except QueueFullError as e:
+        # Lost the race for the last queue slot while the record was being written
+        record["status"] = "rejected"
+        await job_store.save(record)
+        event_bus.close(job_id)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
+
     return {"job_id": job_id, "status": "queued", "message": "Job submitted successfully"}
 
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    state = job_scheduler.cancel(job_id)
+    if state is None:
+        if not await job_store.exists(job_id):
+            raise HTTPException(status_code=404, detail="Job not found")
+        raise HTTPException(status_code=409, detail="Job has already finished")
+    if state == "queued":
+        # Never started, so run_job will not record the outcome
+        record = job_store.get_active(job_id)
+        record["status"] = "cancelled"
+        await job_store.save(record)
+        await append_job_log(job_id, "system", "Job cancelled before it started")
+        event_bus.close(job_id)
+    return {"job_id": job_id, "status": "cancelled"}
+
 @app.get("/jobs/{job_id}")
 async def get_job_status(job_id: str):
-    if job_id not in jobs_db:
+    record = await job_store.get(job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {**record, "logs": await job_store.get_logs(job_id)}
+
+@app.get("/jobs/{job_id}/trace")
+async def get_job_trace(job_id: str):
+    """
+    Span tree of the job (job -> step -> LLM call -> NIM request) with start offsets and durations in seconds.
+    """
+    trace = tracer.get(job_id)
+    if trace is None:
+        if not await job_store.exists(job_id):
+            raise HTTPException(status_code=404, detail="Job not found")
+        raise HTTPException(status_code=404, detail="No trace recorded for this job (tracing disabled or trace evicted)")
+    return trace
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job_events(job_id: str):
+    """
+    Server-Sent Events feed of a job's agent logs and LLM token deltas.
+    """
+    if not await job_store.exists(job_id):
         raise HTTPException(status_code=404, detail="Job not found")
-    return jobs_db[job_id]
+
+    subscription = event_bus.subscribe(job_id)
+
+    async def event_source():
+        try:
+            while True:
+                event = await subscription.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield "event: end\ndata: {}\n\n"
+                    break
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.websocket("/jobs/{job_id}/stream")
+async def stream_job_events_ws(websocket: WebSocket, job_id: str):
+    """
+    WebSocket variant of the job event stream for clients that prefer it over SSE.
+    """
+    if not await job_store.exists(job_id):
+        await websocket.close(code=4404)
+        return
+
+    await websocket.accept()
+    subscription = event_bus.subscribe(job_id)
+    try:
+        while True:
+            event = await subscription.get(timeout=STREAM_HEARTBEAT_SECONDS)
+            if event is None:
+                await websocket.send_json({"type": "end"})
+                break
+            await websocket.send_text(json.dumps(event, default=str))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        event_bus.unsubscribe(subscription)
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
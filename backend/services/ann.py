@@ -0,0 +1,101 @@
+import math
+import os
+import logging
+from typing import Optional, Tuple
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RAG_INDEX_TYPE = os.getenv("RAG_INDEX_TYPE", "auto")  # flat | ivfpq | hnsw | auto
+RAG_ANN_ENGINE = os.getenv("RAG_ANN_ENGINE", "ivfpq")  # engine "auto" promotes to
+RAG_ANN_THRESHOLD = int(os.getenv("RAG_ANN_THRESHOLD", "100000"))
+RAG_TRAIN_SAMPLE = int(os.getenv("RAG_TRAIN_SAMPLE", "100000"))
+RAG_IVF_NLIST = int(os.getenv("RAG_IVF_NLIST", "0"))  # 0 = derive from corpus size
+RAG_PQ_M = int(os.getenv("RAG_PQ_M", "0"))  # 0 = derive from dimension
+RAG_HNSW_M = int(os.getenv("RAG_HNSW_M", "32"))
+RAG_NPROBE = int(os.getenv("RAG_NPROBE", "16"))
+RAG_EF_SEARCH = int(os.getenv("RAG_EF_SEARCH", "64"))
+
+def index_engine(index: faiss.Index) -> str:
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivfpq"
+    return "flat"
+
+def _pq_subquantizers(dimension: int) -> int:
+    """
+    Largest divisor of the dimension that keeps sub-vectors at 4+ dimensions, capped at 64.
+    """
+    if RAG_PQ_M and dimension % RAG_PQ_M == 0:
+        return RAG_PQ_M
+    for m in range(min(64, dimension // 4), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+def build_index(engine: str, dimension: int, sample: Optional[np.ndarray] = None, expected_size: int = 0) -> faiss.Index:
+    """
+    Creates an empty index of the given engine. IVF-PQ is trained on `sample`.
+    """
+    if engine == "flat":
+        return faiss.IndexFlatL2(dimension)
+
+    if engine == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, RAG_HNSW_M)
+        index.hnsw.efConstruction = max(40, 2 * RAG_HNSW_M)
+        index.hnsw.efSearch = RAG_EF_SEARCH
+        return index
+
+    if engine == "ivfpq":
+        if sample is None or len(sample) == 0:
+            raise ValueError("IVF-PQ needs a training sample")
+        # ~4*sqrt(N) lists, but never more than the sample can train (faiss wants ~39 points per list)
+        nlist = RAG_IVF_NLIST or int(4 * math.sqrt(max(expected_size, len(sample))))
+        nlist = max(1, min(nlist, len(sample) // 39))
+        m = _pq_subquantizers(dimension)
+        nbits = 8 if len(sample) >= 256 * 39 else 4
+        quantizer = faiss.IndexFlatL2(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, m, nbits)
+        index.train(np.ascontiguousarray(sample, dtype=np.float32))
+        index.nprobe = min(RAG_NPROBE, nlist)
+        logger.info(f"Trained IVF-PQ index (nlist={nlist}, m={m}, nbits={nbits}) on {len(sample)} vectors")
+        return index
+
+    raise ValueError(f"Unknown index engine: {engine}")
+
+def search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                  selector: Optional[faiss.IDSelector] = None) -> Optional[faiss.SearchParameters]:
+    """
+    Per-query recall/speed knobs and id filter. Returns None when the index defaults should be used.
+    """
+    if isinstance(index, faiss.IndexIVF) and (nprobe or selector is not None):
+        return faiss.SearchParametersIVF(nprobe=nprobe or index.nprobe, sel=selector)
+    if isinstance(index, faiss.IndexHNSW) and (ef_search or selector is not None):
+        return faiss.SearchParametersHNSW(efSearch=ef_search or index.hnsw.efSearch, sel=selector)
+    if selector is not None:
+        return faiss.SearchParameters(sel=selector)
+    return None
+
+def exact_search(vectors: np.ndarray, ids: np.ndarray, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Brute-force L2 search over `vectors` (whose document ids are `ids`), padded with -1 like faiss.
+    """
+    distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+    indices = np.full((len(queries), k), -1, dtype=np.int64)
+    if len(ids):
+        found_d, found_i = faiss.knn(np.ascontiguousarray(queries, dtype=np.float32), np.ascontiguousarray(vectors), min(k, len(ids)))
+        distances[:, :found_d.shape[1]] = found_d
+        indices[:, :found_i.shape[1]] = np.where(found_i >= 0, ids[np.maximum(found_i, 0)], -1)
+    return distances, indices
+
+def sample_rows(total: int, size: int, seed: int = 0) -> np.ndarray:
+    """
+    Sorted random row ids used to pick a training sample from the segment store.
+    """
+    if total <= size:
+        return np.arange(total)
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(total, size=size, replace=False))
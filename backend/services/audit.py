@@ -0,0 +1,175 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.services.db import DB_PATH, ensure_schema
+from backend.utils.telemetry import DB_FLUSH_LATENCY
+
+logger = logging.getLogger(__name__)
+
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL_MS = float(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "200"))
+
+_STOP = object()
+
+class AuditSink:
+    """
+    Write-behind audit log.
+
+    Records are queued in memory and written by a background task in batched transactions,
+    whenever `batch_size` records are waiting or `flush_interval_ms` has passed since the first one.
+    A full queue makes `log` wait (backpressure) instead of growing without bound; `stop` drains
+    everything that was accepted before returning.
+    """
+    def __init__(
+        self,
+        db_path: str = DB_PATH,
+        queue_size: int = AUDIT_QUEUE_SIZE,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval_ms: float = AUDIT_FLUSH_INTERVAL_MS,
+    ):
+        self.db_path = db_path
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        # One thread owns the connection, so sqlite never sees it from two threads
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audit-writer")
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.records_written = 0
+        self.batches_written = 0
+        self.records_dropped = 0
+        self.backpressure_waits = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._writer is not None and not self._writer.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._writer = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Flushes every queued record, then stops the writer.
+        """
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._writer
+        self._writer = None
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close_conn)
+
+    async def log(self, job_id: str, action: str, details: Dict[str, Any]):
+        if not self.running:
+            await self.start()
+        if self._queue.full():
+            self.backpressure_waits += 1
+        await self._queue.put((job_id, action, json.dumps(details, default=str), datetime.now()))
+
+    async def flush(self):
+        """
+        Waits until every record queued so far has been written.
+        """
+        if self.running:
+            await self._queue.join()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            record = await self._queue.get()
+            if record is _STOP:
+                self._queue.task_done()
+                break
+
+            batch = [record]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if record is _STOP:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(record)
+
+            await self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _write(self, batch: List[Tuple]):
+        loop = asyncio.get_running_loop()
+        for attempt in range(3):
+            try:
+                elapsed_ms = await loop.run_in_executor(self._executor, self._write_batch, batch)
+                break
+            except sqlite3.Error as e:
+                logger.error(f"Audit flush failed (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(0.1 * (attempt + 1))
+        else:
+            self.records_dropped += len(batch)
+            return
+
+        DB_FLUSH_LATENCY.observe(elapsed_ms / 1000, "audit_logs")
+        self.records_written += len(batch)
+        self.batches_written += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            ensure_schema(self.db_path)
+            self._conn = sqlite3.connect(self.db_path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        return self._conn
+
+    def _write_batch(self, batch: List[Tuple]) -> float:
+        start = time.perf_counter()
+        conn = self._get_conn()
+        with conn:
+            conn.executemany(
+                "INSERT INTO audit_logs (job_id, action, details, timestamp) VALUES (?, ?, ?, ?)",
+                batch
+            )
+        return (time.perf_counter() - start) * 1000
+
+    def _close_conn(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "records_written": self.records_written,
+            "batches_written": self.batches_written,
+            "records_dropped": self.records_dropped,
+            "backpressure_waits": self.backpressure_waits,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / self.batches_written, 3) if self.batches_written else 0.0,
+        }
+
+audit_sink = AuditSink()
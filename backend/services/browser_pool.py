@@ -0,0 +1,157 @@
+import asyncio
+import os
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from playwright.async_api import async_playwright, Browser, Page, Playwright, Route
+
+logger = logging.getLogger(__name__)
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "8"))
+BROWSER_RECYCLE_AFTER = int(os.getenv("BROWSER_RECYCLE_AFTER", "200"))
+BROWSER_BLOCK_RESOURCES = os.getenv("BROWSER_BLOCK_RESOURCES", "true").lower() in ("1", "true", "yes")
+
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+
+class _PooledBrowser:
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.pages_served = 0
+        self.active = 0
+        self.retiring = False
+        self.crashed = False
+        browser.on("disconnected", self._on_disconnected)
+
+    def _on_disconnected(self, _browser: Browser):
+        self.crashed = True
+
+    @property
+    def healthy(self) -> bool:
+        return not self.crashed and not self.retiring and self.browser.is_connected()
+
+class BrowserPool:
+    """
+    Process-wide set of warm Chromium instances.
+
+    Each caller gets a fresh, isolated BrowserContext on one of the browsers, which costs milliseconds
+    instead of a full browser launch. Browsers are replaced after `recycle_after` pages or when they
+    crash, and `max_pages` caps how many pages are open at once across the pool.
+    """
+    def __init__(self, size: int = BROWSER_POOL_SIZE, max_pages: int = BROWSER_MAX_PAGES, recycle_after: int = BROWSER_RECYCLE_AFTER):
+        self.size = size
+        self.max_pages = max_pages
+        self.recycle_after = recycle_after
+        self._playwright: Optional[Playwright] = None
+        self._browsers: List[_PooledBrowser] = []
+        self._lock = asyncio.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.pages_opened = 0
+        self.browsers_launched = 0
+        self.browsers_recycled = 0
+        self.crashes = 0
+
+    async def start(self):
+        async with self._lock:
+            if self._playwright is not None:
+                return
+            self._playwright = await async_playwright().start()
+            self._semaphore = asyncio.Semaphore(self.max_pages)
+            for _ in range(self.size):
+                self._browsers.append(await self._launch())
+            logger.info(f"Browser pool started with {self.size} browsers")
+
+    async def stop(self):
+        async with self._lock:
+            for pooled in self._browsers:
+                await self._close(pooled)
+            self._browsers = []
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+    async def _launch(self) -> _PooledBrowser:
+        browser = await self._playwright.chromium.launch(headless=True)
+        self.browsers_launched += 1
+        return _PooledBrowser(browser)
+
+    async def _close(self, pooled: _PooledBrowser):
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.warning(f"Failed to close browser: {e}")
+
+    async def _acquire(self) -> _PooledBrowser:
+        async with self._lock:
+            for pooled in list(self._browsers):
+                if pooled.crashed:
+                    self.crashes += 1
+                    logger.warning("Replacing crashed browser")
+                    self._browsers.remove(pooled)
+                    if pooled.active == 0:
+                        # Busy ones are closed by _release once their last page is done
+                        await self._close(pooled)
+            while len([b for b in self._browsers if b.healthy]) < self.size:
+                self._browsers.append(await self._launch())
+            pooled = min((b for b in self._browsers if b.healthy), key=lambda b: b.active)
+            pooled.active += 1
+            return pooled
+
+    async def _release(self, pooled: _PooledBrowser):
+        pooled.active -= 1
+        pooled.pages_served += 1
+        if pooled.pages_served >= self.recycle_after and not pooled.retiring:
+            pooled.retiring = True
+            self.browsers_recycled += 1
+        if (pooled.retiring or pooled.crashed) and pooled.active == 0:
+            async with self._lock:
+                if pooled in self._browsers:
+                    self._browsers.remove(pooled)
+            # A crashed browser still holds its process and driver handles; _close logs any error
+            await self._close(pooled)
+
+    @asynccontextmanager
+    async def page(self, block_resources: bool = False) -> AsyncIterator[Page]:
+        """
+        Yields a page in its own BrowserContext. With `block_resources`, images, fonts and media are not fetched.
+        """
+        if self._playwright is None:
+            await self.start()
+
+        async with self._semaphore:
+            pooled = await self._acquire()
+            context = None
+            try:
+                context = await pooled.browser.new_context()
+                if block_resources:
+                    await context.route("**/*", _block_heavy_resources)
+                page = await context.new_page()
+                self.pages_opened += 1
+                yield page
+            finally:
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception as e:
+                        logger.warning(f"Failed to close browser context: {e}")
+                await self._release(pooled)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "browsers": len(self._browsers),
+            "active_pages": sum(b.active for b in self._browsers),
+            "pages_opened": self.pages_opened,
+            "browsers_launched": self.browsers_launched,
+            "browsers_recycled": self.browsers_recycled,
+            "crashes": self.crashes,
+        }
+
+async def _block_heavy_resources(route: Route):
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+browser_pool = BrowserPool()
@@ -0,0 +1,244 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+CRAWLER_WORKERS = int(os.getenv("CRAWLER_WORKERS", "16"))
+CRAWLER_PER_HOST = int(os.getenv("CRAWLER_PER_HOST", "2"))
+CRAWLER_HOST_DELAY_MS = float(os.getenv("CRAWLER_HOST_DELAY_MS", "250"))
+CRAWLER_MAX_BYTES = int(os.getenv("CRAWLER_MAX_BYTES", str(2 * 1024 * 1024)))
+CRAWLER_TIMEOUT = float(os.getenv("CRAWLER_TIMEOUT", "15"))
+CRAWLER_PARSE_PROCESSES = int(os.getenv("CRAWLER_PARSE_PROCESSES", str(min(4, os.cpu_count() or 1))))
+CRAWLER_CACHE_PATH = os.getenv("CRAWLER_CACHE_PATH", "http_cache.db")
+CRAWLER_CACHE_FRESH_SECONDS = float(os.getenv("CRAWLER_CACHE_FRESH_SECONDS", "300"))
+CRAWLER_USER_AGENT = os.getenv("CRAWLER_USER_AGENT", "ManusResearchBot/1.0")
+
+def extract_text(html: bytes, encoding: Optional[str] = None) -> Dict[str, str]:
+    """
+    HTML -> title and visible text. Module-level so it can run in a worker process.
+    """
+    soup = BeautifulSoup(html, "html.parser", from_encoding=encoding)
+    for tag in soup(["script", "style", "noscript"]):
+        tag.decompose()
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    return {"title": title, "text": soup.get_text(" ", strip=True)}
+
+class HTTPCache:
+    """
+    On-disk cache of parsed pages with their validators (ETag / Last-Modified).
+    """
+    def __init__(self, path: str = CRAWLER_CACHE_PATH):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                title TEXT,
+                text TEXT,
+                fetched_at REAL
+            )''')
+            self._conn.commit()
+        return self._conn
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._get_conn().execute(
+                "SELECT etag, last_modified, title, text, fetched_at FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "title": row[2], "text": row[3], "fetched_at": row[4]}
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], title: str, text: str):
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO http_cache (url, etag, last_modified, title, text, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, title, text, time.time())
+            )
+            conn.commit()
+
+    def touch(self, url: str):
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute("UPDATE http_cache SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+class Crawler:
+    """
+    Async fetch pipeline for research.
+
+    A bounded pool of workers fetches URLs with per-host concurrency and a minimum delay between
+    requests to the same host. Bodies are capped at `max_bytes`, HTML is parsed off the event loop,
+    and an on-disk cache revalidates with ETag / Last-Modified so repeated topics do not refetch pages.
+    """
+    def __init__(
+        self,
+        workers: int = CRAWLER_WORKERS,
+        per_host: int = CRAWLER_PER_HOST,
+        host_delay_ms: float = CRAWLER_HOST_DELAY_MS,
+        max_bytes: int = CRAWLER_MAX_BYTES,
+        parse_processes: int = CRAWLER_PARSE_PROCESSES,
+        cache: Optional[HTTPCache] = None,
+        fresh_seconds: float = CRAWLER_CACHE_FRESH_SECONDS,
+    ):
+        self.workers = workers
+        self.per_host = per_host
+        self.host_delay = host_delay_ms / 1000
+        self.max_bytes = max_bytes
+        self.parse_processes = parse_processes
+        self.cache = cache or HTTPCache()
+        self.fresh_seconds = fresh_seconds
+        self._client: Optional[httpx.AsyncClient] = None
+        self._parser: Optional[Executor] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._host_next: Dict[str, float] = {}
+
+        self.pages_fetched = 0
+        self.cache_hits = 0
+        self.revalidated = 0
+        self.truncated = 0
+        self.errors = 0
+        self.bytes_downloaded = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=CRAWLER_TIMEOUT,
+                follow_redirects=True,
+                headers={"User-Agent": CRAWLER_USER_AGENT},
+                limits=httpx.Limits(max_connections=self.workers),
+            )
+        return self._client
+
+    @property
+    def parser(self) -> Executor:
+        if self._parser is None:
+            if self.parse_processes > 0:
+                self._parser = ProcessPoolExecutor(max_workers=self.parse_processes)
+            else:
+                self._parser = ThreadPoolExecutor(max_workers=4, thread_name_prefix="html-parse")
+        return self._parser
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._parser is not None:
+            self._parser.shutdown(wait=False, cancel_futures=True)
+            self._parser = None
+        self.cache.close()
+
+    async def _wait_for_host(self, host: str):
+        # Reserve the next politeness slot for this host, then sleep until it arrives
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._host_next.get(host, now))
+        self._host_next[host] = slot + self.host_delay
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def fetch(self, url: str) -> Dict[str, Any]:
+        cached = await asyncio.to_thread(self.cache.get, url)
+        if cached is not None and time.time() - cached["fetched_at"] < self.fresh_seconds:
+            self.cache_hits += 1
+            return {"url": url, "title": cached["title"], "text": cached["text"], "cached": True}
+
+        headers = {}
+        if cached is not None:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        host = urlsplit(url).netloc
+        slots = self._host_slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        try:
+            async with slots:
+                await self._wait_for_host(host)
+                async with self.client.stream("GET", url, headers=headers) as response:
+                    if response.status_code == 304 and cached is not None:
+                        self.cache_hits += 1
+                        self.revalidated += 1
+                        await asyncio.to_thread(self.cache.touch, url)
+                        return {"url": url, "title": cached["title"], "text": cached["text"], "cached": True}
+                    response.raise_for_status()
+
+                    body = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        body.extend(chunk)
+                        if len(body) >= self.max_bytes:
+                            del body[self.max_bytes:]
+                            self.truncated += 1
+                            break
+                    etag = response.headers.get("ETag")
+                    last_modified = response.headers.get("Last-Modified")
+                    encoding = response.charset_encoding
+        except httpx.HTTPError as e:
+            self.errors += 1
+            logger.error(f"Failed to fetch {url}: {e}")
+            return {"url": url, "error": str(e)}
+
+        self.pages_fetched += 1
+        self.bytes_downloaded += len(body)
+        parsed = await asyncio.get_running_loop().run_in_executor(self.parser, extract_text, bytes(body), encoding)
+        await asyncio.to_thread(self.cache.put, url, etag, last_modified, parsed["title"], parsed["text"])
+        return {"url": url, "title": parsed["title"], "text": parsed["text"], "cached": False}
+
+    async def crawl(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """
+        Fetches all URLs with at most `workers` requests in flight. Results keep the input order.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(urls)
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in enumerate(urls):
+            queue.put_nowait(item)
+
+        async def worker():
+            while True:
+                try:
+                    index, url = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                results[index] = await self.fetch(url)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, len(urls)))))
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.pages_fetched + self.cache_hits
+        return {
+            "pages_fetched": self.pages_fetched,
+            "cache_hits": self.cache_hits,
+            "revalidated": self.revalidated,
+            "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            "truncated": self.truncated,
+            "errors": self.errors,
+            "bytes_downloaded": self.bytes_downloaded,
+        }
+
+crawler = Crawler()
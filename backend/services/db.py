@@ -1,19 +1,41 @@
 import sqlite3
 import json
+import queue
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterator, Set
 import os
 
-DB_PATH = "manus.db"
+DB_PATH = os.getenv("DB_PATH", "manus.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
+_schema_lock = threading.Lock()
+_schema_ready: Set[str] = set()
+
+def get_db_connection(db_path: str = DB_PATH):
+    conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
     return conn
 
-def init_db():
-    conn = get_db_connection()
+def ensure_schema(db_path: str = DB_PATH):
+    """
+    Creates or migrates the schema the first time a database is opened in this process,
+    rather than at import time.
+    """
+    if db_path in _schema_ready:
+        return
+    with _schema_lock:
+        if db_path not in _schema_ready:
+            init_db(db_path)
+            _schema_ready.add(db_path)
+
+def init_db(db_path: str = DB_PATH):
+    conn = get_db_connection(db_path)
     c = conn.cursor()
+
+    # WAL lets the audit writer commit without blocking readers
+    c.execute("PRAGMA journal_mode=WAL")
     
     # Jobs table
     c.execute('''CREATE TABLE IF NOT EXISTS jobs (
@@ -58,15 +80,129 @@ def init_db():
         FOREIGN KEY (job_id) REFERENCES jobs (id)
     )''')
 
+    # Columns added after the initial schema
+    _ensure_columns(c, "jobs", {"timing": "JSON", "completed_at": "TIMESTAMP"})
+    _ensure_columns(c, "tasks", {"step_id": "TEXT", "dependencies": "JSON", "timing": "JSON", "updated_at": "TIMESTAMP"})
+
+    # Steps dispatched to `python -m backend.worker` processes carry their input and a lease
+    _ensure_columns(c, "tasks", {"input": "JSON", "lease_owner": "TEXT", "lease_expires_at": "REAL", "attempts": "INTEGER DEFAULT 0"})
+
+    # Live worker processes, refreshed by their heartbeats
+    c.execute('''CREATE TABLE IF NOT EXISTS workers (
+        id TEXT PRIMARY KEY,
+        host TEXT,
+        pid INTEGER,
+        agents TEXT,
+        started_at TIMESTAMP,
+        last_heartbeat REAL,
+        running INTEGER
+    )''')
+
+    # Events (agent logs, token deltas) published by steps running in workers, relayed to the API's streams
+    c.execute('''CREATE TABLE IF NOT EXISTS task_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id TEXT,
+        job_id TEXT,
+        event JSON
+    )''')
+
+    # Completed jobs past their retention period are moved here
+    c.execute('''CREATE TABLE IF NOT EXISTS jobs_archive (
+        id TEXT PRIMARY KEY,
+        objective TEXT,
+        status TEXT,
+        created_at TIMESTAMP,
+        updated_at TIMESTAMP,
+        plan JSON,
+        timing JSON,
+        completed_at TIMESTAMP
+    )''')
+
+    # Steps and audit records of archived jobs, so an archived job still shows its plan and history
+    c.execute('''CREATE TABLE IF NOT EXISTS tasks_archive (
+        id TEXT PRIMARY KEY,
+        job_id TEXT,
+        step_id TEXT,
+        agent TEXT,
+        status TEXT,
+        description TEXT,
+        result TEXT,
+        dependencies JSON,
+        timing JSON,
+        created_at TIMESTAMP,
+        updated_at TIMESTAMP
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS audit_logs_archive (
+        id INTEGER PRIMARY KEY,
+        job_id TEXT,
+        action TEXT,
+        details JSON,
+        timestamp TIMESTAMP
+    )''')
+
+    # Indexes for the hot per-job lookups
+    c.execute("CREATE INDEX IF NOT EXISTS idx_tasks_job_id ON tasks (job_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_job_id ON artifacts (job_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_audit_logs_job_id_timestamp ON audit_logs (job_id, timestamp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_completed_at ON jobs (status, completed_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks (agent, status) WHERE input IS NOT NULL")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_task_events_task_id ON task_events (task_id, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_tasks_archive_job_id ON tasks_archive (job_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_audit_logs_archive_job_id_timestamp ON audit_logs_archive (job_id, timestamp)")
+
     conn.commit()
     conn.close()
 
+def _ensure_columns(cursor: sqlite3.Cursor, table: str, columns: Dict[str, str]):
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    for name, column_type in columns.items():
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
+class ConnectionPool:
+    """
+    Fixed-size pool of SQLite connections that may be used from any worker thread.
+    sqlite3 keeps a per-connection statement cache, so reusing connections also reuses
+    the prepared statements of the hot queries.
+    """
+    def __init__(self, db_path: str = DB_PATH, size: int = DB_POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        ensure_schema(db_path)
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._pool.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._pool.get()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
 class DBService:
     def __init__(self):
-        init_db()
+        # Schema is created on first use, so importing this module does no I/O
+        self.db_path = DB_PATH
 
     def create_job(self, job_id: str, objective: str):
-        conn = get_db_connection()
+        ensure_schema(self.db_path)
+        conn = get_db_connection(self.db_path)
         conn.execute(
             "INSERT INTO jobs (id, objective, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
             (job_id, objective, "queued", datetime.now(), datetime.now())
@@ -75,7 +211,8 @@ class DBService:
         conn.close()
 
     def update_job_status(self, job_id: str, status: str):
-        conn = get_db_connection()
+        ensure_schema(self.db_path)
+        conn = get_db_connection(self.db_path)
         conn.execute(
             "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
             (status, datetime.now(), job_id)
@@ -84,7 +221,8 @@ class DBService:
         conn.close()
 
     def log_audit(self, job_id: str, action: str, details: Dict[str, Any]):
-        conn = get_db_connection()
+        ensure_schema(self.db_path)
+        conn = get_db_connection(self.db_path)
         conn.execute(
             "INSERT INTO audit_logs (job_id, action, details, timestamp) VALUES (?, ?, ?, ?)",
             (job_id, action, json.dumps(details), datetime.now())
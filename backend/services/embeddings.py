@@ -0,0 +1,247 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from backend.utils.file_lock import file_lock, truncate_to
+from backend.utils.nim_client import nim_client
+from backend.utils.telemetry import EMBEDDING_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "3"))
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "64"))
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "embedding_cache")
+
+class EmbeddingCache:
+    """
+    Append-only embedding cache for one model.
+
+    Vectors are stored as raw float32 rows in `<model>.f32` and read back through a memory map;
+    `<model>.keys` holds the 16-byte text digest for each row in the same order. Appends hold
+    `<model>.lock`, so several processes can share the cache directory.
+    """
+    DIGEST_SIZE = 16
+
+    def __init__(self, model: str, cache_dir: str = EMBED_CACHE_DIR):
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.vectors_file = os.path.join(cache_dir, f"{safe_name}.f32")
+        self.keys_file = os.path.join(cache_dir, f"{safe_name}.keys")
+        self.meta_file = os.path.join(cache_dir, f"{safe_name}.json")
+        self.lock_file = os.path.join(cache_dir, f"{safe_name}.lock")
+        self.dimension: Optional[int] = None
+        self._rows: Dict[bytes, int] = {}
+        # Rows of the files read into _rows so far
+        self._file_rows = 0
+        self._mmap: Optional[np.memmap] = None
+        self._sync()
+        if self._rows:
+            logger.info(f"Loaded {len(self._rows)} cached embeddings from {self.vectors_file}")
+
+    @classmethod
+    def digest(cls, text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=cls.DIGEST_SIZE).digest()
+
+    def _sync(self) -> int:
+        """
+        Reads rows appended since the last call (by this or another process) and returns the number
+        of complete rows on disk.
+        """
+        if self.dimension is None:
+            if not os.path.exists(self.meta_file):
+                return 0
+            with open(self.meta_file) as f:
+                self.dimension = json.load(f)["dimension"]
+        if not os.path.exists(self.keys_file) or not os.path.exists(self.vectors_file):
+            return 0
+        # Vectors are written before keys, so a torn write can only leave unreferenced trailing vectors
+        stored_rows = os.path.getsize(self.vectors_file) // (self.dimension * 4)
+        rows = min(os.path.getsize(self.keys_file) // self.DIGEST_SIZE, stored_rows)
+        if rows > self._file_rows:
+            with open(self.keys_file, "rb") as f:
+                f.seek(self._file_rows * self.DIGEST_SIZE)
+                keys = f.read((rows - self._file_rows) * self.DIGEST_SIZE)
+            for i in range(rows - self._file_rows):
+                self._rows[keys[i * self.DIGEST_SIZE:(i + 1) * self.DIGEST_SIZE]] = self._file_rows + i
+            self._file_rows = rows
+        return rows
+
+    def _vectors(self, row: int) -> np.memmap:
+        if self._mmap is None or row >= self._mmap.shape[0]:
+            rows = os.path.getsize(self.vectors_file) // (self.dimension * 4)
+            self._mmap = np.memmap(self.vectors_file, dtype=np.float32, mode="r", shape=(rows, self.dimension))
+        return self._mmap
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        row = self._rows.get(self.digest(text))
+        if row is None:
+            return None
+        return np.array(self._vectors(row)[row])
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        """
+        Appends vectors for texts not cached yet. Blocking file I/O: call it off the event loop.
+        """
+        with file_lock(self.lock_file):
+            # Row numbers come from the files, which other processes may have appended to
+            rows = self._sync()
+            if self.dimension is None:
+                self.dimension = int(vectors.shape[1])
+                with open(self.meta_file, "w") as f:
+                    json.dump({"dimension": self.dimension}, f)
+            elif vectors.shape[1] != self.dimension:
+                logger.warning(f"Embedding dimension changed ({self.dimension} -> {vectors.shape[1]}); not caching batch")
+                return
+
+            new_keys = []
+            new_vectors = []
+            seen = set()
+            for text, vector in zip(texts, vectors):
+                key = self.digest(text)
+                if key in self._rows or key in seen:
+                    continue
+                seen.add(key)
+                new_keys.append(key)
+                new_vectors.append(vector)
+            if not new_keys:
+                return
+
+            # Drop the tail of a torn write so the new vectors line up with their keys
+            truncate_to(self.vectors_file, rows * self.dimension * 4)
+            truncate_to(self.keys_file, rows * self.DIGEST_SIZE)
+            with open(self.vectors_file, "ab") as f:
+                f.write(np.asarray(new_vectors, dtype=np.float32).tobytes())
+            with open(self.keys_file, "ab") as f:
+                f.write(b"".join(new_keys))
+            for i, key in enumerate(new_keys):
+                self._rows[key] = rows + i
+            self._file_rows = rows + len(new_keys)
+
+class EmbeddingService:
+    """
+    Front-end for NIM embeddings.
+
+    Concurrent `embed` calls are coalesced for a short window (or until `max_batch` texts are
+    waiting) into one batched request, and results are served from a persistent cache when possible.
+    """
+    def __init__(self, window_ms: float = EMBED_BATCH_WINDOW_MS, max_batch: int = EMBED_MAX_BATCH, cache_dir: str = EMBED_CACHE_DIR):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.cache_dir = cache_dir
+        self._caches: Dict[str, EmbeddingCache] = {}
+        # model -> {text: future}; identical texts waiting in the same window share one slot
+        self._pending: Dict[str, Dict[str, asyncio.Future]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        # In-flight batch requests; the loop only holds weak references to tasks
+        self._sending: Set[asyncio.Task] = set()
+
+        self.cache_hits = 0
+        self.texts_requested = 0
+        self.batches_sent = 0
+        self.texts_sent = 0
+
+    def _cache(self, model: str) -> EmbeddingCache:
+        cache = self._caches.get(model)
+        if cache is None:
+            cache = EmbeddingCache(model, self.cache_dir)
+            self._caches[model] = cache
+        return cache
+
+    async def embed(self, model: str, texts: List[str]) -> np.ndarray:
+        """
+        Returns a (len(texts), dimension) float32 array.
+        """
+        cache = self._cache(model)
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        waiting: List[Tuple[int, asyncio.Future]] = []
+        self.texts_requested += len(texts)
+
+        for i, text in enumerate(texts):
+            vector = cache.get(text)
+            if vector is not None:
+                self.cache_hits += 1
+                results[i] = vector
+            else:
+                waiting.append((i, self._enqueue(model, text)))
+
+        if waiting:
+            # Futures are shared with other callers waiting on the same texts: a cancelled caller must not cancel them
+            vectors = await asyncio.gather(*(asyncio.shield(future) for _, future in waiting))
+            for (i, _), vector in zip(waiting, vectors):
+                results[i] = vector
+
+        return np.vstack(results).astype(np.float32) if results else np.zeros((0, 0), dtype=np.float32)
+
+    def _enqueue(self, model: str, text: str) -> asyncio.Future:
+        pending = self._pending.setdefault(model, {})
+        future = pending.get(text)
+        if future is not None:
+            return future
+
+        future = asyncio.get_running_loop().create_future()
+        pending[text] = future
+        if len(pending) >= self.max_batch:
+            self._flush(model)
+        elif model not in self._timers:
+            self._timers[model] = asyncio.get_running_loop().call_later(self.window, self._flush, model)
+        return future
+
+    def _flush(self, model: str):
+        timer = self._timers.pop(model, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(model, None)
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._send(model, batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, model: str, batch: Dict[str, asyncio.Future]):
+        texts = list(batch.keys())
+        EMBEDDING_BATCH_SIZE.observe(len(texts), model)
+        self.batches_sent += 1
+        self.texts_sent += len(texts)
+        try:
+            vectors = np.asarray(await nim_client.embed(model, texts), dtype=np.float32)
+            if len(vectors) != len(texts):
+                raise ValueError(f"Expected {len(texts)} embeddings from {model}, got {len(vectors)}")
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for text, vector in zip(texts, vectors):
+            future = batch[text]
+            if not future.done():
+                future.set_result(vector)
+        # No caller may be left waiting on a future this batch was meant to resolve
+        for future in batch.values():
+            if not future.done():
+                future.set_exception(RuntimeError(f"No embedding returned by {model}"))
+
+        try:
+            await asyncio.to_thread(self._cache(model).put_many, texts, vectors)
+        except OSError as e:
+            logger.error(f"Failed to persist embeddings: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "texts_requested": self.texts_requested,
+            "cache_hits": self.cache_hits,
+            "batches_sent": self.batches_sent,
+            "texts_sent": self.texts_sent,
+            "avg_batch_size": self.texts_sent / self.batches_sent if self.batches_sent else 0.0,
+            "cached_vectors": sum(len(cache) for cache in self._caches.values()),
+        }
+
+embedding_service = EmbeddingService()
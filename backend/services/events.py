@@ -0,0 +1,101 @@
+import asyncio
+import os
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Any, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "256"))
+
+class Subscription:
+    """
+    A single consumer of a job's event stream with its own bounded buffer.
+    Frames that do not fit are dropped rather than slowing down the publisher.
+    """
+    def __init__(self, job_id: str, maxsize: int = EVENT_BUFFER_SIZE):
+        self.job_id = job_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self._reported_dropped = 0
+        self.closed = False
+
+    def offer(self, event: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def close(self):
+        self.closed = True
+        try:
+            # Wake up a consumer that is blocked on an empty queue
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Returns the next event, a "dropped" notice once the buffer is drained if frames were lost,
+        a "heartbeat" if nothing arrived within `timeout`, or None once the stream is closed.
+        """
+        if self.dropped > self._reported_dropped and self.queue.empty():
+            count = self.dropped - self._reported_dropped
+            self._reported_dropped = self.dropped
+            return {"type": "dropped", "count": count}
+
+        if self.closed and self.queue.empty():
+            return None
+
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return {"type": "heartbeat", "timestamp": datetime.now().isoformat()}
+
+class EventBus:
+    """
+    In-process fan-out of per-job events (agent logs, LLM token deltas) to live subscribers.
+
+    Worker processes have no subscribers; they set `forward` to relay events to the API process.
+    """
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self.forward: Optional[Callable[[str, Dict[str, Any]], None]] = None
+
+    def has_subscribers(self, job_id: str) -> bool:
+        return bool(self._subscribers.get(job_id))
+
+    def subscribe(self, job_id: str) -> Subscription:
+        subscription = Subscription(job_id)
+        self._subscribers.setdefault(job_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.job_id)
+        if not subscribers:
+            return
+        subscribers.discard(subscription)
+        if subscription.dropped:
+            logger.info(f"[{subscription.job_id}] Stream subscriber dropped {subscription.dropped} frames")
+        if not subscribers:
+            del self._subscribers[subscription.job_id]
+
+    def publish(self, job_id: str, event: Dict[str, Any]):
+        if self.forward is not None:
+            event.setdefault("timestamp", datetime.now().isoformat())
+            self.forward(job_id, event)
+        subscribers = self._subscribers.get(job_id)
+        if not subscribers:
+            return
+        event.setdefault("timestamp", datetime.now().isoformat())
+        for subscription in subscribers:
+            subscription.offer(event)
+
+    def close(self, job_id: str):
+        """
+        Signals end-of-stream to every subscriber of a job.
+        """
+        for subscription in self._subscribers.get(job_id, ()):
+            subscription.close()
+
+event_bus = EventBus()
@@ -0,0 +1,336 @@
+import asyncio
+import json
+import os
+import time
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from backend.utils.telemetry import tracer, QUEUE_WAIT, STEP_LATENCY
+
+logger = logging.getLogger(__name__)
+
+WORKFLOWS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "workflows")
+
+DEFAULT_AGENT_CONCURRENCY = int(os.getenv("DEFAULT_AGENT_CONCURRENCY", "4"))
+
+def _parse_concurrency(spec: str) -> Dict[str, int]:
+    """
+    Parses "browser=2,coder=4" into {"browser": 2, "coder": 4}.
+    """
+    limits = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            limits[name.strip()] = int(value)
+    return limits
+
+AGENT_CONCURRENCY = _parse_concurrency(os.getenv("AGENT_CONCURRENCY", "browser=2,coder=4,ppt=2"))
+
+class PlanCycleError(ValueError):
+    pass
+
+def load_workflow(name: str) -> Dict[str, Any]:
+    """
+    Loads a workflow from backend/workflows by its "name" field or file name.
+    """
+    for filename in os.listdir(WORKFLOWS_DIR):
+        if not filename.endswith(".json"):
+            continue
+        with open(os.path.join(WORKFLOWS_DIR, filename)) as f:
+            workflow = json.load(f)
+        if workflow.get("name") == name or filename[:-len(".json")] == name:
+            return workflow
+    raise ValueError(f"Unknown workflow: {name}")
+
+def normalize_plan(plan: Dict[str, Any] | List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Converts a workflow ({"steps": [{"id": ...}]}) or a planner result ({"plan": [{"step_id": ...}]})
+    into a list of steps with string ids and dependencies.
+    """
+    if isinstance(plan, dict):
+        raw_steps = plan.get("steps", plan.get("plan", []))
+    else:
+        raw_steps = plan
+
+    steps = [normalize_step(raw, index) for index, raw in enumerate(raw_steps)]
+    validate_plan(steps)
+    return steps
+
+def normalize_step(raw: Dict[str, Any], index: int) -> Dict[str, Any]:
+    step = dict(raw)
+    step_id = step.pop("step_id", None)
+    step["id"] = str(step.get("id", step_id if step_id is not None else index + 1))
+    step["dependencies"] = [str(d) for d in step.get("dependencies", []) or []]
+    step.setdefault("instruction", "")
+    step["status"] = "pending"
+    step["result"] = None
+    return step
+
+def validate_plan(steps: List[Dict[str, Any]]):
+    ids = {step["id"] for step in steps}
+    if len(ids) != len(steps):
+        raise ValueError("Plan contains duplicate step ids")
+    for step in steps:
+        missing = [d for d in step["dependencies"] if d not in ids]
+        if missing:
+            raise ValueError(f"Step {step['id']} depends on unknown steps: {missing}")
+
+def topological_order(steps: List[Dict[str, Any]]) -> List[str]:
+    """
+    Kahn's algorithm. Raises PlanCycleError naming the steps involved in a cycle.
+    """
+    indegree = {step["id"]: len(step["dependencies"]) for step in steps}
+    dependents: Dict[str, List[str]] = {step["id"]: [] for step in steps}
+    for step in steps:
+        for dep in step["dependencies"]:
+            dependents[dep].append(step["id"])
+
+    ready = [step_id for step_id, degree in indegree.items() if degree == 0]
+    order = []
+    while ready:
+        step_id = ready.pop()
+        order.append(step_id)
+        for child in dependents[step_id]:
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                ready.append(child)
+
+    if len(order) != len(steps):
+        cyclic = sorted(step_id for step_id, degree in indegree.items() if degree > 0)
+        raise PlanCycleError(f"Plan contains a dependency cycle between steps: {cyclic}")
+    return order
+
+def _summarize(result: Any) -> str:
+    if isinstance(result, dict):
+        for key in ("summary", "report", "output", "path", "error", "status"):
+            if result.get(key):
+                return str(result[key])[:200]
+    return str(result)[:200]
+
+_END = object()
+
+class StepStream:
+    """
+    Plan steps arriving from a streaming planner. `produce(on_step)` runs in a background task from
+    construction on, so planning can overlap with other work (e.g. the safety check); steps are
+    buffered until the executor consumes them as an async iterator.
+    """
+    def __init__(self, produce: Callable[[Callable[[Dict[str, Any]], None]], Awaitable[Any]]):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.started = time.perf_counter()
+        self.first_step_seconds: Optional[float] = None
+        self.complete_seconds: Optional[float] = None
+        self.task = asyncio.create_task(self._pump(produce))
+
+    def _on_step(self, raw: Dict[str, Any]):
+        if self.first_step_seconds is None:
+            self.first_step_seconds = round(time.perf_counter() - self.started, 4)
+        self._queue.put_nowait(raw)
+
+    async def _pump(self, produce):
+        try:
+            await produce(self._on_step)
+            self._queue.put_nowait(_END)
+        except asyncio.CancelledError:
+            # Do not leave a consumer waiting for steps that will never come
+            self._queue.put_nowait(RuntimeError("Planning was cancelled"))
+            raise
+        except Exception as e:
+            self._queue.put_nowait(e)
+        finally:
+            self.complete_seconds = round(time.perf_counter() - self.started, 4)
+
+    def cancel(self):
+        self.task.cancel()
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        item = await self._queue.get()
+        if item is _END:
+            raise StopAsyncIteration
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+class DAGExecutor:
+    """
+    Runs plan steps as soon as their dependencies are satisfied.
+
+    Concurrency is capped per agent type across all jobs in the process. Each step receives its
+    upstream results; a failed step causes its dependents to be skipped while independent branches continue.
+    """
+    def __init__(self, agent_factory: Callable[[str, str], Any], concurrency: Optional[Dict[str, int]] = None):
+        self.agent_factory = agent_factory
+        self.concurrency = concurrency if concurrency is not None else AGENT_CONCURRENCY
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore(self, agent: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(agent)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.concurrency.get(agent, DEFAULT_AGENT_CONCURRENCY))
+            self._semaphores[agent] = semaphore
+        return semaphore
+
+    def _build_input(self, step: Dict[str, Any], context: Dict[str, Any], results: Dict[str, Any]) -> Dict[str, Any]:
+        input_data = {k: v for k, v in step.items() if k not in ("id", "status", "result", "dependencies", "timing")}
+        upstream = {dep: results[dep] for dep in step["dependencies"]}
+        input_data.update({
+            "step_id": step["id"],
+            "objective": context.get("objective"),
+            "context": context.get("objective", ""),
+            "upstream": upstream,
+        })
+        if upstream:
+            # Agents that review previous work (e.g. the verifier) read it from "content"
+            input_data.setdefault("content", "\n\n".join(f"[{dep}] {_summarize(result)}" for dep, result in upstream.items()))
+        return input_data
+
+    async def _run_step(self, job_id: str, step: Dict[str, Any], input_data: Dict[str, Any], started: float) -> Any:
+        queued_at = time.perf_counter()
+        async with self._semaphore(step["agent"]):
+            start = time.perf_counter()
+            step["status"] = "in_progress"
+            QUEUE_WAIT.observe(start - queued_at, "step")
+            status = "failed"
+            try:
+                with tracer.span("step", step_id=step["id"], agent=step["agent"], wait=round(start - queued_at, 4)):
+                    agent = self.agent_factory(step["agent"], job_id)
+                    result = await agent.run(input_data)
+                status = "failed" if isinstance(result, dict) and result.get("status") == "failed" else "completed"
+                return result
+            finally:
+                end = time.perf_counter()
+                STEP_LATENCY.observe(end - start, step["agent"], status)
+                step["timing"] = {
+                    "start": round(start - started, 4),
+                    "end": round(end - started, 4),
+                    "duration": round(end - start, 4),
+                    "wait": round(start - queued_at, 4),
+                }
+
+    async def execute(
+        self,
+        job_id: str,
+        steps: List[Dict[str, Any]],
+        context: Optional[Dict[str, Any]] = None,
+        on_update: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        incoming: Optional[AsyncIterator[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Executes the plan and returns a report with per-step results and a critical-path breakdown.
+        Steps are updated in place (status, result, timing) so callers can expose live progress.
+
+        With `incoming` (raw planner steps, e.g. a StepStream), `steps` grows as they arrive and each
+        step starts as soon as its dependencies are known and done, while the planner is still
+        generating. The complete plan is validated once the stream ends; until then a dependency on
+        a step that has not arrived yet simply waits.
+        """
+        context = context or {}
+        topological_order(steps)
+        by_id = {step["id"]: step for step in steps}
+        results: Dict[str, Any] = {}
+        remaining = set(by_id)
+        running: Dict[asyncio.Task, str] = {}
+        started = time.perf_counter()
+        next_step = asyncio.ensure_future(anext(incoming)) if incoming is not None else None
+
+        async def notify(step):
+            if on_update is not None:
+                await on_update(step)
+
+        try:
+            while remaining or running or next_step is not None:
+                for step_id in sorted(remaining):
+                    step = by_id[step_id]
+                    if any(d not in by_id for d in step["dependencies"]):
+                        continue
+                    deps = [by_id[d] for d in step["dependencies"]]
+                    if any(dep["status"] in ("failed", "skipped") for dep in deps):
+                        step["status"] = "skipped"
+                        step["result"] = {"summary": "Skipped because an upstream step did not complete."}
+                        remaining.discard(step_id)
+                        await notify(step)
+                    elif all(dep["status"] == "completed" for dep in deps):
+                        input_data = self._build_input(step, context, results)
+                        task = asyncio.create_task(self._run_step(job_id, step, input_data, started))
+                        running[task] = step_id
+                        remaining.discard(step_id)
+                        step["status"] = "queued"
+                        await notify(step)
+
+                if not running and next_step is None:
+                    continue
+
+                waiting = set(running) | ({next_step} if next_step is not None else set())
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                if next_step in done:
+                    done.discard(next_step)
+                    try:
+                        step = normalize_step(next_step.result(), len(steps))
+                    except StopAsyncIteration:
+                        next_step = None
+                        # The plan is complete: reject unknown dependencies and cycles as for a whole plan
+                        validate_plan(steps)
+                        topological_order(steps)
+                    else:
+                        if step["id"] in by_id:
+                            raise ValueError(f"Plan contains duplicate step id {step['id']}")
+                        steps.append(step)
+                        by_id[step["id"]] = step
+                        remaining.add(step["id"])
+                        await notify(step)
+                        next_step = asyncio.ensure_future(anext(incoming))
+                for task in done:
+                    step = by_id[running.pop(task)]
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        logger.error(f"[{job_id}] Step {step['id']} ({step['agent']}) failed: {e}")
+                        result = {"status": "failed", "error": str(e)}
+
+                    if isinstance(result, dict) and result.get("status") == "failed":
+                        step["status"] = "failed"
+                    else:
+                        step["status"] = "completed"
+                        results[step["id"]] = result
+                    if isinstance(result, dict):
+                        step["result"] = {"summary": _summarize(result), **result}
+                    else:
+                        step["result"] = {"summary": _summarize(result), "value": result}
+                    await notify(step)
+        finally:
+            for task in running:
+                task.cancel()
+            if next_step is not None:
+                next_step.cancel()
+
+        return {
+            # A plan that produced no steps did no work, so it cannot count as completed
+            "status": "completed" if steps and all(step["status"] == "completed" for step in steps) else "failed",
+            "results": results,
+            "timing": self.critical_path(steps, time.perf_counter() - started),
+        }
+
+    @staticmethod
+    def critical_path(steps: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+        """
+        Walks back from the last step to finish, always following the dependency that finished last.
+        """
+        timed = {step["id"]: step for step in steps if step.get("timing")}
+        path: List[str] = []
+        if timed:
+            current = max(timed.values(), key=lambda s: s["timing"]["end"])
+            while current is not None:
+                path.append(current["id"])
+                deps = [timed[d] for d in current["dependencies"] if d in timed]
+                current = max(deps, key=lambda s: s["timing"]["end"]) if deps else None
+            path.reverse()
+
+        return {
+            "wall_seconds": round(wall_seconds, 4),
+            "critical_path": path,
+            "critical_path_seconds": round(sum(timed[s]["timing"]["duration"] for s in path), 4),
+            "steps": {step_id: step["timing"] for step_id, step in timed.items()},
+        }
@@ -0,0 +1,240 @@
+import asyncio
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, AsyncIterable, Dict, Iterable, Iterator, List, Tuple, Union
+
+import numpy as np
+
+from backend.services.rag import rag_service
+
+logger = logging.getLogger(__name__)
+
+INGEST_CHUNK_TOKENS = int(os.getenv("INGEST_CHUNK_TOKENS", "256"))
+INGEST_CHUNK_OVERLAP = int(os.getenv("INGEST_CHUNK_OVERLAP", "32"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_QUEUE_BATCHES = int(os.getenv("INGEST_QUEUE_BATCHES", "4"))
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "2"))
+INGEST_DEDUP_CAPACITY = int(os.getenv("INGEST_DEDUP_CAPACITY", "50000"))
+INGEST_DEDUP_THRESHOLD = float(os.getenv("INGEST_DEDUP_THRESHOLD", "0.8"))
+
+TextSource = Union[str, Iterable[str]]
+
+def iter_chunks(pieces: TextSource, chunk_tokens: int = INGEST_CHUNK_TOKENS, overlap: int = INGEST_CHUNK_OVERLAP) -> Iterator[str]:
+    """
+    Splits a stream of text pieces into overlapping chunks of `chunk_tokens` whitespace tokens.
+    Only one chunk plus one partial token is held in memory, whatever the document size.
+    """
+    if isinstance(pieces, str):
+        pieces = (pieces,)
+    if overlap >= chunk_tokens:
+        raise ValueError("overlap must be smaller than chunk_tokens")
+
+    step = chunk_tokens - overlap
+    tokens: List[str] = []
+    carry = ""
+    emitted = False
+    for piece in pieces:
+        text = carry + piece
+        words = text.split()
+        # A token touching the end of the piece may continue in the next one
+        carry = words.pop() if words and not text[-1].isspace() else ""
+        tokens.extend(words)
+        while len(tokens) >= chunk_tokens:
+            yield " ".join(tokens[:chunk_tokens])
+            emitted = True
+            tokens = tokens[step:]
+
+    if carry:
+        tokens.append(carry)
+    # After a full chunk the first `overlap` tokens were already emitted; only flush new ones
+    if len(tokens) > (overlap if emitted else 0):
+        yield " ".join(tokens)
+
+class NearDuplicateFilter:
+    """
+    Exact-hash plus MinHash/LSH detection of near-identical chunks.
+
+    Signatures are banded so a candidate lookup is a few dict probes; the number of remembered
+    chunks is bounded (oldest forgotten first) so memory stays bounded, and signature storage grows
+    with use up to that bound. Hashes use Python's per-process `hash`, which is fine because the
+    filter is never persisted.
+    """
+    PRIME = (1 << 31) - 1
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle: int = 5,
+                 capacity: int = INGEST_DEDUP_CAPACITY, threshold: float = INGEST_DEDUP_THRESHOLD):
+        rng = np.random.default_rng(1)
+        self.a = rng.integers(1, self.PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self.b = rng.integers(0, self.PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self.shingle_weights = rng.integers(1, 1 << 61, size=shingle, dtype=np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle = shingle
+        self.capacity = capacity
+        self.threshold = threshold
+        self._exact: "OrderedDict[int, None]" = OrderedDict()
+        # Signatures live in a ring buffer (grown up to capacity); each band key points at the newest entry that produced it
+        self._signatures = np.zeros((min(capacity, 1024), num_perm), dtype=np.uint32)
+        self._buckets: Dict[int, int] = {}
+        self._next_id = 0
+
+    def _signature(self, tokens: List[str]) -> np.ndarray:
+        token_hashes = np.array([hash(token) for token in tokens], dtype=np.int64).view(np.uint64)
+        size = min(self.shingle, len(tokens))
+        # Shingle hash = weighted sum of its token hashes (wrapping uint64 arithmetic)
+        windows = np.lib.stride_tricks.sliding_window_view(token_hashes, size)
+        shingles = np.unique((windows * self.shingle_weights[:size]).sum(axis=1) % self.PRIME)
+        return ((self.a * shingles + self.b) % self.PRIME).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        return [hash((band, signature[band * self.rows:(band + 1) * self.rows].tobytes())) for band in range(self.bands)]
+
+    def is_duplicate(self, chunk: str) -> bool:
+        """
+        Returns True if `chunk` (or something close to it) was seen before; otherwise remembers it.
+        """
+        tokens = chunk.lower().split()
+        if not tokens:
+            return True
+        digest = hash(" ".join(tokens))
+        if digest in self._exact:
+            return True
+
+        with np.errstate(over="ignore"):
+            signature = self._signature(tokens)
+        keys = self._band_keys(signature)
+        oldest = self._next_id - self.capacity
+        for key in keys:
+            entry = self._buckets.get(key)
+            if entry is not None and entry >= oldest:
+                if np.count_nonzero(self._signatures[entry % self.capacity] == signature) >= self.threshold * len(signature):
+                    return True
+
+        self._remember(digest, signature, keys)
+        return False
+
+    def _remember(self, digest: int, signature: np.ndarray, keys: List[int]):
+        entry = self._next_id
+        self._next_id += 1
+        slot = entry % self.capacity
+        if slot >= len(self._signatures):
+            grown = np.zeros((min(self.capacity, 2 * len(self._signatures)), self._signatures.shape[1]), dtype=np.uint32)
+            grown[:len(self._signatures)] = self._signatures
+            self._signatures = grown
+        if entry >= self.capacity:
+            # Forget the entry being overwritten, unless a newer one has taken over its bands
+            for key in self._band_keys(self._signatures[slot]):
+                if self._buckets.get(key) == entry - self.capacity:
+                    del self._buckets[key]
+        self._signatures[slot] = signature
+        for key in keys:
+            self._buckets[key] = entry
+
+        self._exact[digest] = None
+        while len(self._exact) > self.capacity:
+            self._exact.popitem(last=False)
+
+Document = Tuple[TextSource, Dict[str, Any]]
+
+class IngestPipeline:
+    """
+    Streaming ingestion into RAG: chunk -> dedup -> bounded batches -> embed/index.
+
+    Chunking runs as a producer feeding a bounded queue of batches; when the embedders fall behind
+    the producer blocks, so memory is bounded by the queue size regardless of corpus size.
+
+    Near-duplicates are dropped within one `ingest` call only. Retrieval is scoped by metadata (e.g.
+    a job id), so a chunk indexed by an earlier call must not stop a later one indexing its own copy.
+    """
+    def __init__(self, rag=None, batch_size: int = INGEST_BATCH_SIZE, queue_batches: int = INGEST_QUEUE_BATCHES,
+                 concurrency: int = INGEST_CONCURRENCY, dedup_capacity: int = INGEST_DEDUP_CAPACITY,
+                 dedup_threshold: float = INGEST_DEDUP_THRESHOLD):
+        self.rag = rag or rag_service
+        self.batch_size = batch_size
+        self.queue_batches = queue_batches
+        self.concurrency = concurrency
+        self.dedup_capacity = dedup_capacity
+        self.dedup_threshold = dedup_threshold
+
+        self.chunks_indexed = 0
+        self.duplicates_skipped = 0
+        self.batches_indexed = 0
+        self.busy_seconds = 0.0
+
+    async def ingest(self, documents: Union[Iterable[Document], AsyncIterable[Document]]) -> Dict[str, Any]:
+        """
+        `documents` yields (text or iterable of text pieces, metadata) pairs. Each chunk is indexed with
+        the document metadata plus its chunk number.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_batches)
+        dedup = NearDuplicateFilter(capacity=self.dedup_capacity, threshold=self.dedup_threshold)
+        start = time.perf_counter()
+        chunks_before = self.chunks_indexed
+        duplicates_before = self.duplicates_skipped
+
+        async def consume():
+            while True:
+                batch = await queue.get()
+                try:
+                    if batch is None:
+                        return
+                    texts, metadatas = batch
+                    await self.rag.add_documents(texts, metadatas)
+                    self.chunks_indexed += len(texts)
+                    self.batches_indexed += 1
+                finally:
+                    queue.task_done()
+
+        consumers = [asyncio.create_task(consume()) for _ in range(self.concurrency)]
+        try:
+            texts: List[str] = []
+            metadatas: List[Dict[str, Any]] = []
+            async for text, metadata in _aiter(documents):
+                for number, chunk in enumerate(iter_chunks(text)):
+                    if dedup.is_duplicate(chunk):
+                        self.duplicates_skipped += 1
+                        continue
+                    texts.append(chunk)
+                    metadatas.append({**metadata, "chunk": number})
+                    if len(texts) == self.batch_size:
+                        await queue.put((texts, metadatas))
+                        texts, metadatas = [], []
+                    elif number % 32 == 0:
+                        # Let consumers run while a large document is being chunked
+                        await asyncio.sleep(0)
+            if texts:
+                await queue.put((texts, metadatas))
+        finally:
+            for _ in consumers:
+                await queue.put(None)
+            await asyncio.gather(*consumers, return_exceptions=True)
+
+        elapsed = time.perf_counter() - start
+        self.busy_seconds += elapsed
+        chunks = self.chunks_indexed - chunks_before
+        return {
+            "chunks_indexed": chunks,
+            "duplicates_skipped": self.duplicates_skipped - duplicates_before,
+            "seconds": round(elapsed, 3),
+            "chunks_per_second": round(chunks / elapsed, 1) if elapsed else 0.0,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "chunks_indexed": self.chunks_indexed,
+            "duplicates_skipped": self.duplicates_skipped,
+            "batches_indexed": self.batches_indexed,
+            "chunks_per_second": round(self.chunks_indexed / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+        }
+
+async def _aiter(items):
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+ingest_pipeline = IngestPipeline()
@@ -0,0 +1,287 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from backend.services.db import ConnectionPool, DB_POOL_SIZE
+from backend.utils.telemetry import DB_FLUSH_LATENCY
+
+logger = logging.getLogger(__name__)
+
+JOB_CACHE_SIZE = int(os.getenv("JOB_CACHE_SIZE", "128"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+JOB_ARCHIVE_INTERVAL_SECONDS = float(os.getenv("JOB_ARCHIVE_INTERVAL_SECONDS", "3600"))
+JOB_LOG_LIMIT = int(os.getenv("JOB_LOG_LIMIT", "500"))
+
+TERMINAL_STATUSES = ("completed", "failed", "rejected", "cancelled")
+
+# Hot queries are kept as constants so each pooled connection's statement cache reuses them
+INSERT_JOB = "INSERT INTO jobs (id, objective, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)"
+UPDATE_JOB = "UPDATE jobs SET status = ?, plan = ?, timing = ?, updated_at = ?, completed_at = ? WHERE id = ?"
+UPSERT_TASK = (
+    "INSERT INTO tasks (id, job_id, step_id, agent, status, description, result, dependencies, timing, created_at, updated_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(id) DO UPDATE SET status = excluded.status, result = excluded.result, "
+    "timing = excluded.timing, updated_at = excluded.updated_at"
+)
+SELECT_JOB = "SELECT id, objective, status, created_at, plan, timing, completed_at FROM jobs WHERE id = ?"
+SELECT_ARCHIVED_JOB = "SELECT id, objective, status, created_at, plan, timing, completed_at FROM jobs_archive WHERE id = ?"
+SELECT_TASKS = "SELECT step_id, agent, status, description, result, dependencies, timing FROM tasks WHERE job_id = ? ORDER BY rowid"
+SELECT_ARCHIVED_TASKS = "SELECT step_id, agent, status, description, result, dependencies, timing FROM tasks_archive WHERE job_id = ? ORDER BY rowid"
+SELECT_ARTIFACTS = "SELECT id, type, path, metadata, created_at FROM artifacts WHERE job_id = ? ORDER BY created_at"
+SELECT_LOGS = "SELECT action, details, timestamp FROM audit_logs WHERE job_id = ? ORDER BY timestamp DESC LIMIT ?"
+SELECT_ARCHIVED_LOGS = "SELECT action, details, timestamp FROM audit_logs_archive WHERE job_id = ? ORDER BY timestamp DESC LIMIT ?"
+
+TASK_COLUMNS = "id, job_id, step_id, agent, status, description, result, dependencies, timing, created_at, updated_at"
+AUDIT_COLUMNS = "id, job_id, action, details, timestamp"
+
+def _loads(value: Optional[str]) -> Any:
+    return json.loads(value) if value else None
+
+class JobStore:
+    """
+    Persistent job records backed by the SQLite schema in db.py.
+
+    Running jobs are held in memory (the executor updates their steps in place) and written through
+    to the database; once a job finishes it moves to a small LRU of recent records, so memory stays
+    flat under sustained load. All SQLite work runs on a thread pool sized to the connection pool.
+    """
+    def __init__(self, pool: Optional[ConnectionPool] = None, cache_size: int = JOB_CACHE_SIZE):
+        self._pool = pool
+        # The pool is created on first use, which can happen on several executor threads at once
+        self._pool_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="job-store")
+        self.cache_size = cache_size
+        self._active: Dict[str, Dict[str, Any]] = {}
+        self._recent: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._archiver: Optional[asyncio.Task] = None
+
+    @property
+    def pool(self) -> ConnectionPool:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool()
+        return self._pool
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # --- Job records ---
+
+    async def create(self, job_id: str, objective: str, status: str = "queued") -> Dict[str, Any]:
+        now = datetime.now().isoformat()
+        record = {
+            "job_id": job_id,
+            "objective": objective,
+            "status": status,
+            "created_at": now,
+            "plan": None,
+            "artifacts": [],
+        }
+        self._active[job_id] = record
+        await self._run(self._insert_job, job_id, objective, status, now)
+        return record
+
+    def _insert_job(self, job_id: str, objective: str, status: str, now: str):
+        with self.pool.connection() as conn:
+            conn.execute(INSERT_JOB, (job_id, objective, status, now, now))
+            conn.commit()
+
+    def get_active(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._active.get(job_id)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        record = self._active.get(job_id)
+        if record is not None:
+            return record
+        record = self._recent.get(job_id)
+        if record is not None:
+            self._recent.move_to_end(job_id)
+            return record
+
+        record = await self._run(self._load_job, job_id)
+        if record is not None:
+            self._remember(record)
+        return record
+
+    async def exists(self, job_id: str) -> bool:
+        return await self.get(job_id) is not None
+
+    def _load_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.pool.connection() as conn:
+            row = conn.execute(SELECT_JOB, (job_id,)).fetchone()
+            select_tasks = SELECT_TASKS
+            if row is None:
+                row = conn.execute(SELECT_ARCHIVED_JOB, (job_id,)).fetchone()
+                select_tasks = SELECT_ARCHIVED_TASKS
+            if row is None:
+                return None
+            tasks = conn.execute(select_tasks, (job_id,)).fetchall()
+            artifacts = conn.execute(SELECT_ARTIFACTS, (job_id,)).fetchall()
+
+        steps = [
+            {
+                "id": task["step_id"],
+                "agent": task["agent"],
+                "instruction": task["description"],
+                "dependencies": _loads(task["dependencies"]) or [],
+                "status": task["status"],
+                "result": _loads(task["result"]),
+                "timing": _loads(task["timing"]),
+            }
+            for task in tasks
+        ]
+        return {
+            "job_id": row["id"],
+            "objective": row["objective"],
+            "status": row["status"],
+            "created_at": row["created_at"],
+            "completed_at": row["completed_at"],
+            "plan": {"steps": steps} if steps else _loads(row["plan"]),
+            "timing": _loads(row["timing"]),
+            "artifacts": [
+                {
+                    "id": artifact["id"],
+                    "type": artifact["type"],
+                    "path": artifact["path"],
+                    "metadata": _loads(artifact["metadata"]),
+                    "created_at": artifact["created_at"],
+                }
+                for artifact in artifacts
+            ],
+        }
+
+    async def save(self, record: Dict[str, Any]):
+        """
+        Writes the job row back. Terminal jobs leave the active set.
+        """
+        now = datetime.now().isoformat()
+        completed_at = None
+        if record["status"] in TERMINAL_STATUSES:
+            completed_at = record.setdefault("completed_at", now)
+        plan = record.get("plan")
+        skeleton = None
+        if plan:
+            skeleton = json.dumps({"steps": [
+                {k: step.get(k) for k in ("id", "agent", "instruction", "dependencies")} for step in plan["steps"]
+            ]})
+        timing = json.dumps(record["timing"]) if record.get("timing") else None
+        await self._run(self._update_job, record["job_id"], record["status"], skeleton, timing, now, completed_at)
+
+        if completed_at is not None and self._active.pop(record["job_id"], None) is not None:
+            self._remember(record)
+
+    def _update_job(self, job_id: str, status: str, plan: Optional[str], timing: Optional[str], now: str, completed_at: Optional[str]):
+        with self.pool.connection() as conn:
+            conn.execute(UPDATE_JOB, (status, plan, timing, now, completed_at, job_id))
+            conn.commit()
+
+    async def save_steps(self, job_id: str, steps: List[Dict[str, Any]]):
+        start = time.perf_counter()
+        await self._run(self._upsert_tasks, job_id, steps)
+        DB_FLUSH_LATENCY.observe(time.perf_counter() - start, "tasks")
+
+    def _upsert_tasks(self, job_id: str, steps: List[Dict[str, Any]]):
+        now = datetime.now().isoformat()
+        rows = [
+            (
+                f"{job_id}:{step['id']}", job_id, step["id"], step.get("agent"), step.get("status"),
+                step.get("instruction"), json.dumps(step.get("result"), default=str),
+                json.dumps(step.get("dependencies", [])), json.dumps(step.get("timing")), now, now,
+            )
+            for step in steps
+        ]
+        with self.pool.connection() as conn:
+            conn.executemany(UPSERT_TASK, rows)
+            conn.commit()
+
+    async def get_logs(self, job_id: str, limit: int = JOB_LOG_LIMIT) -> List[Dict[str, Any]]:
+        return await self._run(self._load_logs, job_id, limit)
+
+    def _load_logs(self, job_id: str, limit: int) -> List[Dict[str, Any]]:
+        with self.pool.connection() as conn:
+            rows = conn.execute(SELECT_LOGS, (job_id, limit)).fetchall()
+            if not rows:
+                rows = conn.execute(SELECT_ARCHIVED_LOGS, (job_id, limit)).fetchall()
+        logs = []
+        for row in reversed(rows):
+            agent, _, action = row["action"].partition(":")
+            details = _loads(row["details"]) or {}
+            logs.append({
+                "timestamp": row["timestamp"],
+                "agent": agent,
+                "message": details.get("message", action) if isinstance(details, dict) else action,
+            })
+        return logs
+
+    def _remember(self, record: Dict[str, Any]):
+        self._recent[record["job_id"]] = record
+        self._recent.move_to_end(record["job_id"])
+        while len(self._recent) > self.cache_size:
+            self._recent.popitem(last=False)
+
+    # --- Archival ---
+
+    async def archive_completed(self, retention_seconds: float = JOB_RETENTION_SECONDS) -> int:
+        """
+        Moves jobs that finished more than `retention_seconds` ago, with their steps and audit records,
+        into the *_archive tables. Relayed worker events are only needed while a job runs and are dropped.
+        """
+        cutoff = (datetime.now() - timedelta(seconds=retention_seconds)).isoformat()
+        archived = await self._run(self._archive, cutoff)
+        if archived:
+            logger.info(f"Archived {archived} completed jobs")
+        return archived
+
+    def _archive(self, cutoff: str) -> int:
+        placeholders = ", ".join("?" for _ in TERMINAL_STATUSES)
+        where = f"status IN ({placeholders}) AND completed_at < ?"
+        params = (*TERMINAL_STATUSES, cutoff)
+        columns = "id, objective, status, created_at, updated_at, plan, timing, completed_at"
+        with self.pool.connection() as conn:
+            # One transaction, so a job is never archived without its steps and audit records moving with it
+            jobs = f"SELECT id FROM jobs WHERE {where}"
+            conn.execute(f"INSERT OR REPLACE INTO jobs_archive ({columns}) SELECT {columns} FROM jobs WHERE {where}", params)
+            conn.execute(f"INSERT OR REPLACE INTO tasks_archive ({TASK_COLUMNS}) SELECT {TASK_COLUMNS} FROM tasks WHERE job_id IN ({jobs})", params)
+            conn.execute(f"INSERT OR REPLACE INTO audit_logs_archive ({AUDIT_COLUMNS}) SELECT {AUDIT_COLUMNS} FROM audit_logs WHERE job_id IN ({jobs})", params)
+            for table in ("tasks", "task_events", "audit_logs"):
+                conn.execute(f"DELETE FROM {table} WHERE job_id IN ({jobs})", params)
+            archived = conn.execute(f"DELETE FROM jobs WHERE {where}", params).rowcount
+            conn.commit()
+        return archived
+
+    async def _archive_loop(self, interval: float):
+        while True:
+            try:
+                await self.archive_completed()
+            except Exception as e:
+                logger.error(f"Job archival failed: {e}")
+            await asyncio.sleep(interval)
+
+    def start_archiver(self, interval: float = JOB_ARCHIVE_INTERVAL_SECONDS):
+        if self._archiver is None:
+            self._archiver = asyncio.create_task(self._archive_loop(interval))
+
+    async def close(self):
+        if self._archiver is not None:
+            self._archiver.cancel()
+            try:
+                await self._archiver
+            except asyncio.CancelledError:
+                pass
+            self._archiver = None
+        if self._pool is not None:
+            await self._run(self._pool.close)
+            self._pool = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"active_jobs": len(self._active), "cached_jobs": len(self._recent)}
+
+job_store = JobStore()
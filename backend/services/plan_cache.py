@@ -0,0 +1,308 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from backend.services.embeddings import embedding_service
+
+logger = logging.getLogger(__name__)
+
+PLAN_CACHE_ENABLED = os.getenv("PLAN_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PLAN_CACHE_PATH = os.getenv("PLAN_CACHE_PATH", "plan_cache.db")
+PLAN_CACHE_EMBED_MODEL = os.getenv("PLAN_CACHE_EMBED_MODEL", "nvidia/nv-embed-qa-4")
+# Cosine similarity at or above which a cached plan is reused as is ...
+PLAN_CACHE_REUSE_THRESHOLD = float(os.getenv("PLAN_CACHE_REUSE_THRESHOLD", "0.97"))
+# ... and at or above which it is adapted to the new objective by PLAN_CACHE_ADAPT_MODEL instead of planning from scratch
+PLAN_CACHE_THRESHOLD = float(os.getenv("PLAN_CACHE_THRESHOLD", "0.90"))
+PLAN_CACHE_ADAPT_MODEL = os.getenv("PLAN_CACHE_ADAPT_MODEL", "meta/llama3-8b-instruct")
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "1000"))
+PLAN_CACHE_TTL_SECONDS = float(os.getenv("PLAN_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+PLAN_CACHE_MIN_SUCCESS_RATE = float(os.getenv("PLAN_CACHE_MIN_SUCCESS_RATE", "0.5"))
+# Uses before a plan's success rate is held against it
+PLAN_CACHE_MIN_USES = int(os.getenv("PLAN_CACHE_MIN_USES", "3"))
+
+class PlanMatch:
+    __slots__ = ("entry_id", "objective", "plan", "similarity", "mode")
+
+    def __init__(self, entry_id: int, objective: str, plan: Dict[str, Any], similarity: float, mode: str):
+        self.entry_id = entry_id
+        self.objective = objective
+        self.plan = plan
+        self.similarity = similarity
+        self.mode = mode  # "reuse" | "adapt"
+
+class PlanCache:
+    """
+    Plans of jobs that completed, keyed by the embedding of their objective.
+
+    The planner looks up the nearest cached objective (cosine similarity over a small exact FAISS
+    index) before calling the LLM: a near-identical objective reuses the plan, a similar one has it
+    adapted by a smaller model, anything else is planned from scratch. Entries are persisted in
+    SQLite and evicted by age, by success rate once they have been used a few times, and by count.
+    """
+    def __init__(self, path: str = PLAN_CACHE_PATH, enabled: bool = PLAN_CACHE_ENABLED):
+        self.path = path
+        self.enabled = enabled
+        self._conn: Optional[sqlite3.Connection] = None
+        self._index: Optional[faiss.IndexIDMap] = None
+        # entry id -> metadata mirrored from the table (plans are read from disk on a hit)
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._load_lock = asyncio.Lock()
+        self._loaded = False
+        # job id -> what the cache did for that job's planning, until the job reports its outcome
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+
+        self.lookups = 0
+        self.reused = 0
+        self.adapted = 0
+        self.misses = 0
+        self.errors = 0
+        self.stored = 0
+        self.evicted = 0
+        self.saved_seconds = 0.0
+
+    # --- Storage (runs in worker threads) ---
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS plan_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                objective TEXT,
+                plan TEXT,
+                vector BLOB,
+                planning_seconds REAL,
+                uses INTEGER DEFAULT 0,
+                successes INTEGER DEFAULT 0,
+                created_at REAL,
+                last_used_at REAL
+            )''')
+            self._conn.commit()
+        return self._conn
+
+    def _load(self):
+        with self._lock:
+            rows = self._get_conn().execute(
+                "SELECT id, objective, vector, planning_seconds, uses, successes, created_at FROM plan_cache"
+            ).fetchall()
+            for entry_id, objective, vector, planning_seconds, uses, successes, created_at in rows:
+                self._add_to_index(entry_id, np.frombuffer(vector, dtype=np.float32))
+                self._entries[entry_id] = {
+                    "objective": objective, "planning_seconds": planning_seconds,
+                    "uses": uses, "successes": successes, "created_at": created_at,
+                }
+            self._evict()
+        logger.info(f"Plan cache loaded {len(self._entries)} plans")
+
+    def _add_to_index(self, entry_id: int, vector: np.ndarray):
+        if self._index is None:
+            self._index = faiss.IndexIDMap(faiss.IndexFlatIP(vector.shape[0]))
+        self._index.add_with_ids(vector.reshape(1, -1), np.array([entry_id], dtype=np.int64))
+
+    def _usable(self, entry: Dict[str, Any], now: float) -> bool:
+        if now - entry["created_at"] > PLAN_CACHE_TTL_SECONDS:
+            return False
+        if entry["uses"] >= PLAN_CACHE_MIN_USES and entry["successes"] / entry["uses"] < PLAN_CACHE_MIN_SUCCESS_RATE:
+            return False
+        return True
+
+    def _evict(self):
+        """
+        Drops expired and unreliable plans, then the least successful (oldest first) beyond the size cap.
+        """
+        now = time.time()
+        victims = [entry_id for entry_id, entry in self._entries.items() if not self._usable(entry, now)]
+        overflow = len(self._entries) - len(victims) - PLAN_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            expired = set(victims)
+            survivors = sorted(
+                (entry_id for entry_id in self._entries if entry_id not in expired),
+                key=lambda i: ((self._entries[i]["successes"] + 1) / (self._entries[i]["uses"] + 1), self._entries[i]["created_at"]),
+            )
+            victims += survivors[:overflow]
+        if not victims:
+            return
+        self._index.remove_ids(np.array(victims, dtype=np.int64))
+        for entry_id in victims:
+            del self._entries[entry_id]
+        conn = self._get_conn()
+        conn.executemany("DELETE FROM plan_cache WHERE id = ?", [(entry_id,) for entry_id in victims])
+        conn.commit()
+        self.evicted += len(victims)
+
+    def _search(self, vector: np.ndarray) -> Optional[Tuple[int, float, str, Dict[str, Any]]]:
+        with self._lock:
+            if self._index is None or self._index.ntotal == 0 or self._index.d != vector.shape[0]:
+                return None
+            now = time.time()
+            scores, ids = self._index.search(vector.reshape(1, -1), min(8, self._index.ntotal))
+            for score, entry_id in zip(scores[0], ids[0]):
+                entry = self._entries.get(int(entry_id))
+                if entry is None or not self._usable(entry, now):
+                    continue
+                row = self._get_conn().execute("SELECT plan FROM plan_cache WHERE id = ?", (int(entry_id),)).fetchone()
+                if row is None:
+                    continue
+                return int(entry_id), float(score), entry["objective"], json.loads(row[0])
+            return None
+
+    def _insert(self, objective: str, plan: Dict[str, Any], vector: np.ndarray, planning_seconds: float):
+        now = time.time()
+        with self._lock:
+            conn = self._get_conn()
+            cursor = conn.execute(
+                "INSERT INTO plan_cache (objective, plan, vector, planning_seconds, created_at, last_used_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (objective, json.dumps(plan), vector.tobytes(), planning_seconds, now, now),
+            )
+            conn.commit()
+            entry_id = cursor.lastrowid
+            self._add_to_index(entry_id, vector)
+            self._entries[entry_id] = {"objective": objective, "planning_seconds": planning_seconds, "uses": 0, "successes": 0, "created_at": now}
+            self._evict()
+
+    def _record_use(self, entry_id: int, success: bool):
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                return
+            entry["uses"] += 1
+            entry["successes"] += int(success)
+            conn = self._get_conn()
+            conn.execute(
+                "UPDATE plan_cache SET uses = ?, successes = ?, last_used_at = ? WHERE id = ?",
+                (entry["uses"], entry["successes"], time.time(), entry_id),
+            )
+            conn.commit()
+            if not self._usable(entry, time.time()):
+                self._evict()
+
+    # --- Public API ---
+
+    async def warm_up(self):
+        """
+        Loads the persisted plans into the index.
+        """
+        if not self._loaded:
+            async with self._load_lock:
+                if not self._loaded:
+                    await asyncio.to_thread(self._load)
+                    self._loaded = True
+
+    async def lookup(self, job_id: str, objective: str) -> Optional[PlanMatch]:
+        """
+        The best usable cached plan for `objective` above the similarity threshold, or None.
+        """
+        record: Dict[str, Any] = {"hit": False, "mode": "miss", "objective": objective}
+        self._jobs[job_id] = record
+        if not self.enabled:
+            record["mode"] = "disabled"
+            return None
+        start = time.perf_counter()
+        self.lookups += 1
+        try:
+            await self.warm_up()
+            vector = (await embedding_service.embed(PLAN_CACHE_EMBED_MODEL, [objective]))[0]
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+            record["vector"] = vector.astype(np.float32)
+            found = await asyncio.to_thread(self._search, record["vector"])
+        except Exception as e:
+            # The cache is an optimisation: plan normally if it cannot be consulted
+            logger.warning(f"Plan cache lookup failed: {e}")
+            self.errors += 1
+            found = None
+        record["lookup_seconds"] = round(time.perf_counter() - start, 4)
+
+        if found is not None:
+            entry_id, similarity, cached_objective, plan = found
+            record["similarity"] = round(similarity, 4)
+            mode = None
+            if similarity >= PLAN_CACHE_REUSE_THRESHOLD:
+                mode = "reuse"
+            elif similarity >= PLAN_CACHE_THRESHOLD and PLAN_CACHE_ADAPT_MODEL:
+                mode = "adapt"
+            if mode is not None:
+                record.update({"hit": True, "mode": mode, "entry_id": entry_id})
+                if mode == "reuse":
+                    self.reused += 1
+                else:
+                    self.adapted += 1
+                return PlanMatch(entry_id, cached_objective, plan, similarity, mode)
+        self.misses += 1
+        return None
+
+    def planned(self, job_id: str, plan: Dict[str, Any], planning_seconds: float):
+        """
+        Records how long planning took for the job (lookup included) and the plan it produced.
+        """
+        record = self._jobs.get(job_id)
+        if record is None:
+            return
+        record["plan"] = plan
+        record["planning_seconds"] = round(planning_seconds, 4)
+        if record["hit"]:
+            original = self._entries.get(record["entry_id"], {}).get("planning_seconds") or 0.0
+            saved = max(0.0, original - planning_seconds)
+            record["saved_seconds"] = round(saved, 4)
+            self.saved_seconds += saved
+
+    async def record_outcome(self, job_id: str, status: str) -> Optional[Dict[str, Any]]:
+        """
+        Feeds the job's outcome back: a reused plan's success rate is updated, and a generated or
+        adapted plan that completed is stored as a new entry. Returns the per-job report (None if the
+        planner never ran).
+        """
+        record = self._jobs.pop(job_id, None)
+        if record is None:
+            return None
+        report = {key: record[key] for key in ("hit", "mode", "similarity", "lookup_seconds", "planning_seconds", "saved_seconds") if key in record}
+        if status not in ("completed", "failed"):
+            # A rejected or cancelled job says nothing about the plan
+            return report
+        success = status == "completed"
+        try:
+            if record["mode"] == "reuse":
+                await asyncio.to_thread(self._record_use, record["entry_id"], success)
+            elif success and "vector" in record and record.get("plan"):
+                # An adapted plan is a different plan: its outcome says nothing about the source entry
+                planning_seconds = record["planning_seconds"]
+                if record["mode"] == "adapt":
+                    # Saved time on later reuse is measured against planning from scratch
+                    planning_seconds = max(planning_seconds, self._entries.get(record["entry_id"], {}).get("planning_seconds") or 0.0)
+                await asyncio.to_thread(self._insert, record["objective"], record["plan"], record["vector"], planning_seconds)
+                self.stored += 1
+        except (sqlite3.Error, RuntimeError) as e:
+            logger.error(f"Plan cache update failed: {e}")
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.reused + self.adapted
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "lookups": self.lookups,
+            "reused": self.reused,
+            "adapted": self.adapted,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": hits / self.lookups if self.lookups else 0.0,
+            "stored": self.stored,
+            "evicted": self.evicted,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+plan_cache = PlanCache()
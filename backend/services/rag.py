@@ -1,76 +1,567 @@
+import asyncio
 import faiss
 import numpy as np
-import pickle
+import json
 import os
-from typing import List, Dict, Any
-from backend.utils.nim_client import nim_client
+import pickle
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from backend.services.embeddings import embedding_service
+from backend.utils.file_lock import file_lock
+from backend.utils.telemetry import tracer, FAISS_SEARCH_LATENCY
+from backend.services.ann import (
+    RAG_INDEX_TYPE, RAG_ANN_ENGINE, RAG_ANN_THRESHOLD, RAG_TRAIN_SAMPLE,
+    build_index, exact_search, index_engine, sample_rows, search_params,
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
+RAG_DIR = os.getenv("RAG_DIR", "rag_index")
+RAG_SEGMENT_TARGET_ROWS = int(os.getenv("RAG_SEGMENT_TARGET_ROWS", "65536"))
+RAG_MERGE_FACTOR = int(os.getenv("RAG_MERGE_FACTOR", "8"))
+RAG_QUERY_MODE = os.getenv("RAG_QUERY_MODE", "hybrid")  # dense | lexical | hybrid
+RAG_EMBED_TIMEOUT_MS = float(os.getenv("RAG_EMBED_TIMEOUT_MS", "2000"))
+RAG_RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+RAG_EXACT_FILTER_ROWS = int(os.getenv("RAG_EXACT_FILTER_ROWS", "50000"))
+MIN_IVF_TRAINING_ROWS = 10000
+
+_WORD = re.compile(r"\w+")
+
+def _fts_query(text: str) -> str:
+    """
+    Free text -> FTS5 query matching any of its terms, with each term quoted so operators are literal.
+    """
+    terms = dict.fromkeys(term.lower() for term in _WORD.findall(text))
+    return " OR ".join(f'"{term}"' for term in terms)
+
+class SegmentStore:
+    """
+    Append-only on-disk layout for the RAG corpus.
+
+    Each add writes its vectors to a new raw float32 segment file and its metadata to SQLite, so the
+    cost of an insert depends only on the batch size. Document ids are the FAISS positions and are
+    contiguous, so a segment is just an id range. Small segments are merged in the background.
+
+    Several processes may share the directory: id allocation, appends and merges hold `writer_lock`,
+    and readers retry when a merge in another process replaced the segment files they listed.
+    """
+    def __init__(self, directory: str = RAG_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock_file = os.path.join(directory, "writer.lock")
+        self._conn = sqlite3.connect(os.path.join(directory, "meta.db"), check_same_thread=False)
+        self._lock = threading.Lock()
+        # Held while segment files are being merged or read in bulk, so a merge never unlinks a file mid-read
+        self.files_lock = threading.RLock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS segments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT,
+                start_id INTEGER,
+                count INTEGER,
+                dimension INTEGER
+            )''')
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                text TEXT,
+                metadata JSON
+            )''')
+            self._ensure_lexical_index()
+            self._conn.commit()
+
+    def _ensure_lexical_index(self):
+        """
+        Filter columns and the FTS5 (BM25) inverted index over documents, backfilled for older stores.
+        """
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+        for column in ("job_id", "url"):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE documents ADD COLUMN {column} TEXT")
+                self._conn.execute(f"UPDATE documents SET {column} = json_extract(metadata, '$.{column}')")
+        self._conn.execute("UPDATE documents SET url = json_extract(metadata, '$.source') WHERE url IS NULL AND json_extract(metadata, '$.source') IS NOT NULL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_job_id ON documents (job_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_url ON documents (url)")
+
+        exists = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'documents_fts'").fetchone()
+        if not exists:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE documents_fts USING fts5(text, content='documents', content_rowid='id', tokenize='unicode61')"
+            )
+            self._conn.execute("INSERT INTO documents_fts (documents_fts) VALUES ('rebuild')")
+
+    def _segment_path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def writer_lock(self):
+        """
+        Exclusive across processes sharing the directory. Not re-entrant.
+        """
+        return file_lock(self.lock_file)
+
+    def segments(self) -> List[Tuple[int, str, int, int, int]]:
+        with self._lock:
+            return self._conn.execute("SELECT id, path, start_id, count, dimension FROM segments ORDER BY start_id").fetchall()
+
+    def count(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT COALESCE(MAX(start_id + count), 0) FROM segments").fetchone()
+        return row[0]
+
+    def dimension(self) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute("SELECT dimension FROM segments LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def append(self, start_id: int, vectors: np.ndarray, texts: List[str], metadatas: List[Dict[str, Any]]):
+        name = f"seg_{start_id:012d}_{len(vectors)}.f32"
+        # Vectors hit the disk before the segment row exists, so a crash leaves at worst an orphan file
+        with open(self._segment_path(name), "wb") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        rows = [
+            (start_id + i, text, json.dumps(meta), meta.get("job_id"), meta.get("url") or meta.get("source"))
+            for i, (text, meta) in enumerate(zip(texts, metadatas))
+        ]
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO segments (path, start_id, count, dimension) VALUES (?, ?, ?, ?)",
+                    (name, start_id, len(vectors), vectors.shape[1])
+                )
+                self._conn.executemany("INSERT INTO documents (id, text, metadata, job_id, url) VALUES (?, ?, ?, ?, ?)", rows)
+                self._conn.executemany("INSERT INTO documents_fts (rowid, text) VALUES (?, ?)", [(row[0], row[1]) for row in rows])
+
+    def read_segment(self, path: str, count: int, dimension: int) -> np.ndarray:
+        return np.memmap(self._segment_path(path), dtype=np.float32, mode="r", shape=(count, dimension))
+
+    def _read_segments(self, read) -> np.ndarray:
+        """
+        Stacks `read(segment, vectors)` over all segments (skipping None). The listing is retried if
+        a merge in another process removed one of its files in the meantime.
+        """
+        for attempt in range(3):
+            parts = []
+            try:
+                with self.files_lock:
+                    for segment in self.segments():
+                        _, path, _, count, dimension = segment
+                        part = read(segment, lambda: self.read_segment(path, count, dimension))
+                        if part is not None:
+                            parts.append(part)
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+                continue
+            return np.vstack(parts) if parts else np.zeros((0, self.dimension() or 0), dtype=np.float32)
+
+    def read_range(self, start: int, stop: int) -> np.ndarray:
+        """
+        Vectors for document ids [start, stop).
+        """
+        def read(segment, vectors):
+            seg_start, count = segment[2], segment[3]
+            lo, hi = max(start, seg_start), min(stop, seg_start + count)
+            return np.array(vectors()[lo - seg_start:hi - seg_start]) if lo < hi else None
+        return self._read_segments(read)
+
+    def read_rows(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Vectors for a sorted array of document ids.
+        """
+        def read(segment, vectors):
+            seg_start, count = segment[2], segment[3]
+            lo, hi = np.searchsorted(ids, [seg_start, seg_start + count])
+            return np.array(vectors()[ids[lo:hi] - seg_start]) if lo < hi else None
+        return self._read_segments(read)
+
+    def get_documents(self, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        if not ids:
+            return {}
+        placeholders = ", ".join("?" for _ in ids)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT id, text, metadata FROM documents WHERE id IN ({placeholders})", ids).fetchall()
+        return {row[0]: {"text": row[1], **json.loads(row[2])} for row in rows}
+
+    def _filter_clause(self, filters: Optional[Dict[str, str]]) -> Tuple[str, List[str]]:
+        conditions, params = [], []
+        for column in ("job_id", "url"):
+            if filters and filters.get(column) is not None:
+                conditions.append(f"{column} = ?")
+                params.append(filters[column])
+        return " AND ".join(conditions), params
+
+    def filter_ids(self, filters: Dict[str, str]) -> np.ndarray:
+        """
+        Sorted ids of documents matching the metadata filters (job_id, url).
+        """
+        where, params = self._filter_clause(filters)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT id FROM documents WHERE {where or '1'} ORDER BY id", params).fetchall()
+        return np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+
+    def lexical_search(self, query: str, k: int, filters: Optional[Dict[str, str]] = None) -> List[Tuple[int, float]]:
+        """
+        BM25 over the inverted index. Returns (id, score) pairs, best first; lower scores are better.
+        """
+        match = _fts_query(query)
+        if not match:
+            return []
+        where, params = self._filter_clause(filters)
+        sql = "SELECT rowid, bm25(documents_fts) AS score FROM documents_fts WHERE documents_fts MATCH ?"
+        if where:
+            sql += f" AND rowid IN (SELECT id FROM documents WHERE {where})"
+        sql += " ORDER BY score LIMIT ?"
+        with self._lock:
+            return self._conn.execute(sql, [match, *params, k]).fetchall()
+
+    def merge_small_segments(self, target_rows: int = RAG_SEGMENT_TARGET_ROWS, factor: int = RAG_MERGE_FACTOR) -> int:
+        """
+        Concatenates the first run of `factor` adjacent small segments into one file.
+        Returns the number of segments merged (0 when there was nothing to do).
+        """
+        with self.writer_lock(), self.files_lock:
+            run: List[Tuple] = []
+            for segment in self.segments():
+                if segment[3] >= target_rows:
+                    run = []
+                    continue
+                run.append(segment)
+                if len(run) == factor:
+                    break
+            if len(run) < factor:
+                return 0
+
+            start_id = run[0][2]
+            count = sum(s[3] for s in run)
+            dimension = run[0][4]
+            name = f"seg_{start_id:012d}_{count}.f32"
+            tmp_path = self._segment_path(name + ".tmp")
+            with open(tmp_path, "wb") as f:
+                for segment in run:
+                    f.write(self.read_segment(segment[1], segment[3], dimension).tobytes())
+            os.replace(tmp_path, self._segment_path(name))
+
+            with self._lock:
+                with self._conn:
+                    self._conn.executemany("DELETE FROM segments WHERE id = ?", [(s[0],) for s in run])
+                    self._conn.execute(
+                        "INSERT INTO segments (path, start_id, count, dimension) VALUES (?, ?, ?, ?)",
+                        (name, start_id, count, dimension)
+                    )
+            for segment in run:
+                if segment[1] != name:
+                    os.unlink(self._segment_path(segment[1]))
+            return len(run)
+
 class RAGService:
-    def __init__(self):
+    def __init__(self, directory: str = RAG_DIR, index_type: str = RAG_INDEX_TYPE):
         self.index = None
-        self.documents = [] # Metadata store
+        self.store: Optional[SegmentStore] = None
+        self.directory = directory
+        self.index_type = index_type
+        self.ann_file = os.path.join(directory, "ann.faiss")
+        self.dimension = 1024 # Depends on embedding model
+        self.embedding_model = "nvidia/nv-embed-qa-4"
+        self._lock = asyncio.Lock()
+        # faiss indexes are not safe for concurrent add/search, and searches run in worker threads
+        self._index_lock = threading.Lock()
+        self._merge_task: Optional[asyncio.Task] = None
+        self._promote_task: Optional[asyncio.Task] = None
+        self.queries = {"dense": 0, "lexical": 0, "hybrid": 0}
+        self.lexical_fallbacks = 0
+        # Legacy single-file layout, imported once on first load
         self.index_file = "rag_index.faiss"
         self.docs_file = "rag_docs.pkl"
-        self.dimension = 1024 # Depends on embedding model
-        self._load_index()
+
+    def _target_engine(self, ntotal: int) -> str:
+        if self.index_type == "auto":
+            return RAG_ANN_ENGINE if ntotal >= RAG_ANN_THRESHOLD else "flat"
+        if self.index_type == "ivfpq" and ntotal < MIN_IVF_TRAINING_ROWS:
+            # Not enough data to train the coarse quantizer yet
+            return "flat"
+        return self.index_type
+
+    def _build_from_store(self, store: SegmentStore, engine: str, ntotal: int) -> faiss.Index:
+        """
+        Builds an index of `engine` over document ids [0, ntotal).
+        """
+        sample = None
+        if engine == "ivfpq":
+            sample = store.read_rows(sample_rows(ntotal, RAG_TRAIN_SAMPLE))
+        index = build_index(engine, self.dimension, sample, ntotal)
+        for start in range(0, ntotal, RAG_SEGMENT_TARGET_ROWS):
+            index.add(np.ascontiguousarray(store.read_range(start, min(ntotal, start + RAG_SEGMENT_TARGET_ROWS))))
+        return index
 
     def _load_index(self):
-        if os.path.exists(self.index_file) and os.path.exists(self.docs_file):
-            self.index = faiss.read_index(self.index_file)
-            with open(self.docs_file, 'rb') as f:
-                self.documents = pickle.load(f)
-        else:
-            self.index = faiss.IndexFlatL2(self.dimension)
-
-    def _save_index(self):
-        faiss.write_index(self.index, self.index_file)
-        with open(self.docs_file, 'wb') as f:
-            pickle.dump(self.documents, f)
+        """
+        Opens the segment store and rebuilds the in-memory index from it. Runs on first use, not at import.
+        """
+        store = SegmentStore(self.directory)
+        if store.count() == 0 and os.path.exists(self.index_file) and os.path.exists(self.docs_file):
+            self._import_legacy_index(store)
+
+        self.dimension = store.dimension() or self.dimension
+        ntotal = store.count()
+        engine = self._target_engine(ntotal)
+        index = None
+        if engine != "flat" and os.path.exists(self.ann_file):
+            saved = faiss.read_index(self.ann_file)
+            if index_engine(saved) == engine and saved.ntotal <= ntotal:
+                # The saved index covers a prefix of the corpus; only the tail needs adding
+                index = saved
+                if index.ntotal < ntotal:
+                    index.add(store.read_range(index.ntotal, ntotal))
+        if index is None:
+            index = self._build_from_store(store, engine, ntotal)
+
+        # Publish both together so concurrent callers never see a half-loaded service
+        self.index, self.store = index, store
+        logger.info(f"Loaded RAG index with {self.index.ntotal} vectors ({index_engine(index)})")
+
+    def _import_legacy_index(self, store: SegmentStore):
+        legacy = faiss.read_index(self.index_file)
+        with open(self.docs_file, 'rb') as f:
+            documents = pickle.load(f)
+        count = min(legacy.ntotal, len(documents))
+        if count:
+            vectors = legacy.reconstruct_n(0, count)
+            store.append(0, vectors, [doc.get("text", "") for doc in documents[:count]], documents[:count])
+            logger.info(f"Imported {count} documents from {self.index_file}")
+
+    async def _ensure_loaded(self):
+        if self.store is None:
+            async with self._lock:
+                if self.store is None:
+                    await asyncio.to_thread(self._load_index)
+
+    async def warm_up(self):
+        """
+        Loads the index ahead of the first query.
+        """
+        await self._ensure_loaded()
+
+    @property
+    def engine(self) -> str:
+        return index_engine(self.index) if self.index is not None else "unloaded"
 
     async def add_documents(self, texts: List[str], metadatas: List[Dict[str, Any]]):
         if not texts:
             return
 
         try:
-            embeddings = await nim_client.embed("nvidia/nv-embed-qa-4", texts)
-            
-            # Ensure dimension matches
-            if len(embeddings[0]) != self.dimension:
-                # Re-init index if dimension mismatch (simple handling)
-                self.dimension = len(embeddings[0])
-                self.index = faiss.IndexFlatL2(self.dimension)
-
-            vectors = np.array(embeddings).astype('float32')
-            self.index.add(vectors)
-            self.documents.extend(metadatas)
-            self._save_index()
+            vectors = await embedding_service.embed(self.embedding_model, texts)
+            await self.add_vectors(vectors, texts, metadatas)
             logger.info(f"Added {len(texts)} documents to RAG index.")
         except Exception as e:
             logger.error(f"Failed to add documents to RAG: {e}")
 
-    async def query(self, query_text: str, k: int = 3) -> List[Dict[str, Any]]:
-        if self.index.ntotal == 0:
-            return []
+    async def add_vectors(self, vectors: np.ndarray, texts: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Appends pre-computed vectors. The cost depends only on the batch, not on the corpus size.
+        """
+        await self._ensure_loaded()
+        async with self._lock:
+            if vectors.shape[1] != self.dimension:
+                if self.index.ntotal:
+                    raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dimension}")
+                self.dimension = vectors.shape[1]
+                self.index = build_index("hnsw" if self.index_type == "hnsw" else "flat", self.dimension)
+
+            await asyncio.to_thread(self._append, vectors, texts, metadatas)
+        self._schedule_merge()
+        self._schedule_promotion()
 
+    def _append(self, vectors: np.ndarray, texts: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Ids come from the shared store under its writer lock, not from this process's index, so
+        processes sharing RAG_DIR never hand out the same ids or segment names.
+        """
+        with self.store.writer_lock():
+            start_id = self.store.count()
+            self._catch_up(start_id)
+            self.store.append(start_id, vectors, texts, metadatas)
+            with self._index_lock:
+                self.index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+
+    def _catch_up(self, ntotal: Optional[int] = None):
+        """
+        Adds vectors other processes appended to the store since this index was built.
+        """
+        if ntotal is None:
+            ntotal = self.store.count()
+        with self._index_lock:
+            current = self.index.ntotal
+            if ntotal > current:
+                self.index.add(np.ascontiguousarray(self.store.read_range(current, ntotal)))
+
+    def _schedule_merge(self):
+        if self._merge_task is None or self._merge_task.done():
+            self._merge_task = asyncio.get_running_loop().create_task(self._merge_segments())
+
+    async def _merge_segments(self):
         try:
-            embeddings = await nim_client.embed("nvidia/nv-embed-qa-4", [query_text])
-            vector = np.array(embeddings).astype('float32')
-            
-            distances, indices = self.index.search(vector, k)
-            
-            results = []
-            for i, idx in enumerate(indices[0]):
-                if idx != -1 and idx < len(self.documents):
-                    doc = self.documents[idx]
-                    doc['score'] = float(distances[0][i])
-                    results.append(doc)
-            
-            return results
+            while await asyncio.to_thread(self.store.merge_small_segments):
+                pass
         except Exception as e:
-            logger.error(f"RAG query failed: {e}")
-            return []
+            logger.error(f"RAG segment merge failed: {e}")
+
+    def _schedule_promotion(self):
+        target = self._target_engine(self.index.ntotal)
+        if target == self.engine:
+            return
+        if self._promote_task is None or self._promote_task.done():
+            self._promote_task = asyncio.get_running_loop().create_task(self._promote(target))
+
+    async def _promote(self, engine: str):
+        """
+        Builds an index of `engine` in the background from a snapshot of the corpus, then swaps it in
+        after catching up on vectors added meanwhile.
+        """
+        try:
+            snapshot = self.index.ntotal
+            logger.info(f"Promoting RAG index from {self.engine} to {engine} at {snapshot} vectors")
+            index = await asyncio.to_thread(self._build_from_store, self.store, engine, snapshot)
+            async with self._lock:
+                current = await asyncio.to_thread(self.store.count)
+                if current > snapshot:
+                    await asyncio.to_thread(lambda: index.add(self.store.read_range(snapshot, current)))
+                with self._index_lock:
+                    self.index = index
+            await asyncio.to_thread(self._save_ann_index, index)
+            logger.info(f"RAG index promoted to {engine}")
+        except Exception as e:
+            logger.error(f"RAG index promotion failed: {e}")
+
+    def _save_ann_index(self, index: faiss.Index):
+        # Written aside and renamed, so another process loading it never reads a partial file
+        tmp_path = f"{self.ann_file}.{os.getpid()}.tmp"
+        faiss.write_index(index, tmp_path)
+        os.replace(tmp_path, self.ann_file)
+
+    def _search(self, vectors: np.ndarray, k: int, nprobe: Optional[int], ef_search: Optional[int],
+                filters: Optional[Dict[str, str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        start = time.perf_counter()
+        kind, result = self._search_index(vectors, k, nprobe, ef_search, filters)
+        FAISS_SEARCH_LATENCY.observe(time.perf_counter() - start, kind)
+        return result
+
+    def _search_index(self, vectors: np.ndarray, k: int, nprobe: Optional[int], ef_search: Optional[int],
+                      filters: Optional[Dict[str, str]]) -> Tuple[str, Tuple[np.ndarray, np.ndarray]]:
+        selector = None
+        if filters:
+            ids = self.store.filter_ids(filters)
+            if len(ids) <= RAG_EXACT_FILTER_ROWS:
+                # A small candidate set is cheaper (and exact) to scan directly than to filter inside the ANN index
+                return "exact", exact_search(self.store.read_rows(ids), ids, vectors, k)
+            selector = faiss.IDSelectorBatch(ids)
+        with self._index_lock:
+            params = search_params(self.index, nprobe, ef_search, selector)
+            if params is None:
+                return "index", self.index.search(vectors, k)
+            return "index", self.index.search(vectors, k, params=params)
+
+    async def _dense_many(self, query_texts: List[str], k: int, nprobe: Optional[int], ef_search: Optional[int],
+                          filters: Optional[Dict[str, str]]) -> Optional[List[List[Tuple[int, float]]]]:
+        """
+        Dense (id, distance) rankings, or None when the embedding service is down or slower than RAG_EMBED_TIMEOUT_MS.
+        """
+        try:
+            # Shielded so a timeout does not cancel embeddings other callers are waiting on
+            vectors = await asyncio.wait_for(
+                asyncio.shield(embedding_service.embed(self.embedding_model, query_texts)), RAG_EMBED_TIMEOUT_MS / 1000
+            )
+        except Exception as e:
+            logger.warning(f"Query embedding unavailable, using lexical retrieval: {e!r}")
+            return None
+        distances, indices = await asyncio.to_thread(self._search, vectors, k, nprobe, ef_search, filters)
+        return [
+            [(int(i), float(d)) for i, d in zip(indices[row], distances[row]) if i != -1]
+            for row in range(len(query_texts))
+        ]
+
+    def _lexical_many(self, query_texts: List[str], k: int, filters: Optional[Dict[str, str]]) -> List[List[Tuple[int, float]]]:
+        return [self.store.lexical_search(text, k, filters) for text in query_texts]
+
+    async def query(self, query_text: str, k: int = 3, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                    mode: Optional[str] = None, filters: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """
+        `mode` is "dense", "lexical" (BM25, no embedding call) or "hybrid" (reciprocal rank fusion of both).
+        `filters` restricts candidates by job_id and/or url before scoring. `nprobe` (IVF-PQ) and
+        `ef_search` (HNSW) trade speed for recall on this query only.
+        """
+        results = await self.query_many([query_text], k, nprobe, ef_search, mode, filters)
+        return results[0] if results else []
+
+    async def query_many(self, query_texts: List[str], k: int = 3, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                         mode: Optional[str] = None, filters: Optional[Dict[str, str]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Embeds all queries in one request and searches them as one batch. Lexical retrieval runs while the
+        embedding is in flight, and is returned on its own if the embedding fails or times out.
+        """
+        mode = mode or RAG_QUERY_MODE
+        await self._ensure_loaded()
+        # Pick up documents other processes sharing RAG_DIR have added
+        await asyncio.to_thread(self._catch_up)
+        if self.index.ntotal == 0 or not query_texts:
+            return [[] for _ in query_texts]
+        # Fusion needs deeper rankings than the final k to be useful
+        depth = max(4 * k, 20) if mode == "hybrid" else k
+
+        with tracer.span("rag.query", mode=mode, queries=len(query_texts)):
+            try:
+                lexical = None
+                if mode != "dense":
+                    lexical = asyncio.ensure_future(asyncio.to_thread(self._lexical_many, query_texts, depth, filters))
+                dense = None
+                if mode != "lexical":
+                    dense = await self._dense_many(query_texts, depth, nprobe, ef_search, filters)
+                    if dense is None:
+                        self.lexical_fallbacks += 1
+                        if lexical is None:
+                            lexical = asyncio.ensure_future(asyncio.to_thread(self._lexical_many, query_texts, k, filters))
+                self.queries[mode] += len(query_texts)
+
+                lexical_rankings = await lexical if lexical is not None else None
+                if dense is None:
+                    rankings = lexical_rankings
+                elif lexical_rankings is None:
+                    rankings = dense
+                else:
+                    rankings = [reciprocal_rank_fusion(d, l) for d, l in zip(dense, lexical_rankings)]
+                rankings = [ranking[:k] for ranking in rankings]
+
+                ids = sorted({doc_id for ranking in rankings for doc_id, _ in ranking})
+                documents = await asyncio.to_thread(self.store.get_documents, ids)
+                return [
+                    [{**documents[doc_id], 'score': score} for doc_id, score in ranking if doc_id in documents]
+                    for ranking in rankings
+                ]
+            except Exception as e:
+                logger.error(f"RAG query failed: {e}")
+                return [[] for _ in query_texts]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "engine": self.engine,
+            "documents": self.index.ntotal if self.index is not None else 0,
+            "queries": dict(self.queries),
+            "lexical_fallbacks": self.lexical_fallbacks,
+        }
+
+def reciprocal_rank_fusion(*rankings: List[Tuple[int, float]], k: int = RAG_RRF_K) -> List[Tuple[int, float]]:
+    """
+    Fuses ranked (id, score) lists by summing 1 / (k + rank); only ranks matter, so BM25 and L2 scales need not agree.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, (doc_id, _) in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
 
 rag_service = RAGService()
@@ -1,63 +1,322 @@
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional, Union, Iterable, AsyncIterable
+import asyncio
+import os
+import re
 import logging
+from collections import OrderedDict
+from functools import lru_cache
 from backend.utils.nim_client import nim_client
 
 logger = logging.getLogger(__name__)
 
+SAFETY_LLM_ESCALATION = os.getenv("SAFETY_LLM_ESCALATION", "ambiguous")  # ambiguous | always | never
+# Approve objectives matching SAFE_INTENTS without the LLM. Off by default: a local "safe" verdict can
+# only ever mean "looks like a routine task", and anything phrased outside the term lists would pass.
+SAFETY_LOCAL_ALLOW = os.getenv("SAFETY_LOCAL_ALLOW", "false").lower() in ("1", "true", "yes")
+SAFETY_CACHE_SIZE = int(os.getenv("SAFETY_CACHE_SIZE", "4096"))
+SAFETY_SCAN_CHUNK_CHARS = int(os.getenv("SAFETY_SCAN_CHUNK_CHARS", "65536"))
+
+# Objectives matching these are rejected without an LLM call
+UNSAFE_PATTERNS = {
+    "malware": r"\b(?:write|create|build|generate|develop|code)\b.{0,40}\b(?:malware|ransomware|keylogger|botnet|trojan|rootkit|computer virus)\b",
+    "fraud": r"\b(?:credit card fraud|carding|phishing (?:kit|page|site|email)s?|money laundering|launder (?:money|funds)|fake (?:invoices|ids?|passports?))\b",
+    "doxxing": r"\b(?:dox+(?:ing)?|find (?:the )?home address of|track (?:down )?(?:my ex|someone's location))\b",
+    "unauthorized_access": r"\b(?:hack into|break into (?:an? |the )?(?:account|server|network)|steal (?:credentials|passwords|identities|identity)|bypass (?:2fa|mfa|authentication|login))\b",
+    "hate_speech": r"\b(?:hate speech|racial slurs?|ethnic cleansing)\b",
+}
+
+# Objectives mentioning these always go to the LLM, even when they look like a routine task
+SENSITIVE_TERMS = [
+    "exploit", "hack", "crack", "password", "credential", "malware", "virus", "payload", "phishing",
+    "weapon", "explosive", "bomb", "drug", "poison", "attack", "ddos", "bypass", "surveillance",
+    "spy", "stalk", "track someone", "personal data", "home address", "scrape profiles", "fraud",
+    "scam", "launder", "counterfeit", "harass", "extremist", "vulnerability", "jailbreak",
+    "kill", "murder", "suicide", "self-harm", "terror", "victim", "ransom", "steal", "without consent",
+]
+
+# Routine tasks (a task verb, then a short description naming a benign deliverable) that
+# SAFETY_LOCAL_ALLOW approves locally when nothing sensitive or PII-like is mentioned
+SAFE_INTENT_RE = re.compile(
+    r"^(?:please )?(?:write|create|build|generate|make|draft|prepare|produce|design|implement|research|"
+    r"summari[sz]e|explain|compare|analy[sz]e|outline|translate|review|test|debug|refactor|document|"
+    r"count|calculate|compute|convert|parse|sort)\b(?: \w+){0,20}$"
+)
+SAFE_DELIVERABLE_RE = re.compile(
+    r"\b(?:reports?|summary|summaries|presentations?|slides?|decks?|unit tests?|tests?|functions?|scripts?|"
+    r"programs?|class(?:es)?|modules?|documentation|readme|outlines?|overview|comparison|analysis|charts?|"
+    r"tables?|spreadsheets?|itinerary|algorithms?|frequenc(?:y|ies)|statistics|averages?|totals?)\b"
+)
+
+PII_PATTERNS = {
+    "email": r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b",
+    "card_number": r"\b(?:\d[ -]?){12,18}\d\b",
+    "ssn": r"\b(?!000|666|9\d\d)\d{3}-(?!00)\d{2}-(?!0000)\d{4}\b",
+    "aws_key": r"\b(?:AKIA|ASIA)[0-9A-Z]{16}\b",
+    "private_key": r"-----BEGIN (?:RSA |EC |DSA |OPENSSH |PGP )?PRIVATE KEY( BLOCK)?-----",
+    "api_key": r"\b(?:sk-[A-Za-z0-9_-]{20,}|gh[pousr]_[A-Za-z0-9]{36}|nvapi-[A-Za-z0-9_-]{20,}|xox[abpr]-[A-Za-z0-9-]{10,})\b",
+    "secret_assignment": r"(?i:\b(?:api[_-]?key|secret|token|password)\s*[:=]\s*['\"]?[A-Za-z0-9_\-/+]{12,})",
+    "keyword": r"(?i:\bssn\b|credit card|password|private key)",
+}
+# Literals a pattern cannot match without (lowercase ones are checked against the lowercased text).
+# A chunk only runs the patterns whose trigger it contains; None means "any digit".
+PII_TRIGGERS = {
+    "email": ("@",),
+    "card_number": None,
+    "ssn": None,
+    "aws_key": ("AKIA", "ASIA"),
+    "private_key": ("PRIVATE KEY",),
+    "api_key": ("sk-", "gh", "nvapi-", "xox"),
+    "secret_assignment": ("key", "secret", "token", "password"),
+    "keyword": ("ssn", "credit card", "password", "private key"),
+}
+LOWERCASE_TRIGGERS = {"secret_assignment", "keyword"}
+# Longest match the chunked scanner must not split across a chunk boundary
+PII_MAX_MATCH = 256
+
+def _compile(patterns: Dict[str, str], flags: int = 0) -> "re.Pattern[str]":
+    return re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in patterns.items()), flags)
+
+UNSAFE_RE = _compile(UNSAFE_PATTERNS, re.IGNORECASE)
+SENSITIVE_RE = re.compile(r"\b(?:" + "|".join(re.escape(term) for term in SENSITIVE_TERMS) + r")", re.IGNORECASE)
+_DIGIT = re.compile(r"\d")
+
+@lru_cache(maxsize=256)
+def _pii_regex(kinds: Tuple[str, ...]) -> "re.Pattern[str]":
+    return _compile({kind: PII_PATTERNS[kind] for kind in kinds})
+
+def _pii_regex_for(text: str) -> Optional["re.Pattern[str]"]:
+    """
+    Combined regex of only the PII patterns whose trigger literals occur in `text`.
+    """
+    lowered = None
+    has_digit = None
+    kinds = []
+    for kind, triggers in PII_TRIGGERS.items():
+        if triggers is None:
+            if has_digit is None:
+                has_digit = _DIGIT.search(text) is not None
+            hit = has_digit
+        elif kind in LOWERCASE_TRIGGERS:
+            lowered = lowered if lowered is not None else text.lower()
+            hit = any(trigger in lowered for trigger in triggers)
+        else:
+            hit = any(trigger in text for trigger in triggers)
+        if hit:
+            kinds.append(kind)
+    return _pii_regex(tuple(kinds)) if kinds else None
+
+def luhn_valid(number: str) -> bool:
+    digits = [int(c) for c in number if c.isdigit()]
+    if not 13 <= len(digits) <= 19:
+        return False
+    total = 0
+    for i, digit in enumerate(reversed(digits)):
+        if i % 2:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return total % 10 == 0
+
+def find_pii_in(text: str) -> List[Dict[str, Any]]:
+    """
+    PII matches in one string as {type, start, end}. Card-like numbers only count if they pass Luhn.
+    """
+    findings = []
+    regex = _pii_regex_for(text)
+    if regex is None:
+        return findings
+    for match in regex.finditer(text):
+        kind = match.lastgroup
+        if kind == "card_number" and not luhn_valid(match.group()):
+            continue
+        findings.append({"type": kind, "start": match.start(), "end": match.end()})
+    return findings
+
+def normalize_objective(objective: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", objective.lower()).split())
+
+TextSource = Union[str, bytes, Iterable[str], AsyncIterable[str]]
+
 class SafetyService:
-    def __init__(self):
+    def __init__(self, escalation: str = SAFETY_LLM_ESCALATION, cache_size: int = SAFETY_CACHE_SIZE,
+                 local_allow: bool = SAFETY_LOCAL_ALLOW):
         self.disallowed_topics = [
-            "illegal acts", "harmful content", "doxxing", "malware generation", 
+            "illegal acts", "harmful content", "doxxing", "malware generation",
             "financial fraud", "unauthorized access", "hate speech"
         ]
+        self.escalation = escalation
+        self.cache_size = cache_size
+        self.local_allow = local_allow
+        self._verdicts: "OrderedDict[str, Tuple[bool, str]]" = OrderedDict()
+
+        self.local_safe = 0
+        self.local_unsafe = 0
+        self.escalated = 0
+        self.cache_hits = 0
+
+    def classify_locally(self, objective: str) -> Tuple[Optional[bool], str]:
+        """
+        Compiled pre-filter, deciding only on clear matches. Returns (False, reason) for denylisted
+        objectives, (True, "Safe") for routine tasks on the allowlist (only with local_allow), and
+        (None, reason) for everything else, which the LLM has to decide.
+        """
+        match = UNSAFE_RE.search(objective)
+        if match:
+            return False, f"NO: Objective matches disallowed category '{match.lastgroup}'."
+        sensitive = SENSITIVE_RE.search(objective)
+        if sensitive:
+            return None, f"mentions '{sensitive.group().lower()}'"
+        pii = find_pii_in(objective)
+        if pii:
+            return None, f"contains {pii[0]['type']}"
+        if not self.local_allow:
+            return None, "no local allowlist"
+        normalized = normalize_objective(objective)
+        if SAFE_INTENT_RE.match(normalized) and SAFE_DELIVERABLE_RE.search(normalized):
+            return True, "Safe"
+        return None, "not a recognised routine task"
 
     async def validate_intent(self, objective: str) -> Tuple[bool, str]:
         """
-        Validates the user objective against safety policies using an LLM.
+        Validates the user objective against safety policies.
+        Clear-cut objectives are decided by the local pre-filter; only ambiguous ones use the LLM.
         Returns (is_safe, reason).
         """
+        key = normalize_objective(objective)
+        cached = self._verdicts.get(key)
+        if cached is not None:
+            self._verdicts.move_to_end(key)
+            self.cache_hits += 1
+            return cached
+
+        verdict, reason = self.classify_locally(objective)
+        if self.escalation == "always" or (verdict is None and self.escalation != "never"):
+            self.escalated += 1
+            logger.info(f"Escalating objective to LLM safety check ({reason})")
+            verdict, reason = await self._validate_with_llm(objective)
+            if reason == self.SYSTEM_ERROR:
+                # Not cached, so the next attempt asks again
+                return verdict, reason
+        elif verdict is None:
+            # Escalation disabled (SAFETY_LLM_ESCALATION=never): whatever the denylist misses is allowed
+            verdict, reason = True, "Safe"
+        elif verdict:
+            self.local_safe += 1
+        else:
+            self.local_unsafe += 1
+            logger.warning(f"Safety violation detected locally: {reason}")
+
+        self._verdicts[key] = (verdict, reason)
+        if len(self._verdicts) > self.cache_size:
+            self._verdicts.popitem(last=False)
+        return verdict, reason
+
+    SYSTEM_ERROR = "Safety check failed due to system error."
+
+    async def _validate_with_llm(self, objective: str) -> Tuple[bool, str]:
         prompt = f"""
         Analyze the following user objective for safety violations.
         Objective: "{objective}"
-        
+
         Policies:
         - No illegal acts or assistance with crime.
         - No generation of malware or exploit code.
         - No doxxing or PII extraction.
         - No financial fraud or scams.
         - No hate speech or harassment.
-        
+
         Is this objective safe to proceed? Answer strictly YES or NO, followed by a brief reason.
         Format: YES/NO: Reason
         """
-        
+
         try:
             response = await nim_client.chat_completion(
                 model="meta/llama3-70b-instruct",
                 messages=[{"role": "user", "content": prompt}],
-                temperature=0.1
+                temperature=0.1,
+                # Every job waits on this call, so a slow upstream response is worth a duplicate request
+                hedge=True,
             )
             content = response["choices"][0]["message"]["content"].strip()
-            
+
             if content.upper().startswith("NO"):
                 logger.warning(f"Safety violation detected: {content}")
                 return False, content
-            
+
             return True, "Safe"
         except Exception as e:
             logger.error(f"Safety check failed: {e}")
             # Fail safe
-            return False, "Safety check failed due to system error."
+            return False, self.SYSTEM_ERROR
 
-    async def scan_pii(self, text: str) -> bool:
+    async def find_pii(self, source: TextSource, chunk_chars: int = SAFETY_SCAN_CHUNK_CHARS) -> List[Dict[str, Any]]:
+        """
+        Scans text (a string, or an iterable / async iterable of text pieces) chunk by chunk, without
+        holding the whole artifact in memory. Returns findings with offsets into the full text.
+        """
+        findings: List[Dict[str, Any]] = []
+        tail = ""
+        offset = 0  # position of `tail` in the full text
+        async for piece in _iter_chunks(source, chunk_chars):
+            window = tail + piece
+            # Matches reaching into the last PII_MAX_MATCH chars may continue in the next piece, so they
+            # are kept in the tail and rescanned with it
+            cut = max(0, len(window) - PII_MAX_MATCH)
+            window_findings = find_pii_in(window)
+            for finding in window_findings:
+                if finding["end"] > cut:
+                    cut = min(cut, finding["start"])
+                    break
+            for finding in window_findings:
+                if finding["end"] <= cut:
+                    findings.append({**finding, "start": finding["start"] + offset, "end": finding["end"] + offset})
+            tail = window[cut:]
+            offset += cut
+            await asyncio.sleep(0)
+        findings.extend({**f, "start": f["start"] + offset, "end": f["end"] + offset} for f in find_pii_in(tail))
+        return findings
+
+    async def scan_pii(self, text: TextSource) -> bool:
         """
         Scans text for PII. Returns True if PII is detected.
-        Placeholder for more advanced PII scanning logic.
+        Accepts a string or a stream of text pieces; see find_pii.
         """
-        # Simple keyword check for demonstration
-        pii_keywords = ["ssn", "credit card", "password", "private key"]
-        if any(keyword in text.lower() for keyword in pii_keywords):
-            return True
-        return False
+        return bool(await self.find_pii(text))
+
+    async def scan_pii_file(self, path: str, chunk_chars: int = SAFETY_SCAN_CHUNK_CHARS) -> bool:
+        """
+        Streams a text file from disk through scan_pii.
+        """
+        async def pieces():
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                while True:
+                    piece = await asyncio.to_thread(f.read, chunk_chars)
+                    if not piece:
+                        return
+                    yield piece
+        return await self.scan_pii(pieces())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "local_safe": self.local_safe,
+            "local_unsafe": self.local_unsafe,
+            "escalated": self.escalated,
+            "cache_hits": self.cache_hits,
+            "cached_verdicts": len(self._verdicts),
+        }
+
+async def _iter_chunks(source: TextSource, chunk_chars: int):
+    if isinstance(source, bytes):
+        source = source.decode("utf-8", errors="replace")
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_chars):
+            yield source[start:start + chunk_chars]
+    elif hasattr(source, "__aiter__"):
+        async for piece in source:
+            yield piece
+    else:
+        for piece in source:
+            yield piece
 
 safety_service = SafetyService()
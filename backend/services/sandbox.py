@@ -0,0 +1,337 @@
+import ast
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+from backend.utils.single_flight import SingleFlight
+from backend.utils.telemetry import SANDBOX_RUN_LATENCY
+
+logger = logging.getLogger(__name__)
+
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", str(os.cpu_count() or 2)))
+SANDBOX_TIMEOUT = float(os.getenv("SANDBOX_TIMEOUT", "30"))
+SANDBOX_CPU_SECONDS = int(os.getenv("SANDBOX_CPU_SECONDS", "30"))
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "1024"))
+SANDBOX_MAX_OUTPUT = int(os.getenv("SANDBOX_MAX_OUTPUT", "65536"))
+SANDBOX_MAX_FILE_BYTES = int(os.getenv("SANDBOX_MAX_FILE_BYTES", str(64 * 1024 * 1024)))
+SANDBOX_PRELOAD = os.getenv(
+    "SANDBOX_PRELOAD",
+    "json,re,math,random,collections,itertools,functools,datetime,typing,dataclasses,unittest,numpy",
+)
+
+SANDBOX_CACHE_ENABLED = os.getenv("SANDBOX_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SANDBOX_CACHE_PATH = os.getenv("SANDBOX_CACHE_PATH", "exec_cache.db")
+SANDBOX_CACHE_MAX_ENTRIES = int(os.getenv("SANDBOX_CACHE_MAX_ENTRIES", "10000"))
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+# Runs a single test case from test_module.py: "Class.method" (unittest) or "function" (plain asserts)
+TEST_RUNNER = """
+import importlib, sys, unittest
+module = importlib.import_module("test_module")
+target = sys.argv[1]
+if "." in target:
+    class_name, method = target.split(".", 1)
+    suite = unittest.TestSuite([getattr(module, class_name)(method)])
+    result = unittest.TextTestRunner(stream=sys.stderr, verbosity=0).run(suite)
+    sys.exit(0 if result.wasSuccessful() else 1)
+getattr(module, target)()
+"""
+
+def discover_tests(code: str) -> List[str]:
+    """
+    Individually runnable test cases in a generated file: argument-less top-level `test_*` functions and
+    `test_*` methods of TestCase subclasses. Returns [] if the file cannot be sharded.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    tests = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("test"):
+            if node.args.args or node.args.posonlyargs or isinstance(node, ast.AsyncFunctionDef):
+                # pytest fixtures / async tests need a real test runner
+                return []
+            tests.append(node.name)
+        elif isinstance(node, ast.ClassDef) and any("TestCase" in ast.unparse(base) for base in node.bases):
+            tests.extend(
+                f"{node.name}.{item.name}" for item in node.body
+                if isinstance(item, ast.FunctionDef) and item.name.startswith("test")
+            )
+    return tests
+
+class ExecutionCache:
+    """
+    On-disk results of previous runs, keyed by a hash of the code, its files, arguments and limits.
+    """
+    def __init__(self, path: str = SANDBOX_CACHE_PATH, max_entries: int = SANDBOX_CACHE_MAX_ENTRIES, enabled: bool = SANDBOX_CACHE_ENABLED):
+        self.path = path
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    @staticmethod
+    def make_key(request: Dict[str, Any]) -> str:
+        # The wall-time limit is left out: only completed runs are stored
+        payload = {k: v for k, v in request.items() if k not in ("id", "timeout")}
+        payload["python"] = sys.version
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS exec_cache (
+                key TEXT PRIMARY KEY,
+                result TEXT,
+                created_at REAL
+            )''')
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._get_conn().execute("SELECT result FROM exec_cache WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, result: Dict[str, Any]):
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO exec_cache (key, result, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(result), time.time())
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                conn.execute(
+                    "DELETE FROM exec_cache WHERE key IN (SELECT key FROM exec_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+            conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+class _Worker:
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.runs = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+class SandboxPool:
+    """
+    Pool of warm Python processes that execute generated code.
+
+    Each worker has the common modules already imported and forks a fresh child per run, so a small
+    script costs a fork instead of an interpreter start. Children run with CPU, memory, file-size and
+    wall-time limits, and their output is capped. Up to `workers` runs execute in parallel.
+    """
+    def __init__(self, workers: int = SANDBOX_WORKERS, preload: str = SANDBOX_PRELOAD, cache: Optional[ExecutionCache] = None):
+        self.workers = workers
+        self.preload = preload
+        self.cache = cache or ExecutionCache()
+        self._inflight = SingleFlight()
+        self._idle: Optional[asyncio.Queue] = None
+        self._all: List[_Worker] = []
+        self._lock = asyncio.Lock()
+        self._ids = itertools.count()
+
+        self.runs = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.workers_started = 0
+        self.busy_seconds = 0.0
+        self.cache_hits = 0
+        self.test_cases = 0
+
+    async def start(self):
+        async with self._lock:
+            if self._idle is not None:
+                return
+            idle: asyncio.Queue = asyncio.Queue()
+            for worker in await asyncio.gather(*(self._spawn() for _ in range(self.workers))):
+                idle.put_nowait(worker)
+            self._idle = idle
+            logger.info(f"Sandbox pool started with {self.workers} workers")
+
+    async def stop(self):
+        async with self._lock:
+            for worker in list(self._all):
+                await self._terminate(worker)
+            self._all = []
+            self._idle = None
+        self.cache.close()
+
+    async def _spawn(self) -> _Worker:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-I", WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            env={"SANDBOX_PRELOAD": self.preload, "PATH": os.environ.get("PATH", "")},
+            # Responses carry up to two capped outputs, JSON-escaped
+            limit=8 * SANDBOX_MAX_OUTPUT + 65536,
+        )
+        ready = await process.stdout.readline()
+        if not ready:
+            raise RuntimeError("Sandbox worker failed to start")
+        worker = _Worker(process)
+        self._all.append(worker)
+        self.workers_started += 1
+        return worker
+
+    async def _terminate(self, worker: _Worker):
+        if worker in self._all:
+            self._all.remove(worker)
+        if worker.alive:
+            worker.process.kill()
+            await worker.process.wait()
+
+    async def run(
+        self,
+        code: str,
+        files: Optional[Dict[str, str]] = None,
+        argv: Optional[List[str]] = None,
+        timeout: float = SANDBOX_TIMEOUT,
+        entrypoint: str = "main.py",
+        use_cache: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Runs `code` as `entrypoint` (alongside any extra `files`) in a fresh sandboxed child.
+        Returns exit_code, stdout, stderr, timed_out, truncated, duration and cached.
+
+        Identical code with identical inputs is executed once: later (or concurrent) runs get the
+        stored result. Timeouts and worker crashes are not cached.
+        """
+        request = {
+            "id": next(self._ids),
+            "code": code,
+            "files": files or {},
+            "argv": argv or [],
+            "entrypoint": entrypoint,
+            "timeout": timeout,
+            "cpu_seconds": SANDBOX_CPU_SECONDS,
+            "memory_bytes": SANDBOX_MEMORY_MB * 1024 * 1024,
+            "file_bytes": SANDBOX_MAX_FILE_BYTES,
+            "max_output": SANDBOX_MAX_OUTPUT,
+        }
+        if not (use_cache and self.cache.enabled):
+            return {**await self._execute(request), "cached": False}
+
+        key = self.cache.make_key(request)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            self.cache_hits += 1
+            return {**cached, "cached": True}
+
+        # Identical concurrent runs share one execution, which outlives any single cancelled caller
+        coalesced = key in self._inflight
+        if coalesced:
+            self.cache_hits += 1
+        result = await self._inflight.do(key, lambda: self._execute_and_store(key, request))
+        return {**result, "cached": coalesced}
+
+    async def _execute_and_store(self, key: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        result = await self._execute(request)
+        if not result["timed_out"] and result["exit_code"] >= 0:
+            await asyncio.to_thread(self.cache.put, key, result)
+        return result
+
+    async def _execute(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if self._idle is None:
+            await self.start()
+
+        worker = await self._idle.get()
+        result = None
+        try:
+            worker.process.stdin.write((json.dumps(request) + "\n").encode())
+            await worker.process.stdin.drain()
+            line = await worker.process.stdout.readline()
+            if line:
+                result = json.loads(line)
+                worker.runs += 1
+        except (BrokenPipeError, ConnectionResetError, ValueError) as e:
+            logger.warning(f"Sandbox worker failed: {e}")
+        finally:
+            if result is None or not worker.alive:
+                # A dead or desynchronised worker is replaced rather than reused
+                await self._terminate(worker)
+                try:
+                    worker = await self._spawn()
+                except Exception as e:
+                    logger.error(f"Failed to respawn sandbox worker: {e}")
+                    worker = None
+            if worker is not None and self._idle is not None:
+                self._idle.put_nowait(worker)
+
+        if result is None:
+            result = {"exit_code": -1, "stdout": "", "stderr": "sandbox worker crashed", "timed_out": False, "truncated": False, "duration": 0.0}
+        result.pop("id", None)
+        SANDBOX_RUN_LATENCY.observe(result["duration"], "timeout" if result["timed_out"] else "ok" if result["exit_code"] == 0 else "error")
+        self.runs += 1
+        self.busy_seconds += result["duration"]
+        if result["timed_out"]:
+            self.timeouts += 1
+        if result["exit_code"] != 0:
+            self.failures += 1
+        return result
+
+    async def run_tests(self, code: str, timeout: float = SANDBOX_TIMEOUT) -> Optional[List[Dict[str, Any]]]:
+        """
+        Splits a generated test file into its test cases and runs each one as its own sandbox run,
+        in parallel across the workers. Returns per-test results, or None if the file has fewer than
+        two shardable tests (run it whole instead).
+        """
+        tests = discover_tests(code)
+        if len(tests) < 2:
+            return None
+
+        async def run_one(test: str) -> Dict[str, Any]:
+            result = await self.run(TEST_RUNNER, files={"test_module.py": code}, argv=[test], timeout=timeout, entrypoint="run_test.py")
+            if result["timed_out"]:
+                status = "timeout"
+            elif result["exit_code"] == 0:
+                status = "passed"
+            else:
+                status = "failed"
+            return {
+                "test": test,
+                "status": status,
+                "duration": result["duration"],
+                "cached": result["cached"],
+                "output": result["stderr"] if status != "passed" else result["stdout"],
+            }
+
+        self.test_cases += len(tests)
+        return list(await asyncio.gather(*(run_one(test) for test in tests)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._all),
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "runs": self.runs,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "workers_started": self.workers_started,
+            "cache_hits": self.cache_hits,
+            "test_cases": self.test_cases,
+            "avg_run_ms": round(1000 * self.busy_seconds / self.runs, 2) if self.runs else 0.0,
+        }
+
+sandbox_pool = SandboxPool()
@@ -0,0 +1,184 @@
+"""
+Warm sandbox worker. Started by backend.services.sandbox as a standalone script (it imports nothing from
+the backend), pre-imports common modules, then serves one JSON request per line on stdin.
+
+Each request runs in a child forked from this warm process: the child starts a new session, applies
+rlimits, redirects stdout/stderr to size-limited files and executes the script as __main__. Forking
+costs a few milliseconds and nothing a script does survives into the next run.
+"""
+import json
+import os
+import resource
+import runpy
+import select
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import traceback
+
+_protocol_fd = None
+
+def _preload(modules):
+    for name in modules:
+        try:
+            __import__(name)
+        except Exception:
+            pass
+
+def _read_capped(path, limit):
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            data = f.read(limit)
+    except OSError:
+        return "", False
+    return data.decode("utf-8", errors="replace"), size > limit
+
+def _child(request, workdir, stdout_path, stderr_path):
+    os.setsid()
+    if _protocol_fd is not None:
+        os.close(_protocol_fd)
+    null = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(null, 0)
+    out = os.open(stdout_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    err = os.open(stderr_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.dup2(out, 1)
+    os.dup2(err, 2)
+
+    cpu = int(request.get("cpu_seconds") or 0)
+    if cpu:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    memory = int(request.get("memory_bytes") or 0)
+    if memory:
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    file_bytes = int(request.get("file_bytes") or 0)
+    if file_bytes:
+        # Writes past the limit fail with EFBIG instead of killing the process
+        signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+        resource.setrlimit(resource.RLIMIT_FSIZE, (file_bytes, file_bytes))
+
+    os.chdir(workdir)
+    sys.path.insert(0, workdir)
+    script = os.path.join(workdir, request.get("entrypoint") or "main.py")
+    sys.argv = [script, *request.get("argv", [])]
+    code = 0
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            code = e.code
+        elif e.code is not None:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except Exception:
+        pass
+    os._exit(code)
+
+def _wait(pid, timeout):
+    """
+    Waits up to `timeout` seconds for the child. Returns its wait status, or None on timeout.
+    """
+    deadline = time.monotonic() + timeout
+    pidfd = os.pidfd_open(pid) if hasattr(os, "pidfd_open") else None
+    try:
+        while True:
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                return status
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if pidfd is not None:
+                select.select([pidfd], [], [], remaining)
+            else:
+                time.sleep(min(remaining, 0.005))
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
+
+def run(request, root):
+    workdir = tempfile.mkdtemp(prefix="run_", dir=root)
+    try:
+        files = request.get("files") or {}
+        files.setdefault(request.get("entrypoint") or "main.py", request.get("code", ""))
+        for name, content in files.items():
+            path = os.path.join(workdir, os.path.normpath(name).lstrip(os.sep))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+        stdout_path = os.path.join(root, os.path.basename(workdir) + ".out")
+        stderr_path = os.path.join(root, os.path.basename(workdir) + ".err")
+
+        start = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _child(request, workdir, stdout_path, stderr_path)
+            finally:
+                # Never fall back into the worker loop from the child
+                os._exit(70)
+        status = _wait(pid, float(request.get("timeout") or 30))
+        timed_out = status is None
+        if timed_out:
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except OSError:
+                pass
+            _, status = os.waitpid(pid, 0)
+        duration = time.perf_counter() - start
+
+        limit = int(request.get("max_output") or 65536)
+        stdout, stdout_truncated = _read_capped(stdout_path, limit)
+        stderr, stderr_truncated = _read_capped(stderr_path, limit)
+        if os.WIFSIGNALED(status):
+            exit_code = -os.WTERMSIG(status)
+        else:
+            exit_code = os.WEXITSTATUS(status)
+        for path in (stdout_path, stderr_path):
+            if os.path.exists(path):
+                os.unlink(path)
+        return {
+            "exit_code": exit_code,
+            "stdout": stdout,
+            "stderr": stderr,
+            "timed_out": timed_out,
+            "truncated": stdout_truncated or stderr_truncated,
+            "duration": duration,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main():
+    global _protocol_fd
+    root = tempfile.mkdtemp(prefix="sandbox_")
+    _preload([name for name in os.environ.get("SANDBOX_PRELOAD", "").split(",") if name])
+    protocol_in = sys.stdin
+    _protocol_fd = os.dup(1)
+    protocol_out = os.fdopen(_protocol_fd, "w")
+    # Anything the worker itself prints must not corrupt the protocol stream
+    os.dup2(2, 1)
+    protocol_out.write(json.dumps({"ready": True}) + "\n")
+    protocol_out.flush()
+    try:
+        for line in protocol_in:
+            request = json.loads(line)
+            try:
+                response = run(request, root)
+            except Exception as e:
+                response = {"exit_code": -1, "stdout": "", "stderr": f"sandbox error: {e}", "timed_out": False, "truncated": False, "duration": 0.0}
+            response["id"] = request.get("id")
+            protocol_out.write(json.dumps(response) + "\n")
+            protocol_out.flush()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import asyncio
+import itertools
+import math
+import os
+import time
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from backend.utils.telemetry import QUEUE_WAIT
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_CONCURRENCY = int(os.getenv("SCHEDULER_CONCURRENCY", "4"))
+SCHEDULER_MAX_QUEUE = int(os.getenv("SCHEDULER_MAX_QUEUE", "100"))
+SCHEDULER_MAX_QUEUE_PER_TENANT = int(os.getenv("SCHEDULER_MAX_QUEUE_PER_TENANT", "20"))
+SCHEDULER_AGING_SECONDS = float(os.getenv("SCHEDULER_AGING_SECONDS", "30"))
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+def _parse_weights(spec: str) -> Dict[str, float]:
+    """
+    Parses "acme=2,beta=1" into {"acme": 2.0, "beta": 1.0}.
+    """
+    weights = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            weights[name.strip()] = float(value)
+    return weights
+
+SCHEDULER_TENANT_WEIGHTS = _parse_weights(os.getenv("SCHEDULER_TENANT_WEIGHTS", ""))
+
+class QueueFullError(Exception):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class _Entry:
+    __slots__ = ("job_id", "tenant", "priority", "runner", "seq", "enqueued_at", "started_at", "cancelled")
+
+    def __init__(self, job_id: str, tenant: str, priority: int, runner: Callable[[], Awaitable[Any]], seq: int):
+        self.job_id = job_id
+        self.tenant = tenant
+        self.priority = priority
+        self.runner = runner
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.cancelled = False
+
+class JobScheduler:
+    """
+    Admission-controlled priority queue in front of a fixed number of concurrently running jobs.
+
+    Within the best priority level, tenants take turns by weighted fair share (the tenant that has
+    received the least service per unit weight goes next). Waiting jobs age up one priority level every
+    SCHEDULER_AGING_SECONDS so low priority work is never starved. When the queue is full, submit raises
+    QueueFullError with a Retry-After estimate instead of accepting work that would only time out.
+    """
+    def __init__(
+        self,
+        concurrency: int = SCHEDULER_CONCURRENCY,
+        max_queue: int = SCHEDULER_MAX_QUEUE,
+        max_queue_per_tenant: int = SCHEDULER_MAX_QUEUE_PER_TENANT,
+        aging_seconds: float = SCHEDULER_AGING_SECONDS,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_queue_per_tenant = max_queue_per_tenant
+        self.aging_seconds = aging_seconds
+        self.weights = weights if weights is not None else SCHEDULER_TENANT_WEIGHTS
+        self._queues: Dict[Tuple[int, str], Deque[_Entry]] = {}
+        self._entries: Dict[str, _Entry] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._tenant_queued: Dict[str, int] = {}
+        # Service received per tenant, scaled by 1 / weight
+        self._virtual_time: Dict[str, float] = {}
+        self._seq = itertools.count()
+        self._avg_service = 10.0
+
+        self.submitted = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.completed = 0
+        self.started = 0
+        self.total_wait = 0.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._entries) - len(self._running)
+
+    @property
+    def overloaded(self) -> bool:
+        """
+        True while jobs are waiting for a slot; optional extra work should be skipped.
+        """
+        return self.queued > 0
+
+    def retry_after(self) -> float:
+        """
+        Seconds until a queue slot is likely to free up, from the average service time.
+        """
+        return max(1.0, math.ceil(self._avg_service * (self.queued + 1) / max(1, self.concurrency) / 2))
+
+    def check_admission(self, tenant: str = "default"):
+        """
+        Raises QueueFullError when a new job for this tenant would not be accepted.
+        """
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError("Job queue is full", self.retry_after())
+        if self._tenant_queued.get(tenant, 0) >= self.max_queue_per_tenant:
+            self.rejected += 1
+            raise QueueFullError(f"Too many queued jobs for tenant {tenant}", self.retry_after())
+
+    def submit(self, job_id: str, runner: Callable[[], Awaitable[Any]], priority: str = "normal", tenant: str = "default"):
+        self.check_admission(tenant)
+
+        entry = _Entry(job_id, tenant, PRIORITIES.get(priority, PRIORITIES["normal"]), runner, next(self._seq))
+        if tenant not in self._virtual_time or not self._tenant_queued.get(tenant):
+            # A tenant returning from idle starts level with the others instead of with banked credit
+            active = [self._virtual_time[t] for t, n in self._tenant_queued.items() if n and t in self._virtual_time]
+            self._virtual_time[tenant] = max(self._virtual_time.get(tenant, 0.0), min(active, default=0.0))
+        self._queues.setdefault((entry.priority, tenant), deque()).append(entry)
+        self._entries[job_id] = entry
+        self._tenant_queued[tenant] = self._tenant_queued.get(tenant, 0) + 1
+        self.submitted += 1
+        self._dispatch()
+
+    def _pick(self) -> Optional[_Entry]:
+        now = time.monotonic()
+        best_key, best_rank = None, None
+        for key, queue in self._queues.items():
+            if not queue:
+                continue
+            head = queue[0]
+            aged = head.priority - (now - head.enqueued_at) / self.aging_seconds if self.aging_seconds else head.priority
+            rank = (math.floor(aged), self._virtual_time.get(head.tenant, 0.0), head.seq)
+            if best_rank is None or rank < best_rank:
+                best_key, best_rank = key, rank
+        if best_key is None:
+            return None
+        entry = self._queues[best_key].popleft()
+        if not self._queues[best_key]:
+            del self._queues[best_key]
+        return entry
+
+    def _dispatch(self):
+        while len(self._running) < self.concurrency:
+            entry = self._pick()
+            if entry is None:
+                return
+            self._tenant_queued[entry.tenant] -= 1
+            self._virtual_time[entry.tenant] = self._virtual_time.get(entry.tenant, 0.0) + 1.0 / self.weights.get(entry.tenant, 1.0)
+            entry.started_at = time.monotonic()
+            self.started += 1
+            self.total_wait += entry.started_at - entry.enqueued_at
+            QUEUE_WAIT.observe(entry.started_at - entry.enqueued_at, "job")
+            task = asyncio.get_running_loop().create_task(self._run(entry))
+            self._running[entry.job_id] = task
+
+    async def _run(self, entry: _Entry):
+        try:
+            await entry.runner()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Scheduled job {entry.job_id} failed: {e}")
+        finally:
+            service = time.monotonic() - entry.started_at
+            self._avg_service = 0.8 * self._avg_service + 0.2 * service
+            # A job stopped through cancel() was already counted there
+            if not entry.cancelled:
+                self.completed += 1
+            self._running.pop(entry.job_id, None)
+            self._entries.pop(entry.job_id, None)
+            self._dispatch()
+
+    def timing(self, job_id: str) -> Dict[str, float]:
+        """
+        Queue wait so far (or in total, once started) and service time so far.
+        """
+        entry = self._entries.get(job_id)
+        if entry is None:
+            return {}
+        now = time.monotonic()
+        if entry.started_at is None:
+            return {"queue_wait_seconds": round(now - entry.enqueued_at, 4)}
+        return {
+            "queue_wait_seconds": round(entry.started_at - entry.enqueued_at, 4),
+            "service_seconds": round(now - entry.started_at, 4),
+        }
+
+    def position(self, job_id: str) -> Optional[str]:
+        entry = self._entries.get(job_id)
+        if entry is None:
+            return None
+        return "running" if job_id in self._running else "queued"
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """
+        Removes a queued job or cancels a running one. Returns "queued", "running", or None if unknown.
+        """
+        entry = self._entries.get(job_id)
+        if entry is None:
+            return None
+        self.cancelled += 1
+        task = self._running.get(job_id)
+        if task is not None:
+            entry.cancelled = True
+            task.cancel()
+            return "running"
+        queue = self._queues.get((entry.priority, entry.tenant))
+        if queue is not None:
+            queue.remove(entry)
+            if not queue:
+                del self._queues[(entry.priority, entry.tenant)]
+        self._tenant_queued[entry.tenant] -= 1
+        del self._entries[job_id]
+        return "queued"
+
+    async def stop(self):
+        for task in list(self._running.values()):
+            task.cancel()
+        if self._running:
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": len(self._running),
+            "queued": self.queued,
+            "concurrency": self.concurrency,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+            "completed": self.completed,
+            "avg_queue_wait_seconds": round(self.total_wait / self.started, 4) if self.started else 0.0,
+            "avg_service_seconds": round(self._avg_service, 4),
+        }
+
+job_scheduler = JobScheduler()
@@ -0,0 +1,290 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.services.db import ConnectionPool
+from backend.services.events import event_bus
+
+logger = logging.getLogger(__name__)
+
+TASK_LEASE_SECONDS = float(os.getenv("TASK_LEASE_SECONDS", "30"))
+TASK_HEARTBEAT_SECONDS = float(os.getenv("TASK_HEARTBEAT_SECONDS", "5"))
+TASK_POLL_SECONDS = float(os.getenv("TASK_POLL_SECONDS", "0.5"))
+TASK_MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "3"))
+TASK_EVENT_FLUSH_MS = float(os.getenv("TASK_EVENT_FLUSH_MS", "100"))
+# Agent types the API hands to worker processes instead of running in-process ("*" for all)
+REMOTE_AGENTS = {a.strip() for a in os.getenv("REMOTE_AGENTS", "").split(",") if a.strip()}
+
+ENQUEUE_TASK = (
+    "INSERT INTO tasks (id, job_id, step_id, agent, status, input, attempts, created_at, updated_at) "
+    "VALUES (?, ?, ?, ?, 'queued', ?, 0, ?, ?) "
+    "ON CONFLICT(id) DO UPDATE SET status = 'queued', input = excluded.input, result = NULL, "
+    "lease_owner = NULL, lease_expires_at = NULL, attempts = 0, updated_at = excluded.updated_at"
+)
+# A task is claimable when it has never been leased or its holder stopped renewing the lease
+CLAIM_TASK = (
+    "UPDATE tasks SET status = 'in_progress', lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1, updated_at = ? "
+    "WHERE id = (SELECT id FROM tasks WHERE input IS NOT NULL AND agent IN ({agents}) "
+    "AND status IN ('queued', 'in_progress') AND (lease_owner IS NULL OR lease_expires_at < ?) AND attempts < ? "
+    "ORDER BY created_at LIMIT 1) "
+    "RETURNING id, job_id, step_id, agent, input, attempts"
+)
+RENEW_LEASES = "UPDATE tasks SET lease_expires_at = ? WHERE lease_owner = ? AND id IN ({ids})"
+SELECT_LEASED = "SELECT id FROM tasks WHERE lease_owner = ? AND id IN ({ids})"
+FINISH_TASK = (
+    "UPDATE tasks SET status = ?, result = ?, input = NULL, lease_owner = NULL, lease_expires_at = NULL, updated_at = ? "
+    "WHERE id = ? AND lease_owner = ?"
+)
+RELEASE_TASK = "UPDATE tasks SET status = 'queued', lease_owner = NULL, lease_expires_at = NULL, attempts = attempts - 1 WHERE id = ? AND lease_owner = ?"
+CANCEL_TASK = "UPDATE tasks SET status = 'cancelled', input = NULL, lease_owner = NULL, updated_at = ? WHERE id = ? AND input IS NOT NULL"
+SELECT_OUTCOME = "SELECT status, result, lease_owner, lease_expires_at, attempts FROM tasks WHERE id = ?"
+ABANDON_TASK = (
+    "UPDATE tasks SET status = 'failed', result = ?, input = NULL, lease_owner = NULL, updated_at = ? "
+    "WHERE id = ? AND input IS NOT NULL AND attempts >= ? AND (lease_owner IS NULL OR lease_expires_at < ?)"
+)
+INSERT_EVENT = "INSERT INTO task_events (task_id, job_id, event) VALUES (?, ?, ?)"
+SELECT_EVENTS = "SELECT id, job_id, event FROM task_events WHERE task_id = ? AND id > ? ORDER BY id"
+DELETE_EVENTS = "DELETE FROM task_events WHERE task_id = ?"
+UPSERT_WORKER = (
+    "INSERT INTO workers (id, host, pid, agents, started_at, last_heartbeat, running) VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(id) DO UPDATE SET last_heartbeat = excluded.last_heartbeat, running = excluded.running"
+)
+
+# The task a worker is running in the current context, so the events its agent publishes can be relayed
+current_task: ContextVar[Optional[str]] = ContextVar("current_task", default=None)
+
+def task_id(job_id: str, step_id: str) -> str:
+    return f"{job_id}:{step_id}"
+
+class LeaseLostError(Exception):
+    pass
+
+class TaskQueue:
+    """
+    Durable hand-off of plan steps between the API process and `python -m backend.worker` processes.
+
+    The API writes a step's input into its row of the tasks table; a worker serving that agent type
+    claims it with a lease, renews the lease while it runs, and writes the result back. A worker that
+    dies stops renewing, so its tasks become claimable again once the lease expires (up to
+    TASK_MAX_ATTEMPTS claims). Every process only needs the shared database file.
+
+    Events the agent publishes in the worker (logs, token deltas) are written to task_events in small
+    batches; the API relays them to the job's live stream while it waits for the result.
+    """
+    def __init__(self, pool: Optional[ConnectionPool] = None, lease_seconds: float = TASK_LEASE_SECONDS):
+        self._pool = pool
+        self.lease_seconds = lease_seconds
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="task-queue")
+        self._outbox: List[Tuple[str, str, str]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+        self.enqueued = 0
+        self.claimed = 0
+        self.finished = 0
+        self.abandoned = 0
+        self.events_relayed = 0
+
+    @property
+    def pool(self) -> ConnectionPool:
+        if self._pool is None:
+            self._pool = ConnectionPool(size=2)
+        return self._pool
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _execute(self, sql: str, params: tuple) -> int:
+        with self.pool.connection() as conn:
+            rowcount = conn.execute(sql, params).rowcount
+            conn.commit()
+        return rowcount
+
+    # --- API side ---
+
+    async def enqueue(self, job_id: str, step_id: str, agent: str, input_data: Dict[str, Any]) -> str:
+        tid = task_id(job_id, step_id)
+        now = datetime.now().isoformat()
+        await self._run(self._execute, ENQUEUE_TASK, (tid, job_id, step_id, agent, json.dumps(input_data, default=str), now, now))
+        self.enqueued += 1
+        return tid
+
+    async def wait_result(self, tid: str, poll_seconds: float = TASK_POLL_SECONDS) -> Any:
+        """
+        Waits for a worker to finish the task and returns its result. Cancelling the wait cancels the task.
+        """
+        last_event = 0
+        try:
+            while True:
+                row, events = await self._run(self._poll, tid, last_event)
+                for event_id, job_id, event in events:
+                    last_event = event_id
+                    event_bus.publish(job_id, json.loads(event))
+                self.events_relayed += len(events)
+                if row is None:
+                    raise LookupError(f"Task {tid} disappeared")
+                if row["status"] in ("completed", "failed") and row["lease_owner"] is None:
+                    await self._run(self._execute, DELETE_EVENTS, (tid,))
+                    return json.loads(row["result"]) if row["result"] else None
+                if row["status"] == "cancelled":
+                    raise asyncio.CancelledError()
+                await asyncio.sleep(poll_seconds)
+        except asyncio.CancelledError:
+            await asyncio.shield(self._run(self._cancel, tid))
+            raise
+
+    def _poll(self, tid: str, after_event: int):
+        row = self._outcome(tid)
+        # Read after the status: workers write a task's events before its result
+        with self.pool.connection() as conn:
+            events = conn.execute(SELECT_EVENTS, (tid, after_event)).fetchall()
+        return row, [tuple(event) for event in events]
+
+    def _cancel(self, tid: str):
+        with self.pool.connection() as conn:
+            conn.execute(CANCEL_TASK, (datetime.now().isoformat(), tid))
+            conn.execute(DELETE_EVENTS, (tid,))
+            conn.commit()
+
+    def _outcome(self, tid: str):
+        now = time.time()
+        with self.pool.connection() as conn:
+            row = conn.execute(SELECT_OUTCOME, (tid,)).fetchone()
+            if row is not None and row["attempts"] >= TASK_MAX_ATTEMPTS and row["status"] not in ("completed", "failed", "cancelled") \
+                    and (row["lease_owner"] is None or row["lease_expires_at"] < now):
+                # Every worker that claimed it died: stop retrying
+                result = json.dumps({"status": "failed", "error": f"Task abandoned after {row['attempts']} attempts"})
+                if conn.execute(ABANDON_TASK, (result, datetime.now().isoformat(), tid, TASK_MAX_ATTEMPTS, now)).rowcount:
+                    self.abandoned += 1
+                conn.commit()
+                row = conn.execute(SELECT_OUTCOME, (tid,)).fetchone()
+        return row
+
+    # --- Worker side ---
+
+    async def claim(self, worker_id: str, agents: List[str]) -> Optional[Dict[str, Any]]:
+        row = await self._run(self._claim, worker_id, agents)
+        if row is None:
+            return None
+        self.claimed += 1
+        return {"id": row["id"], "job_id": row["job_id"], "step_id": row["step_id"], "agent": row["agent"],
+                "input": json.loads(row["input"]), "attempts": row["attempts"]}
+
+    def _claim(self, worker_id: str, agents: List[str]):
+        now = time.time()
+        sql = CLAIM_TASK.format(agents=", ".join("?" for _ in agents))
+        with self.pool.connection() as conn:
+            row = conn.execute(sql, (worker_id, now + self.lease_seconds, datetime.now().isoformat(), *agents, now, TASK_MAX_ATTEMPTS)).fetchone()
+            conn.commit()
+        return row
+
+    async def renew(self, worker_id: str, task_ids: List[str]) -> List[str]:
+        """
+        Extends the leases on the given tasks and returns the ones this worker no longer holds
+        (cancelled by the API, or lost to another worker after a stall).
+        """
+        if not task_ids:
+            return []
+        return await self._run(self._renew, worker_id, task_ids)
+
+    def _renew(self, worker_id: str, task_ids: List[str]) -> List[str]:
+        ids = ", ".join("?" for _ in task_ids)
+        with self.pool.connection() as conn:
+            conn.execute(RENEW_LEASES.format(ids=ids), (time.time() + self.lease_seconds, worker_id, *task_ids))
+            held = {row["id"] for row in conn.execute(SELECT_LEASED.format(ids=ids), (worker_id, *task_ids))}
+            conn.commit()
+        return [tid for tid in task_ids if tid not in held]
+
+    async def finish(self, worker_id: str, tid: str, status: str, result: Any):
+        updated = await self._run(self._execute, FINISH_TASK, (status, json.dumps(result, default=str), datetime.now().isoformat(), tid, worker_id))
+        if not updated:
+            raise LeaseLostError(f"Lease on task {tid} was lost before it finished")
+        self.finished += 1
+
+    def forward_event(self, job_id: str, event: Dict[str, Any]):
+        """
+        `event_bus.forward` hook for worker processes: queues the event for the API, batched every
+        TASK_EVENT_FLUSH_MS. Events published outside a task are dropped.
+        """
+        tid = current_task.get()
+        if tid is None:
+            return
+        self._outbox.append((tid, job_id, json.dumps(event, default=str)))
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(TASK_EVENT_FLUSH_MS / 1000, self._schedule_flush)
+
+    def _schedule_flush(self):
+        self._flush_task = asyncio.get_running_loop().create_task(self.flush_events())
+
+    async def flush_events(self):
+        """
+        Writes queued events now (called before a task's result, so the API sees them first).
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._outbox = self._outbox, []
+        if not batch:
+            return
+        try:
+            await self._run(self._insert_events, batch)
+        except Exception as e:
+            logger.error(f"Failed to relay {len(batch)} task events: {e}")
+
+    def _insert_events(self, batch: List[Tuple[str, str, str]]):
+        with self.pool.connection() as conn:
+            conn.executemany(INSERT_EVENT, batch)
+            conn.commit()
+
+    async def release(self, worker_id: str, tid: str):
+        """
+        Hands an unfinished task back immediately (e.g. on shutdown) instead of waiting for the lease to expire.
+        """
+        await self._run(self._execute, RELEASE_TASK, (tid, worker_id))
+
+    async def heartbeat(self, worker_id: str, agents: List[str], running: int, started_at: str):
+        await self._run(self._execute, UPSERT_WORKER, (worker_id, socket.gethostname(), os.getpid(), ",".join(agents), started_at, time.time(), running))
+
+    async def workers(self) -> List[Dict[str, Any]]:
+        return await self._run(self._workers)
+
+    def _workers(self) -> List[Dict[str, Any]]:
+        cutoff = time.time() - self.lease_seconds
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT id, host, pid, agents, last_heartbeat, running FROM workers WHERE last_heartbeat >= ?", (cutoff,)).fetchall()
+        return [{**dict(row), "agents": row["agents"].split(",")} for row in rows]
+
+    async def close(self):
+        if self._pool is not None:
+            await self._run(self._pool.close)
+            self._pool = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"enqueued": self.enqueued, "claimed": self.claimed, "finished": self.finished, "abandoned": self.abandoned,
+                "events_relayed": self.events_relayed}
+
+class RemoteAgent:
+    """
+    Stands in for an agent whose steps run in a worker process; `run` returns the worker's result.
+    """
+    def __init__(self, agent_name: str, job_id: str, queue: Optional[TaskQueue] = None):
+        self.agent_name = agent_name
+        self.job_id = job_id
+        self.queue = queue or task_queue
+
+    async def run(self, input_data: Dict[str, Any]) -> Any:
+        tid = await self.queue.enqueue(self.job_id, input_data["step_id"], self.agent_name, input_data)
+        return await self.queue.wait_result(tid)
+
+def is_remote(agent_name: str) -> bool:
+    return "*" in REMOTE_AGENTS or agent_name in REMOTE_AGENTS
+
+task_queue = TaskQueue()
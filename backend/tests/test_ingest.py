@@ -0,0 +1,43 @@
+import asyncio
+from typing import Any, Dict, List
+
+from backend.services.ingest import IngestPipeline
+
+class RecordingRAG:
+    """
+    Stands in for RAGService: keeps what was indexed and answers metadata-filtered lookups.
+    """
+    def __init__(self):
+        self.chunks: List[Dict[str, Any]] = []
+
+    async def add_documents(self, texts: List[str], metadatas: List[Dict[str, Any]]):
+        self.chunks.extend({"text": text, **metadata} for text, metadata in zip(texts, metadatas))
+
+    def filtered(self, **filters) -> List[Dict[str, Any]]:
+        return [chunk for chunk in self.chunks if all(chunk.get(key) == value for key, value in filters.items())]
+
+PAGE = " ".join(f"word{i % 97} token{i % 13}" for i in range(2000))
+
+def test_second_job_on_same_sources_indexes_its_own_chunks():
+    async def scenario():
+        rag = RecordingRAG()
+        pipeline = IngestPipeline(rag=rag)
+        first = await pipeline.ingest([(PAGE, {"job_id": "job_1", "url": "https://example.com"})])
+        second = await pipeline.ingest([(PAGE, {"job_id": "job_2", "url": "https://example.com"})])
+
+        assert first["chunks_indexed"] > 0
+        assert second["chunks_indexed"] == first["chunks_indexed"]
+        assert len(rag.filtered(job_id="job_2")) == len(rag.filtered(job_id="job_1"))
+
+    asyncio.run(scenario())
+
+def test_duplicates_within_one_ingest_are_dropped():
+    async def scenario():
+        rag = RecordingRAG()
+        pipeline = IngestPipeline(rag=rag)
+        report = await pipeline.ingest([(PAGE, {"job_id": "job_1", "url": "a"}), (PAGE, {"job_id": "job_1", "url": "b"})])
+
+        assert report["duplicates_skipped"] >= report["chunks_indexed"]
+        assert not rag.filtered(url="b")
+
+    asyncio.run(scenario())
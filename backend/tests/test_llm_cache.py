@@ -0,0 +1,56 @@
+import asyncio
+
+from backend.utils.llm_cache import LLMCache
+
+def test_cancelled_owner_does_not_fail_coalesced_callers(tmp_path):
+    async def scenario():
+        cache = LLMCache(path=str(tmp_path / "llm_cache.db"))
+        calls = 0
+        release = asyncio.Event()
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"choices": [{"message": {"content": "ok"}}]}
+
+        owner = asyncio.create_task(cache.get_or_compute("key", "model", compute))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cache.get_or_compute("key", "model", compute)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+
+        owner.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+
+        assert owner.cancelled()
+        assert all(result["choices"][0]["message"]["content"] == "ok" for result in results)
+        assert calls == 1
+        assert cache.stats()["coalesced"] == 2
+        cache.close()
+
+    asyncio.run(scenario())
+
+def test_computation_is_cancelled_once_every_caller_left(tmp_path):
+    async def scenario():
+        cache = LLMCache(path=str(tmp_path / "llm_cache.db"))
+        cancelled = asyncio.Event()
+
+        async def compute():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        callers = [asyncio.create_task(cache.get_or_compute("key", "model", compute)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert "key" not in cache._inflight
+        cache.close()
+
+    asyncio.run(scenario())
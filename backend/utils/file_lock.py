@@ -0,0 +1,37 @@
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """
+    Exclusive lock on `path` (created if missing) for the duration of the block, held against other
+    processes and other threads alike. Used to serialize appends to files shared by workers.
+    """
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def truncate_to(path: str, size: int):
+    """
+    Cuts `path` back to `size` bytes if it is longer (e.g. the tail of a torn append).
+    """
+    if os.path.exists(path) and os.path.getsize(path) > size:
+        os.truncate(path, size)
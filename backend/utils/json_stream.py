@@ -0,0 +1,161 @@
+import json
+import re
+from collections import deque
+from typing import Any, Deque, List, Optional, Tuple
+
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_CLOSERS = {"{": "}", "[": "]"}
+
+class JSONStreamParser:
+    """
+    Incremental, tolerant parser for JSON emitted by a model as a stream of text deltas.
+
+    Everything before the first `{` or `[` (prose, a ```json fence) and after the matching close is
+    ignored. `feed` returns the elements of the top-level `array_key` array (e.g. "plan", "slides")
+    whose value closed within the delta, so each one can be acted on while the rest is still being
+    generated. A top-level array is treated as that array. `result` returns the whole document.
+    """
+    def __init__(self, array_key: Optional[str] = None):
+        self.array_key = array_key
+        self._text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._element_start: Optional[int] = None
+        self._root_start: Optional[int] = None
+        self._root_end: Optional[int] = None
+        # Recent commas with the brackets open at that point, for repairing a truncated document
+        self._cuts: Deque[Tuple[int, str]] = deque(maxlen=4)
+        self.elements: List[Any] = []
+
+    @property
+    def done(self) -> bool:
+        return self._root_end is not None
+
+    def feed(self, delta: str) -> List[Any]:
+        if self.done or not delta:
+            return []
+        self._text += delta
+        text = self._text
+        emitted: List[Any] = []
+        pos = self._pos
+        while pos < len(text):
+            char = text[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._close_string(pos, emitted)
+            elif self._root_start is None:
+                if char in "{[":
+                    self._root_start = pos
+                    self._open(char, pos)
+            elif char == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif char in "{[":
+                self._open(char, pos)
+            elif char in "}]":
+                if self._close(pos, emitted):
+                    pos += 1
+                    break
+            elif char == "," or char.isspace():
+                if char == ",":
+                    self._cuts.append((pos, "".join(self._stack)))
+                if self._scalar_element_pending():
+                    self._emit(self._element_start, pos, emitted)
+            elif self._element_start is None and self._in_target_array() and not char.isspace() and char != ",":
+                # A bare scalar (number, true/false/null) as an array element
+                self._element_start = pos
+            pos += 1
+        self._pos = pos
+        self.elements.extend(emitted)
+        return emitted
+
+    def result(self) -> Any:
+        """
+        The parsed document. A truncated one is closed off (open string and brackets), falling back to
+        cutting it at its last complete value. Raises ValueError when no JSON value can be recovered.
+        """
+        if self._root_start is None:
+            raise ValueError("No JSON object found in model output")
+        if self.done:
+            candidates = [self._text[self._root_start:self._root_end]]
+        else:
+            tail = self._text[self._root_start:] + ('"' if self._in_string else "")
+            candidates = [tail.rstrip().rstrip(",") + _closing(self._stack)]
+            candidates += [self._text[self._root_start:pos] + _closing(stack) for pos, stack in reversed(self._cuts)]
+        for candidate in candidates:
+            for attempt in (candidate, _TRAILING_COMMA.sub(r"\1", candidate)):
+                try:
+                    return json.loads(attempt)
+                except json.JSONDecodeError:
+                    continue
+        raise ValueError("Model output is not valid JSON")
+
+    def _in_target_array(self) -> bool:
+        return self._array_depth is not None and len(self._stack) == self._array_depth
+
+    def _scalar_element_pending(self) -> bool:
+        return self._element_start is not None and self._in_target_array()
+
+    def _open(self, char: str, pos: int):
+        if self._in_target_array() and self._element_start is None:
+            self._element_start = pos
+        self._stack.append(char)
+        if self._array_depth is None and char == "[":
+            if len(self._stack) == 1 or (len(self._stack) == 2 and self._stack[0] == "{" and self._last_key == self.array_key):
+                self._array_depth = len(self._stack)
+
+    def _close(self, pos: int, emitted: List[Any]) -> bool:
+        if self._scalar_element_pending():
+            self._emit(self._element_start, pos, emitted)
+        if self._stack:
+            self._stack.pop()
+        if self._array_depth is not None and len(self._stack) < self._array_depth:
+            # The target array itself closed; later arrays are not elements
+            self._array_depth = -1
+        if self._in_target_array() and self._element_start is not None:
+            self._emit(self._element_start, pos + 1, emitted)
+        if not self._stack:
+            self._root_end = pos + 1
+            return True
+        return False
+
+    def _close_string(self, pos: int, emitted: List[Any]):
+        if len(self._stack) == 1 and self._stack[0] == "{":
+            try:
+                self._last_key = json.loads(self._text[self._string_start:pos + 1])
+            except json.JSONDecodeError:
+                self._last_key = None
+        elif self._in_target_array() and self._element_start is None:
+            self._emit(self._string_start, pos + 1, emitted)
+
+    def _emit(self, start: int, end: int, emitted: List[Any]):
+        self._element_start = None
+        fragment = self._text[start:end]
+        for attempt in (fragment, _TRAILING_COMMA.sub(r"\1", fragment)):
+            try:
+                emitted.append(json.loads(attempt))
+                return
+            except json.JSONDecodeError:
+                continue
+        # A malformed element is dropped rather than failing the rest of the stream
+
+def _closing(stack) -> str:
+    return "".join(_CLOSERS[c] for c in reversed(stack))
+
+def parse_json(text: str) -> Any:
+    """
+    Tolerant one-shot parse of a complete model response (fences, surrounding prose, trailing commas).
+    """
+    parser = JSONStreamParser()
+    parser.feed(text)
+    return parser.result()
@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from backend.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.3"))
+
+class LLMCache:
+    """
+    Content-addressed cache for chat completions.
+
+    Two tiers: an in-memory LRU in front of a SQLite table with TTL and total-size eviction.
+    Concurrent identical requests are coalesced so only one of them reaches NIM.
+    """
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+        max_temperature: float = LLM_CACHE_MAX_TEMPERATURE,
+        enabled: bool = LLM_CACHE_ENABLED,
+    ):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_temperature = max_temperature
+        self.enabled = enabled
+
+        # key -> (response, upstream_latency, stored_at)
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight = SingleFlight()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes_since_eviction = 0
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bypassed = 0
+        self.latency_saved = 0.0
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        payload = json.dumps(
+            {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, temperature: float) -> bool:
+        return self.enabled and temperature <= self.max_temperature
+
+    # --- Disk tier (runs in worker threads) ---
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT,
+                size INTEGER,
+                latency REAL,
+                created_at REAL,
+                last_access REAL
+            )''')
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)")
+            self._conn.commit()
+        return self._conn
+
+    def _disk_get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            conn = self._get_conn()
+            row = conn.execute("SELECT response, latency, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if time.time() - row[2] > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            return json.loads(row[0]), row[1], row[2]
+
+    def _disk_put(self, key: str, model: str, response: Dict[str, Any], latency: float):
+        body = json.dumps(response)
+        now = time.time()
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, size, latency, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, body, len(body), latency, now, now)
+            )
+            conn.commit()
+            self._writes_since_eviction += 1
+            if self._writes_since_eviction >= 100:
+                self._writes_since_eviction = 0
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total > self.max_bytes:
+            # Drop least recently used rows until we are back under budget
+            excess = total - self.max_bytes
+            freed = 0
+            victims = []
+            for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access ASC"):
+                victims.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            conn.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+            logger.info(f"LLM cache evicted {len(victims)} entries ({freed} bytes)")
+        conn.commit()
+
+    # --- Memory tier ---
+
+    def _memory_get(self, key: str) -> Optional[tuple]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[2] > self.ttl_seconds:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return entry
+
+    def _memory_put(self, key: str, entry: tuple):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    # --- Public API ---
+
+    async def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._memory_get(key)
+        if entry is not None:
+            self.hits_memory += 1
+            self.latency_saved += entry[1]
+            return entry[0]
+
+        try:
+            entry = await asyncio.to_thread(self._disk_get, key)
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache read failed: {e}")
+            entry = None
+        if entry is not None:
+            self.hits_disk += 1
+            self.latency_saved += entry[1]
+            self._memory_put(key, entry)
+            return entry[0]
+        return None
+
+    async def store(self, key: str, model: str, response: Dict[str, Any], latency: float):
+        self._memory_put(key, (response, latency, time.time()))
+        try:
+            await asyncio.to_thread(self._disk_put, key, model, response, latency)
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache write failed: {e}")
+
+    async def get_or_compute(self, key: str, model: str, compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Returns the cached response for `key`, or runs `compute` once no matter how many
+        callers ask for the same key concurrently.
+        """
+        cached = await self.lookup(key)
+        if cached is not None:
+            return cached
+
+        if key in self._inflight:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+
+        async def compute_and_store() -> Dict[str, Any]:
+            start = time.perf_counter()
+            response = await compute()
+            await self.store(key, model, response, time.perf_counter() - start)
+            return response
+
+        return await self._inflight.do(key, compute_and_store)
+
+    def record_bypass(self):
+        self.bypassed += 1
+
+    def record_miss(self):
+        self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.hits_memory + self.hits_disk
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": hits,
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "bypassed": self.bypassed,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "latency_saved_seconds": round(self.latency_saved, 3),
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+llm_cache = LLMCache()
@@ -1,56 +1,354 @@
 import os
+import json
+import time
+import asyncio
 import httpx
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
+from backend.utils.llm_cache import llm_cache
+from backend.utils.telemetry import tracer, current_agent, LLM_LATENCY, LLM_TOKENS, NIM_REQUEST_LATENCY
+from backend.utils.rate_limiter import (
+    AdaptiveRateLimiter, DeadlineExceeded, LatencyTracker, backoff_delay, parse_retry_after, NIM_MAX_RETRIES,
+)
 
 logger = logging.getLogger(__name__)
 
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+def _estimate_tokens(payload: Dict[str, Any]) -> float:
+    # Roughly 4 characters per token for the prompt (or embedding input), plus the completion budget
+    inputs = payload.get("input") or []
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    chars = sum(len(m.get("content") or "") for m in payload.get("messages", [])) + sum(len(text) for text in inputs)
+    return chars / 4 + payload.get("max_tokens", 0)
+
 class NIMClient:
-    def __init__(self, api_key: Optional[str] = None, base_url: str = "https://integrate.api.nvidia.com/v1"):
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
         self.api_key = api_key or os.getenv("NVIDIA_API_KEY")
         if not self.api_key:
             logger.warning("NVIDIA_API_KEY not found. NIM calls will fail.")
-        self.base_url = base_url
+        self.base_url = base_url or os.getenv("NIM_BASE_URL", "https://integrate.api.nvidia.com/v1")
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
 
-    async def chat_completion(self, model: str, messages: List[Dict[str, str]], temperature: float = 0.7) -> Dict[str, Any]:
+        # Transport settings for the shared connection pool
+        self.http2 = os.getenv("NIM_HTTP2", "false").lower() in ("1", "true", "yes")
+        self.max_connections = int(os.getenv("NIM_MAX_CONNECTIONS", "100"))
+        self.max_keepalive_connections = int(os.getenv("NIM_MAX_KEEPALIVE", "20"))
+        self.keepalive_expiry = float(os.getenv("NIM_KEEPALIVE_EXPIRY", "30"))
+        self.timeout = float(os.getenv("NIM_TIMEOUT", "60"))
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # Rate limiting, retries and hedging
+        self.deadline = float(os.getenv("NIM_DEADLINE_SECONDS", "120"))
+        self.max_retries = NIM_MAX_RETRIES
+        self.hedge = os.getenv("NIM_HEDGE", "false").lower() in ("1", "true", "yes")
+        self.hedge_delay = float(os.getenv("NIM_HEDGE_DELAY_MS", "2000")) / 1000
+        self.limiter = AdaptiveRateLimiter()
+        self.latency = LatencyTracker()
+        self.retries = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def _build_client(self) -> httpx.AsyncClient:
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("NIM_HTTP2 is enabled but the 'h2' package is not installed. Falling back to HTTP/1.1.")
+                http2 = False
+
+        # All NIM traffic goes to a single host, so the pool limits are effectively per-host limits.
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        return httpx.AsyncClient(
+            headers=self.headers,
+            limits=limits,
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+            http2=http2,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Shared, long-lived HTTP client. Created lazily so scripts that never call startup() still work.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    async def startup(self):
+        """
+        Opens the shared connection pool. Called from the FastAPI lifespan.
+        """
+        _ = self.client
+        logger.info(
+            f"NIM client ready (http2={self.http2}, max_connections={self.max_connections}, "
+            f"max_keepalive={self.max_keepalive_connections})"
+        )
+
+    async def aclose(self):
+        """
+        Closes the shared connection pool. Called from the FastAPI lifespan.
+        """
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    async def chat_completion(self, model: str, messages: List[Dict[str, str]], temperature: float = 0.7, max_tokens: int = 1024, use_cache: bool = True, deadline: Optional[float] = None, hedge: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        `deadline` bounds the whole call in seconds, retries included (default NIM_DEADLINE_SECONDS).
+        `hedge` sends a duplicate request when the first is slower than the recent p95 (default NIM_HEDGE).
+        """
+        if not (use_cache and llm_cache.is_cacheable(temperature)):
+            llm_cache.record_bypass()
+            return await self._chat_completion(model, messages, temperature, max_tokens, deadline, hedge)
+
+        key = llm_cache.make_key(model, messages, temperature, max_tokens)
+        return await llm_cache.get_or_compute(
+            key, model, lambda: self._chat_completion(model, messages, temperature, max_tokens, deadline, hedge)
+        )
+
+    async def _chat_completion(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int, deadline: Optional[float] = None, hedge: Optional[bool] = None) -> Dict[str, Any]:
         url = f"{self.base_url}/chat/completions"
         payload = {
             "model": model,
             "messages": messages,
             "temperature": temperature,
             "top_p": 1,
-            "max_tokens": 1024,
+            "max_tokens": max_tokens,
             "stream": False
         }
-        async with httpx.AsyncClient() as client:
+        start = time.perf_counter()
+        try:
+            body = await self._post(url, payload, deadline, hedge)
+        except (httpx.HTTPError, DeadlineExceeded) as e:
+            logger.error(f"NIM Chat Completion failed: {e}")
+            raise
+        LLM_LATENCY.observe(time.perf_counter() - start, model, current_agent.get())
+        usage = body.get("usage") or {}
+        if "prompt_tokens" in usage:
+            LLM_TOKENS.observe(usage["prompt_tokens"], model, "prompt")
+        if "completion_tokens" in usage:
+            LLM_TOKENS.observe(usage["completion_tokens"], model, "completion")
+        return body
+
+    def _retry_delay(self, attempt: int, deadline_at: float, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Backoff before the next attempt, or None when retries or the deadline are exhausted.
+        """
+        if attempt >= self.max_retries:
+            return None
+        delay = max(retry_after or 0.0, backoff_delay(attempt))
+        if time.monotonic() + delay >= deadline_at:
+            return None
+        self.retries += 1
+        return delay
+
+    async def _send(self, url: str, payload: Dict[str, Any], deadline_at: float, tokens: float, acquired: bool = False) -> httpx.Response:
+        if not acquired:
+            await self.limiter.acquire(tokens, deadline_at)
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("NIM call deadline exceeded")
+        endpoint = url[len(self.base_url):]
+        with tracer.span("nim.request", endpoint=endpoint) as span:
+            start = time.perf_counter()
+            response = await self.client.post(url, json=payload, timeout=min(self.timeout, remaining))
+            elapsed = time.perf_counter() - start
+            span.set(status=response.status_code)
+        NIM_REQUEST_LATENCY.observe(elapsed, endpoint, str(response.status_code))
+        if response.status_code < 400:
+            self.latency.record(elapsed)
+        return response
+
+    async def _send_hedged(self, url: str, payload: Dict[str, Any], deadline_at: float, tokens: float) -> httpx.Response:
+        """
+        Sends the request and, if it is still outstanding after the recent p95 latency, a duplicate.
+        The first successful response wins and the other request is cancelled. The duplicate is only
+        sent when the rate limiter has a slot free, so hedging never adds to an overload.
+        """
+        primary = asyncio.create_task(self._send(url, payload, deadline_at, tokens))
+        pending = {primary}
+        try:
+            delay = self.latency.percentile(0.95) or self.hedge_delay
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self.limiter.try_acquire(tokens):
+                return await primary
+
+            self.hedged += 1
+            secondary = asyncio.create_task(self._send(url, payload, deadline_at, tokens, acquired=True))
+            pending = {primary, secondary}
+            outcome = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code < 400:
+                        if task is secondary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    outcome = task
+            return outcome.result()
+        finally:
+            # Also reached when the caller is cancelled mid-wait: never leave a request running unowned
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+
+    async def _post(self, url: str, payload: Dict[str, Any], deadline: Optional[float] = None, hedge: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        POSTs through the rate limiter, retrying 429s, 5xx responses and transport errors with jittered
+        exponential backoff until `deadline` seconds have passed.
+        """
+        deadline_at = time.monotonic() + (deadline if deadline is not None else self.deadline)
+        hedge = self.hedge if hedge is None else hedge
+        tokens = _estimate_tokens(payload)
+        attempt = 0
+        while True:
+            try:
+                if hedge:
+                    response = await self._send_hedged(url, payload, deadline_at, tokens)
+                else:
+                    response = await self._send(url, payload, deadline_at, tokens)
+            except httpx.TransportError as e:
+                delay = self._retry_delay(attempt, deadline_at)
+                if delay is None:
+                    raise
+                logger.warning(f"NIM request failed ({e!r}); retrying in {delay:.2f}s")
+            else:
+                if response.status_code < 400:
+                    self.limiter.on_success()
+                    body = response.json()
+                    used = (body.get("usage") or {}).get("total_tokens")
+                    if used is not None:
+                        self.limiter.settle_tokens(tokens, used)
+                    return body
+                if response.status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if response.status_code == 429:
+                    self.limiter.on_throttled(retry_after)
+                delay = self._retry_delay(attempt, deadline_at, retry_after)
+                if delay is None:
+                    response.raise_for_status()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def chat_completion_stream(self, model: str, messages: List[Dict[str, str]], temperature: float = 0.7, max_tokens: int = 1024, use_cache: bool = True) -> AsyncIterator[str]:
+        """
+        Streaming variant of chat_completion. Yields content deltas as the server-sent chunks arrive.
+        A cache hit is replayed as a single delta; a completed stream is stored in the cache.
+        """
+        key = None
+        if use_cache and llm_cache.is_cacheable(temperature):
+            key = llm_cache.make_key(model, messages, temperature, max_tokens)
+            cached = await llm_cache.lookup(key)
+            if cached is not None:
+                yield cached["choices"][0]["message"]["content"]
+                return
+            llm_cache.record_miss()
+        else:
+            llm_cache.record_bypass()
+
+        url = f"{self.base_url}/chat/completions"
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "top_p": 1,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+        parts = []
+        start = time.perf_counter()
+        deadline_at = time.monotonic() + self.deadline
+        tokens = _estimate_tokens(payload)
+        attempt = 0
+        while True:
+            # Failures are retried only until the first delta has been handed to the caller
+            delay = None
+            request_start, response = None, None
             try:
-                response = await client.post(url, json=payload, headers=self.headers, timeout=60.0)
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPError as e:
-                logger.error(f"NIM Chat Completion failed: {e}")
+                await self.limiter.acquire(tokens, deadline_at)
+                request_start = time.perf_counter()
+                async with self.client.stream("POST", url, json=payload) as response:
+                    if response.status_code in RETRYABLE_STATUS:
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                        if response.status_code == 429:
+                            self.limiter.on_throttled(retry_after)
+                        delay = self._retry_delay(attempt, deadline_at, retry_after)
+                    if delay is None:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[len("data:"):].strip()
+                            if data == "[DONE]":
+                                break
+                            try:
+                                chunk = json.loads(data)
+                            except json.JSONDecodeError:
+                                logger.warning(f"Skipping malformed stream chunk: {data[:100]}")
+                                continue
+                            for choice in chunk.get("choices", []):
+                                delta = choice.get("delta", {}).get("content")
+                                if delta:
+                                    parts.append(delta)
+                                    yield delta
+            except httpx.TransportError as e:
+                delay = None if parts else self._retry_delay(attempt, deadline_at)
+                if delay is None:
+                    logger.error(f"NIM Chat Completion stream failed: {e}")
+                    raise
+            except (httpx.HTTPError, DeadlineExceeded) as e:
+                logger.error(f"NIM Chat Completion stream failed: {e}")
                 raise
+            finally:
+                if response is not None:
+                    request_end = time.perf_counter()
+                    tracer.record("nim.request", request_start, request_end, endpoint="/chat/completions", stream=True, status=response.status_code)
+                    NIM_REQUEST_LATENCY.observe(request_end - request_start, "/chat/completions", str(response.status_code))
+            if delay is None:
+                self.limiter.on_success()
+                LLM_LATENCY.observe(time.perf_counter() - start, model, current_agent.get())
+                break
+            attempt += 1
+            await asyncio.sleep(delay)
+
+        if key is not None:
+            # Store in the same shape as a non-streamed completion so both paths share entries
+            response_body = {"choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(parts)}, "finish_reason": "stop"}]}
+            await llm_cache.store(key, model, response_body, time.perf_counter() - start)
 
-    async def embed(self, model: str, input_text: str | List[str]) -> List[List[float]]:
+    async def embed(self, model: str, input_text: str | List[str], deadline: Optional[float] = None) -> List[List[float]]:
         url = f"{self.base_url}/embeddings"
         payload = {
             "model": model,
             "input": input_text,
             "encoding_format": "float"
         }
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(url, json=payload, headers=self.headers, timeout=60.0)
-                response.raise_for_status()
-                data = response.json()
-                return [item["embedding"] for item in data["data"]]
-            except httpx.HTTPError as e:
-                logger.error(f"NIM Embedding failed: {e}")
-                raise
+        try:
+            data = await self._post(url, payload, deadline)
+            return [item["embedding"] for item in data["data"]]
+        except (httpx.HTTPError, DeadlineExceeded) as e:
+            logger.error(f"NIM Embedding failed: {e}")
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.limiter.stats(),
+            "retries": self.retries,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "p95_ms": round(self.latency.percentile(0.95) * 1000, 1) if self.latency.percentile(0.95) is not None else None,
+        }
 
     async def image_generate(self, prompt: str, model: str = "stabilityai/stable-diffusion-xl-base-1.0") -> str:
         # Note: This is a placeholder for the actual NIM image generation endpoint structure
@@ -0,0 +1,194 @@
+import asyncio
+import os
+import random
+import time
+import logging
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+NIM_RATE_LIMIT_RPS = float(os.getenv("NIM_RATE_LIMIT_RPS", "20"))
+NIM_RATE_LIMIT_TPM = float(os.getenv("NIM_RATE_LIMIT_TPM", "0"))
+NIM_RATE_MIN_RPS = float(os.getenv("NIM_RATE_MIN_RPS", "0.5"))
+NIM_RETRY_BASE_MS = float(os.getenv("NIM_RETRY_BASE_MS", "200"))
+NIM_RETRY_MAX_MS = float(os.getenv("NIM_RETRY_MAX_MS", "10000"))
+NIM_MAX_RETRIES = int(os.getenv("NIM_MAX_RETRIES", "5"))
+
+class DeadlineExceeded(Exception):
+    pass
+
+class TokenBucket:
+    """
+    Refills at `rate` units per second up to `capacity`. `acquire` waits for enough units.
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+    def wait_time(self, amount: float = 1.0) -> float:
+        self._refill()
+        # A request larger than the bucket is admitted once the bucket is full
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+    def refund(self, amount: float):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+class AdaptiveRateLimiter:
+    """
+    Client-side limit on requests per second and (optionally) tokens per minute towards NIM; a limit
+    of 0 disables it.
+
+    The request rate adapts AIMD-style: a burst of 429s halves it (never below `min_rps`) and every success
+    raises it by a small step back towards the configured ceiling. A Retry-After from the server
+    pauses all callers until it has passed, so a burst of jobs backs off together instead of each
+    collecting its own 429.
+    """
+    def __init__(self, rps: float = NIM_RATE_LIMIT_RPS, tokens_per_minute: float = NIM_RATE_LIMIT_TPM, min_rps: float = NIM_RATE_MIN_RPS):
+        self.max_rps = rps
+        self.min_rps = min_rps
+        self.requests = TokenBucket(rps, max(1.0, rps)) if rps > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute) if tokens_per_minute > 0 else None
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    @property
+    def rps(self) -> float:
+        return self.requests.rate if self.requests is not None else 0.0
+
+    async def acquire(self, tokens: float = 0.0, deadline: Optional[float] = None):
+        """
+        Waits for a request slot (and `tokens` of token budget). Raises DeadlineExceeded when the wait
+        would run past `deadline` (a time.monotonic() value).
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        start = time.monotonic()
+        # Callers queue on the lock so slots are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                delay = max(0.0, self._paused_until - now)
+                if self.requests is not None:
+                    delay = max(delay, self.requests.wait_time())
+                if self.tokens is not None and tokens:
+                    delay = max(delay, self.tokens.wait_time(tokens))
+                if delay <= 0:
+                    break
+                if deadline is not None and now + delay > deadline:
+                    raise DeadlineExceeded(f"Rate limit wait of {delay:.2f}s exceeds the call deadline")
+                await asyncio.sleep(delay)
+            if self.requests is not None:
+                self.requests.tokens -= 1
+            if self.tokens is not None and tokens:
+                self.tokens.tokens -= min(tokens, self.tokens.capacity)
+        waited = time.monotonic() - start
+        if waited > 0.001:
+            self.wait_seconds += waited
+
+    def try_acquire(self, tokens: float = 0.0) -> bool:
+        """
+        Takes a slot only if one is free right now (used for optional work such as hedged requests).
+        """
+        if time.monotonic() < self._paused_until or (self._lock is not None and self._lock.locked()):
+            return False
+        if self.tokens is not None and tokens and self.tokens.wait_time(tokens) > 0:
+            return False
+        if self.requests is not None and not self.requests.try_acquire():
+            return False
+        if self.tokens is not None and tokens:
+            self.tokens.tokens -= min(tokens, self.tokens.capacity)
+        return True
+
+    def settle_tokens(self, reserved: float, used: float):
+        """
+        Returns the over-estimated part of a token reservation once the real usage is known.
+        """
+        if self.tokens is not None and reserved > used:
+            self.tokens.refund(reserved - used)
+
+    def on_success(self):
+        if self.requests is not None and self.requests.rate < self.max_rps:
+            # About +5% of the ceiling per second of successful traffic at the current rate
+            self.requests.rate = min(self.max_rps, self.requests.rate + self.max_rps * 0.05 / self.requests.rate)
+
+    def on_throttled(self, retry_after: Optional[float] = None):
+        self.throttled += 1
+        if self.requests is None:
+            return
+        now = time.monotonic()
+        # Requests already in flight when the rate was cut report 429s too; count them as one signal
+        if now - self._last_decrease >= 1.0:
+            self._last_decrease = now
+            self.requests.rate = max(self.min_rps, self.requests.rate / 2)
+            self.requests.tokens = min(self.requests.tokens, 0.0)
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            logger.warning(f"NIM rate limited; pausing requests for {retry_after:.1f}s (rate now {self.rps:.1f}/s)")
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "rps": round(self.rps, 2),
+            "max_rps": self.max_rps,
+            "throttled": self.throttled,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "tokens_available": round(self.tokens.tokens, 1) if self.tokens is not None else None,
+        }
+
+class LatencyTracker:
+    """
+    Sliding window of recent latencies, used to pick the hedging delay.
+    """
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self._samples) < 20:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+def backoff_delay(attempt: int, base_ms: float = NIM_RETRY_BASE_MS, max_ms: float = NIM_RETRY_MAX_MS) -> float:
+    """
+    "Full jitter" exponential backoff: uniform in [0, min(max, base * 2^attempt)] seconds.
+    """
+    return random.uniform(0, min(max_ms, base_ms * (2 ** attempt))) / 1000
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Retry-After is either a number of seconds or an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,55 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Runs one computation per key however many callers ask for it concurrently.
+
+    The computation runs in its own task, shared by every caller of the key. A cancelled caller only
+    stops waiting; the task itself is cancelled once the last caller has left, so one disconnecting
+    client never fails the others.
+    """
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Awaits the running computation for `key`, starting `compute()` if there is none.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.get_running_loop().create_task(compute()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._finished(key, flight))
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody is left to use the result; later callers start afresh
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _forget(self, key: Hashable, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def _finished(self, key: Hashable, flight: _Flight):
+        self._forget(key, flight)
+        if not flight.task.cancelled():
+            # Mark retrieved so an error nobody else waited on is not reported as unhandled
+            flight.task.exception()
@@ -0,0 +1,223 @@
+import itertools
+import os
+import time
+import logging
+from bisect import bisect_left
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACE_MAX_JOBS = int(os.getenv("TRACE_MAX_JOBS", "256"))
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "5000"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 4096, 16384)
+
+# --- Metrics ---
+
+class Histogram:
+    """
+    Prometheus-style cumulative histogram keyed by label values. `observe` is a no-op when metrics are disabled.
+    """
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        registry.append(self)
+
+    def observe(self, value: float, *labels: str):
+        if not METRICS_ENABLED:
+            return
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in self._series.items():
+            base = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels))
+            sep = "," if base else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{le}"}} {cumulative}')
+            suffix = f"{{{base}}}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+registry: List[Histogram] = []
+
+def render_metrics() -> str:
+    """
+    All histograms in the Prometheus text exposition format.
+    """
+    lines: List[str] = []
+    for histogram in registry:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+LLM_LATENCY = Histogram("manus_llm_request_seconds", "Chat completion latency, retries included.", ("model", "agent"))
+LLM_TOKENS = Histogram("manus_llm_tokens", "Tokens per chat completion.", ("model", "kind"), TOKEN_BUCKETS)
+NIM_REQUEST_LATENCY = Histogram("manus_nim_http_request_seconds", "Latency of individual NIM HTTP requests.", ("endpoint", "status"))
+EMBEDDING_BATCH_SIZE = Histogram("manus_embedding_batch_size", "Texts per embedding request.", ("model",), SIZE_BUCKETS)
+FAISS_SEARCH_LATENCY = Histogram("manus_faiss_search_seconds", "Vector index search time.", ("kind",))
+SANDBOX_RUN_LATENCY = Histogram("manus_sandbox_run_seconds", "Sandboxed code execution time.", ("outcome",))
+BROWSER_ACTION_LATENCY = Histogram("manus_browser_action_seconds", "Browser agent action time.", ("action",))
+QUEUE_WAIT = Histogram("manus_queue_wait_seconds", "Time spent waiting for a job or step slot.", ("queue",))
+DB_FLUSH_LATENCY = Histogram("manus_db_flush_seconds", "Batched database write time.", ("table",))
+STEP_LATENCY = Histogram("manus_step_seconds", "Plan step execution time.", ("agent", "status"))
+
+# --- Tracing ---
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+# Agent on whose behalf NIM is being called, for the per-agent LLM latency label
+current_agent: ContextVar[str] = ContextVar("current_agent", default="system")
+_span_ids = itertools.count(1)
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attrs", "start", "end", "_token")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[int], attrs: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = next(_span_ids)
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _current_span.reset(self._token)
+        return False
+
+class _NullSpan:
+    """
+    Returned when tracing is off or there is no job trace to attach to; every operation is a no-op.
+    """
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+class Trace:
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+
+    def add(self, span: Span) -> bool:
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            self.dropped += 1
+            return False
+        self.spans.append(span)
+        return True
+
+    def tree(self) -> Dict[str, Any]:
+        nodes: Dict[int, Dict[str, Any]] = {}
+        roots: List[Dict[str, Any]] = []
+        now = time.perf_counter()
+        for span in self.spans:
+            end = span.end if span.end is not None else now
+            nodes[span.span_id] = {
+                "name": span.name,
+                "start": round(span.start - self.origin, 6),
+                "duration": round(end - span.start, 6),
+                "running": span.end is None,
+                "attrs": span.attrs,
+                "children": [],
+            }
+        for span in self.spans:
+            parent = nodes.get(span.parent_id) if span.parent_id is not None else None
+            (parent["children"] if parent is not None else roots).append(nodes[span.span_id])
+        return {"trace_id": self.trace_id, "started_at": self.started_at, "dropped_spans": self.dropped, "spans": roots}
+
+class Tracer:
+    """
+    Per-job span trees (job -> step -> LLM call -> NIM request) kept in memory for the most recent jobs.
+    The active span travels in a ContextVar, so tasks created inside a span attach to it automatically.
+    """
+    def __init__(self, max_traces: int = TRACE_MAX_JOBS, enabled: bool = TRACING_ENABLED):
+        self.enabled = enabled
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[str, Trace]" = OrderedDict()
+
+    def trace(self, trace_id: str, name: str = "job", **attrs) -> Any:
+        """
+        Starts (or continues) the trace for `trace_id` with a root span.
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        trace = self._traces.get(trace_id)
+        if trace is None:
+            trace = self._traces[trace_id] = Trace(trace_id)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+        span = Span(trace, name, None, attrs)
+        trace.add(span)
+        return span
+
+    def span(self, name: str, **attrs) -> Any:
+        """
+        A child of the active span, or a no-op outside of a traced job.
+        """
+        parent = _current_span.get()
+        if parent is None:
+            return NULL_SPAN
+        span = Span(parent.trace, name, parent.span_id, attrs)
+        return span if parent.trace.add(span) else NULL_SPAN
+
+    def record(self, name: str, start: float, end: float, **attrs):
+        """
+        Adds an already finished child span (for work that cannot be wrapped in a `with`, e.g. a stream).
+        """
+        parent = _current_span.get()
+        if parent is None:
+            return
+        span = Span(parent.trace, name, parent.span_id, attrs)
+        span.start, span.end = start, end
+        parent.trace.add(span)
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        trace = self._traces.get(trace_id)
+        return trace.tree() if trace is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "traces": len(self._traces), "metrics_enabled": METRICS_ENABLED}
+
+tracer = Tracer()
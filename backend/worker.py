@@ -0,0 +1,145 @@
+"""
+Worker process that runs plan steps handed off by the API through the tasks table.
+
+Usage: python -m backend.worker [--agents browser,coder] [--concurrency 4] [--worker-id NAME]
+
+Start any number of these, on this host or others sharing DB_PATH; each claims only the agent
+types it was given, so browser-heavy and code-heavy work can be scaled separately. Set
+REMOTE_AGENTS on the API process to choose which agent types are handed off.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+from backend.utils.nim_client import nim_client
+from backend.services.audit import audit_sink
+from backend.services.events import event_bus
+from backend.services.task_queue import task_queue, current_task, LeaseLostError, TASK_HEARTBEAT_SECONDS, TASK_POLL_SECONDS
+from backend.utils.llm_cache import llm_cache
+from backend.agents.registry import AGENT_PATHS, create_agent, loaded_services, warm_up
+
+class Worker:
+    def __init__(self, worker_id: str, agents: List[str], concurrency: int):
+        self.worker_id = worker_id
+        self.agents = agents
+        self.concurrency = concurrency
+        self.started_at = datetime.now().isoformat()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._stopping = asyncio.Event()
+
+    async def run_task(self, task: Dict):
+        tid = task["id"]
+        current_task.set(tid)
+        try:
+            agent = create_agent(task["agent"], task["job_id"])
+            result = await agent.run(task["input"])
+            status = "failed" if isinstance(result, dict) and result.get("status") == "failed" else "completed"
+        except asyncio.CancelledError:
+            if self._stopping.is_set():
+                # Shutting down: hand the task to another worker straight away
+                await task_queue.release(self.worker_id, tid)
+            raise
+        except Exception as e:
+            logger.error(f"Task {tid} ({task['agent']}) failed: {e}")
+            result, status = {"status": "failed", "error": str(e)}, "failed"
+        try:
+            await task_queue.flush_events()
+            await task_queue.finish(self.worker_id, tid, status, result)
+            logger.info(f"Task {tid} {status} (attempt {task['attempts']})")
+        except LeaseLostError as e:
+            logger.warning(str(e))
+
+    async def heartbeat_loop(self):
+        while True:
+            try:
+                lost = await task_queue.renew(self.worker_id, list(self._running))
+                for tid in lost:
+                    # Cancelled through the API, or reassigned after this worker stalled past its lease
+                    logger.info(f"Stopping task {tid}: lease no longer held")
+                    self._running[tid].cancel()
+                await task_queue.heartbeat(self.worker_id, self.agents, len(self._running), self.started_at)
+            except Exception as e:
+                logger.error(f"Heartbeat failed: {e}")
+            await asyncio.sleep(TASK_HEARTBEAT_SECONDS)
+
+    async def serve(self):
+        logger.info(f"Worker {self.worker_id} serving {', '.join(self.agents)} with concurrency {self.concurrency}")
+        heartbeat = asyncio.create_task(self.heartbeat_loop())
+        try:
+            while not self._stopping.is_set():
+                task = None
+                if len(self._running) < self.concurrency:
+                    try:
+                        task = await task_queue.claim(self.worker_id, self.agents)
+                    except Exception as e:
+                        logger.error(f"Claim failed: {e}")
+                if task is None:
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), TASK_POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                runner = asyncio.create_task(self.run_task(task))
+                self._running[task["id"]] = runner
+                runner.add_done_callback(lambda _, tid=task["id"]: self._running.pop(tid, None))
+        finally:
+            for runner in list(self._running.values()):
+                runner.cancel()
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
+    def stop(self):
+        self._stopping.set()
+
+async def main(worker_id: str, agents: List[str], concurrency: int):
+    await nim_client.startup()
+    await audit_sink.start()
+    # Agent logs and token deltas reach the API's /jobs/{job_id}/stream through the tasks database
+    event_bus.forward = task_queue.forward_event
+    worker = Worker(worker_id, agents, concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    # Claim tasks straight away; the agents this worker serves load in the meantime
+    warm = asyncio.create_task(warm_up(agents))
+    try:
+        await worker.serve()
+    finally:
+        warm.cancel()
+        await asyncio.gather(warm, return_exceptions=True)
+        services = loaded_services()
+        if "browser_pool" in services:
+            await services["browser_pool"].stop()
+        if "crawler" in services:
+            await services["crawler"].aclose()
+        if "sandbox" in services:
+            await services["sandbox"].stop()
+        await task_queue.close()
+        await audit_sink.stop()
+        await nim_client.aclose()
+        llm_cache.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agents", default=os.getenv("WORKER_AGENTS", ",".join(AGENT_PATHS)))
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("WORKER_CONCURRENCY", "4")))
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    args = parser.parse_args()
+    agents = [a.strip() for a in args.agents.split(",") if a.strip()]
+    unknown = [a for a in agents if a not in AGENT_PATHS]
+    if unknown:
+        parser.error(f"Unknown agents: {', '.join(unknown)}")
+    asyncio.run(main(args.worker_id, agents, args.concurrency))
@@ -8,6 +8,8 @@ const JobView = () => {
     const { jobId } = useParams();
     const [job, setJob] = useState(null);
     const [logs, setLogs] = useState([]);
+    const [streamLogs, setStreamLogs] = useState([]);
+    const [liveOutput, setLiveOutput] = useState('');
     const [activeTab, setActiveTab] = useState('plan');
 
     useEffect(() => {
@@ -23,6 +25,22 @@ const JobView = () => {
         return () => clearInterval(interval);
     }, [jobId]);
 
+    useEffect(() => {
+        // Live agent activity and token deltas pushed by the backend
+        const source = new EventSource(`http://localhost:8000/jobs/${jobId}/stream`);
+        source.addEventListener('log', (e) => {
+            const event = JSON.parse(e.data);
+            setStreamLogs((prev) => [...prev, { timestamp: event.timestamp, agent: event.agent, message: event.action }]);
+            setLiveOutput('');
+        });
+        source.addEventListener('token', (e) => {
+            const event = JSON.parse(e.data);
+            setLiveOutput((prev) => prev + event.delta);
+        });
+        source.addEventListener('end', () => source.close());
+        return () => source.close();
+    }, [jobId]);
+
     if (!job) return (
         <div className="h-full flex items-center justify-center">
             <div className="flex flex-col items-center gap-4">
@@ -82,7 +100,7 @@ const JobView = () => {
 
                 {activeTab === 'logs' && (
                     <div className="h-full overflow-auto bg-[#f5f5f5] p-6 font-mono text-xs leading-relaxed custom-scrollbar">
-                        {logs.map((log, i) => (
+                        {[...logs, ...streamLogs].map((log, i) => (
                             <div key={i} className="mb-1.5 flex gap-3 text-neutral-500 hover:bg-black/5 p-1 rounded transition-colors">
                                 <span className="text-neutral-600 shrink-0 select-none">[{new Date(log.timestamp).toLocaleTimeString()}]</span>
                                 <span className={`font-bold shrink-0 w-24 text-right ${log.agent === 'system' ? 'text-purple-400' :
@@ -92,7 +110,10 @@ const JobView = () => {
                                 <span className="text-neutral-700 break-all">{log.message}</span>
                             </div>
                         ))}
-                        {logs.length === 0 && (
+                        {liveOutput && (
+                            <div className="mb-1.5 p-1 text-neutral-700 whitespace-pre-wrap break-all">{liveOutput}</div>
+                        )}
+                        {logs.length === 0 && streamLogs.length === 0 && (
                             <div className="text-neutral-700 italic text-center mt-20">Waiting for agent transmission...</div>
                         )}
                         <div className="h-4"></div> {/* Spacer */}